@@ -0,0 +1 @@
+# Load and latency benchmarks for the backend (not part of the app)
@@ -0,0 +1,8 @@
+# benchmarks/app.py
+"""`main:app` with the fake inference client installed, for `uvicorn benchmarks.app:app`."""
+from main import app  # noqa: F401
+from src.routes import chat
+
+from .fake_inference import FakeInferenceClient
+
+chat.hf_client = FakeInferenceClient()
@@ -0,0 +1,60 @@
+# benchmarks/db_modes.py
+"""
+Compare the sync (threadpool) and async (asyncpg) database modes.
+
+Starts uvicorn once with DB_ASYNC=0 and once with DB_ASYNC=1 against the
+database in DATABASE_URL and drives the same read mix at high concurrency.
+The project response cache is disabled so every request reaches Postgres.
+
+    python -m benchmarks.db_modes --concurrency 200 --duration 20
+"""
+import argparse
+import asyncio
+import json
+
+import httpx
+
+from .loadgen import run_load, uvicorn_server
+
+
+def request_mix(project_id: int):
+    return [
+        {"method": "GET", "url": "/api/v1/projects/", "params": {"limit": 10}},
+        {"method": "GET", "url": f"/api/v1/projects/{project_id}"},
+        {"method": "GET", "url": f"/api/v1/projects/{project_id}/comments", "params": {"limit": 20}},
+    ]
+
+
+async def bench(base_url: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        # warm the pools before measuring
+        await run_load(client, request_mix(args.project_id), min(args.concurrency, 10), 2)
+        return await run_load(client, request_mix(args.project_id), args.concurrency, args.duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--project-id", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for mode, flag in (("sync", "0"), ("async", "1")):
+        env = {"DB_ASYNC": flag, "PROJECT_CACHE_TTL": "0"}
+        with uvicorn_server(args.port, env) as base_url:
+            results[mode] = asyncio.run(bench(base_url, args))
+
+    print(f"{'mode':<6} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for mode, r in results.items():
+        print(f"{mode:<6} {r['rps']:>9} {r['p50_ms']:>9} {r['p99_ms']:>9} {r['errors']:>7}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"concurrency": args.concurrency, "duration": args.duration, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+# benchmarks/fake_inference.py
+import os
+import time
+from types import SimpleNamespace as NS
+
+# simulated model latency (seconds) and reply length (tokens)
+BENCH_INFERENCE_LATENCY = float(os.getenv("BENCH_INFERENCE_LATENCY", "0.05"))
+BENCH_INFERENCE_TOKENS = int(os.getenv("BENCH_INFERENCE_TOKENS", "30"))
+
+
+class FakeInferenceClient:
+    """Stands in for huggingface_hub.InferenceClient: fixed latency, canned reply."""
+
+    def __init__(self, latency: float = BENCH_INFERENCE_LATENCY, tokens: int = BENCH_INFERENCE_TOKENS):
+        self.latency = latency
+        self.tokens = tokens
+
+    def chat_completion(self, messages, model=None, max_tokens=None, stream=False, **kwargs):
+        words = [f"word{i}" for i in range(min(self.tokens, max_tokens or self.tokens))]
+        if stream:
+            return self._stream(words)
+        time.sleep(self.latency)
+        return NS(choices=[NS(message=NS(content=" ".join(words)))])
+
+    def _stream(self, words):
+        delay = self.latency / max(1, len(words))
+        for word in words:
+            time.sleep(delay)
+            yield NS(choices=[NS(delta=NS(content=word + " "))])
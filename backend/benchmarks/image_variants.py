@@ -0,0 +1,68 @@
+# benchmarks/image_variants.py
+"""
+Page weight and render time of uploaded image variants.
+
+Renders the variants an upload gets (IMAGE_WIDTHS, WebP and JPEG) for
+--image, or for a synthetic photo-like image of --size, and prints each
+variant's bytes next to the original's. Rendering runs inline, i.e. the
+per-upload CPU cost a worker process pays. No database is involved.
+
+    python -m benchmarks.image_variants --size 4000x3000
+    python -m benchmarks.image_variants --image ~/Pictures/screenshot.png --repeat 5
+"""
+import argparse
+import io
+import json
+import time
+
+from PIL import Image
+
+from src.image_pipeline import IMAGE_MAX_PIXELS, IMAGE_QUALITY, IMAGE_WIDTHS, _render_variants
+
+
+def synthetic(width: int, height: int) -> bytes:
+    """A gradient with sensor-like noise, saved as a high-quality JPEG."""
+    gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    noise = Image.effect_noise((width, height), 40).convert("RGB")
+    out = io.BytesIO()
+    Image.blend(gradient, noise, 0.3).save(out, "JPEG", quality=95)
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", help="Image file to render (default: synthetic)")
+    parser.add_argument("--size", default="3000x2000", help="Synthetic image size, WxH")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            data = f.read()
+    else:
+        data = synthetic(*(int(v) for v in args.size.split("x")))
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        width, height, variants = _render_variants(data, IMAGE_WIDTHS, IMAGE_QUALITY, IMAGE_MAX_PIXELS)
+        timings.append(time.perf_counter() - started)
+
+    results = {
+        "original": {"width": width, "height": height, "bytes": len(data)},
+        "render_ms": round(min(timings) * 1000, 1),
+        "variants": [
+            {"format": fmt, "width": w, "height": h, "bytes": len(body),
+             "of_original": f"{len(body) / len(data):.1%}"}
+            for fmt, w, h, body in variants
+        ],
+    }
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
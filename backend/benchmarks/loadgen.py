@@ -0,0 +1,103 @@
+# benchmarks/loadgen.py
+import asyncio
+import contextlib
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    """Throughput and latency percentiles (ms) for one run."""
+    lat = sorted(latencies)
+    return {
+        "requests": len(lat),
+        "errors": errors,
+        "rps": round(len(lat) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(lat, 50) * 1000, 2),
+        "p95_ms": round(percentile(lat, 95) * 1000, 2),
+        "p99_ms": round(percentile(lat, 99) * 1000, 2),
+    }
+
+
+async def run_load(
+        client: httpx.AsyncClient,
+        requests: Sequence[dict],
+        concurrency: int,
+        duration: float,
+) -> Dict[str, float]:
+    """
+    Drive `client` with `concurrency` workers for `duration` seconds,
+    cycling through `requests` (kwargs for `client.request`).
+    """
+    latencies: List[float] = []
+    errors = 0
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+
+    async def worker(offset: int):
+        nonlocal errors
+        n = offset
+        while loop.time() < deadline:
+            req = requests[n % len(requests)]
+            n += 1
+            t0 = time.perf_counter()
+            try:
+                resp = await client.request(**req)
+                if resp.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+@contextlib.contextmanager
+def uvicorn_server(
+        port: int,
+        env: Optional[Dict[str, str]] = None,
+        workers: int = 1,
+        app: str = "main:app",
+) -> Iterator[str]:
+    """Run `app` under a real uvicorn process; yields its base URL."""
+    proc_env = {**os.environ, **(env or {})}
+    proc_env.setdefault("HF_API_TOKEN", "benchmark")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=proc_env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(150):
+            try:
+                if httpx.get(base_url + "/", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if proc.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            time.sleep(0.2)
+        else:
+            raise RuntimeError("uvicorn did not become ready")
+        yield base_url
+    finally:
+        proc.terminate()
+        proc.wait(timeout=15)
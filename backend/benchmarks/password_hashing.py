@@ -0,0 +1,84 @@
+# benchmarks/password_hashing.py
+"""
+Logins per second per core for password verification.
+
+Measures bcrypt verify inline on one core, then through the
+PasswordHasher process pool at the given concurrency. No database or
+server is involved; this is the CPU cost a login pays.
+
+    python -m benchmarks.password_hashing --rounds 12 --workers 4 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from .loadgen import summarize
+
+PASSWORD = "correct horse battery staple"
+
+
+def bench_inline(context, hashed: str, duration: float) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        t0 = time.perf_counter()
+        context.verify(PASSWORD, hashed)
+        latencies.append(time.perf_counter() - t0)
+    result = summarize(latencies, 0, time.perf_counter() - start)
+    result["per_core"] = result["rps"]
+    return result
+
+
+async def bench_pool(hasher, hashed: str, concurrency: int, duration: float) -> dict:
+    latencies = []
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+
+    async def worker():
+        while loop.time() < deadline:
+            t0 = time.perf_counter()
+            await hasher.verify_and_update(PASSWORD, hashed)
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = summarize(latencies, 0, time.perf_counter() - start)
+    cores = min(hasher.workers, os.cpu_count() or 1)
+    result["per_core"] = round(result["rps"] / cores, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    # the worker processes read the cost factor from the environment
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    from src.password_hasher import PasswordHasher, pwd_context
+
+    hashed = pwd_context.hash(PASSWORD)
+    results = {"rounds": args.rounds, "workers": args.workers, "cpu_count": os.cpu_count()}
+    results["inline"] = bench_inline(pwd_context, hashed, args.duration)
+
+    hasher = PasswordHasher(workers=args.workers, max_pending=args.concurrency)
+    hasher.warm_up()
+    try:
+        results["pool"] = asyncio.run(bench_pool(hasher, hashed, args.concurrency, args.duration))
+    finally:
+        hasher.shutdown()
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# benchmarks/project_listing.py
+"""
+Project listing: per-request validation vs pre-rendered JSON.
+
+Builds the same page (newest `--limit` projects) both ways against the
+database in DATABASE_URL, with no response cache in front:
+
+  validated    full rows -> dicts -> schemas.Project validation -> JSON
+               (list_projects before JSON heads were stored)
+  prerendered  keyset columns + stored `json_head` bytes, counters appended
+
+Each mode is timed with and without the database round trip.
+
+    python -m benchmarks.project_listing --limit 100 --duration 5
+"""
+import argparse
+import json
+import time
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+
+from src import project_json
+from src.db import models, schemas
+from src.db.database import SessionLocal
+from src.routes.projects import PAGE_COLUMNS
+
+from .loadgen import summarize
+
+project_list_adapter = TypeAdapter(List[schemas.Project])
+
+
+def fetch_validated(session, limit: int) -> list:
+    return (
+        session.query(models.Project)
+        .order_by(models.Project.created_at.desc(), models.Project.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def render_validated(rows) -> bytes:
+    result = [
+        {
+            "id": p.id,
+            "title": p.title,
+            "short_desc": p.short_desc,
+            "detail_desc": p.detail_desc,
+            "thumbnail": p.thumbnail,
+            "images": p.images,
+            "demo_url": p.demo_url,
+            "github_url": p.github_url,
+            "tech_tags": p.tech_tags,
+            "created_at": p.created_at,
+            "updated_at": p.updated_at,
+            "view_count": p.view_count or 0,
+            "comments": p.comments or 0,
+        }
+        for p in rows
+    ]
+    return project_list_adapter.dump_json(project_list_adapter.validate_python(result), by_alias=True)
+
+
+def fetch_prerendered(session, limit: int) -> list:
+    return (
+        session.query(*PAGE_COLUMNS)
+        .order_by(models.Project.created_at.desc(), models.Project.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def render_prerendered(rows) -> bytes:
+    return project_json.render_list(
+        project_json.render(r.json_head, r.updated_at, r.view_count or 0, r.comments or 0) for r in rows
+    )
+
+
+def timed(fn: Callable[[], bytes], duration: float) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, 0, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=5, help="seconds per measurement")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        project_json.backfill(db)
+        modes = {
+            "validated": (fetch_validated, render_validated),
+            "prerendered": (fetch_prerendered, render_prerendered),
+        }
+        rows = {name: fetch(db, args.limit) for name, (fetch, _) in modes.items()}
+        if json.loads(render_validated(rows["validated"])) != json.loads(render_prerendered(rows["prerendered"])):
+            raise SystemExit("The two modes render different pages")
+
+        results = {"limit": args.limit, "page_bytes": len(render_prerendered(rows["prerendered"]))}
+        for name, (fetch, render) in modes.items():
+            results[name] = {
+                "render": timed(lambda: render(rows[name]), args.duration),
+                # expunge so each round trip builds fresh ORM objects, as a request would
+                "fetch_and_render": timed(lambda: (render(fetch(db, args.limit)), db.expunge_all()), args.duration),
+            }
+        for part in ("render", "fetch_and_render"):
+            old, new = results["validated"][part]["rps"], results["prerendered"][part]["rps"]
+            results[f"speedup_{part}"] = round(new / old, 1) if old else None
+    finally:
+        db.close()
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# benchmarks/seed.py
+"""
+Seed a synthetic catalog for benchmarking (PostgreSQL only).
+
+Projects are titled `bench-<n>` so they can be told apart from real data
+and replaced with --reset. Page views are spread over the last --days
+days and rolled up into page_views_daily afterwards.
+
+    python -m benchmarks.seed --projects 500 --comments 40 --page-views 2000000 --reset
+"""
+import argparse
+import time
+from typing import List
+
+from sqlalchemy import text
+
+from src.db import models
+from src.db.database import SessionLocal, engine
+from src.password_hasher import pwd_context
+from src.project_json import backfill as backfill_project_json
+from src.view_rollup import backfill_daily_views
+
+TITLE_PREFIX = "bench-"
+ADMIN_EMAIL = "bench-admin@example.com"
+ADMIN_PASSWORD = "benchmark"
+
+TAGS = [
+    "python", "fastapi", "react", "typescript", "postgres", "redis", "docker", "kubernetes",
+    "aws", "gcp", "pytorch", "tensorflow", "llm", "nlp", "vision", "rust", "go", "graphql",
+    "websocket", "tailwind", "nextjs", "django", "flask", "sqlalchemy", "celery", "kafka",
+    "spark", "airflow", "terraform", "ci", "pandas", "numpy", "opencv", "langchain", "vite",
+    "node", "svelte", "vue", "mongodb", "elasticsearch",
+]
+
+# rows per INSERT ... SELECT when generating page views
+VIEW_CHUNK = 500_000
+
+
+def reset(conn) -> None:
+    conn.execute(text("""
+        DELETE FROM comments WHERE project_id IN (SELECT id FROM projects WHERE title LIKE :p)
+    """), {"p": TITLE_PREFIX + "%"})
+    # page_views and page_views_daily cascade
+    conn.execute(text("DELETE FROM projects WHERE title LIKE :p"), {"p": TITLE_PREFIX + "%"})
+
+
+def seed_projects(conn, count: int) -> None:
+    conn.execute(text("""
+        INSERT INTO projects (title, short_desc, detail_desc, tech_tags, thumbnail, view_count,
+                              images, comments, demo_url, github_url, created_at, updated_at)
+        SELECT :prefix || g,
+               'Synthetic project ' || g || ' for load testing',
+               repeat('Detailed description of a synthetic benchmark project. ', 20),
+               ARRAY[(:tags)[1 + g % 40], (:tags)[1 + (g * 7) % 40], (:tags)[1 + (g * 13) % 40]],
+               'https://example.com/thumbs/' || g || '.png',
+               0,
+               ARRAY['https://example.com/images/' || g || '-1.png'],
+               0,
+               'https://example.com/demo/' || g,
+               'https://github.com/example/bench-' || g,
+               now() - make_interval(mins => g),
+               now() - make_interval(mins => g)
+        FROM generate_series(1, :n) AS g
+        ON CONFLICT (title) DO NOTHING
+    """), {"prefix": TITLE_PREFIX, "tags": TAGS, "n": count})
+
+
+def seed_comments(conn, per_project: int) -> None:
+    conn.execute(text("""
+        INSERT INTO comments (author_name, project_id, content, created_at)
+        SELECT 'visitor ' || c, p.id, 'Synthetic comment ' || c || ' on ' || p.title,
+               now() - make_interval(secs => c * 37)
+        FROM projects p CROSS JOIN generate_series(1, :m) AS c
+        WHERE p.title LIKE :p
+    """), {"m": per_project, "p": TITLE_PREFIX + "%"})
+    conn.execute(text("""
+        UPDATE projects p SET comments = (SELECT count(*) FROM comments c WHERE c.project_id = p.id)
+        WHERE p.title LIKE :p
+    """), {"p": TITLE_PREFIX + "%"})
+
+
+def seed_page_views(conn, total: int, days: int) -> None:
+    done = 0
+    while done < total:
+        n = min(VIEW_CHUNK, total - done)
+        conn.execute(text("""
+            WITH ids AS (SELECT array_agg(id ORDER BY id) AS a FROM projects WHERE title LIKE :p)
+            INSERT INTO page_views (project_id, path, user_agent, ip_address, timestamp)
+            SELECT ids.a[1 + (g * 2654435761) % cardinality(ids.a)],
+                   '/projects',
+                   'benchmark',
+                   '10.0.' || (g % 256) || '.' || (g / 256 % 256),
+                   now() - make_interval(secs => random() * :days * 86400)
+            FROM ids, generate_series(:start, :end) AS g
+        """), {"p": TITLE_PREFIX + "%", "days": days, "start": done + 1, "end": done + n})
+        done += n
+        print(f"  page views: {done}/{total}")
+    conn.execute(text("""
+        UPDATE projects p SET view_count = v.cnt
+        FROM (SELECT project_id, count(*) AS cnt FROM page_views GROUP BY project_id) v
+        WHERE v.project_id = p.id AND p.title LIKE :p
+    """), {"p": TITLE_PREFIX + "%"})
+
+
+def ensure_admin(conn) -> None:
+    conn.execute(text("""
+        INSERT INTO users (name, email, password_hash, is_admin)
+        VALUES ('Benchmark admin', :email, :hash, true)
+        ON CONFLICT (email) DO UPDATE SET password_hash = EXCLUDED.password_hash, is_admin = true
+    """), {"email": ADMIN_EMAIL, "hash": pwd_context.hash(ADMIN_PASSWORD)})
+
+
+def bench_project_ids() -> List[int]:
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(models.Project.id)
+            .filter(models.Project.title.like(TITLE_PREFIX + "%"))
+            .order_by(models.Project.id)
+            .all()
+        )
+        return [r.id for r in rows]
+    finally:
+        db.close()
+
+
+def catalog_size() -> dict:
+    with engine.connect() as conn:
+        return dict(conn.execute(text("""
+            SELECT (SELECT count(*) FROM projects WHERE title LIKE :p) AS projects,
+                   (SELECT count(*) FROM comments) AS comments,
+                   (SELECT count(*) FROM page_views) AS page_views
+        """), {"p": TITLE_PREFIX + "%"}).mappings().one())
+
+
+def seed(projects: int, comments: int, page_views: int, days: int, reset_first: bool) -> dict:
+    steps = []
+
+    def step(name, fn, *args):
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            fn(conn, *args)
+        steps.append((name, time.perf_counter() - started))
+        print(f"{name}: {steps[-1][1]:.1f}s")
+
+    models.Base.metadata.create_all(bind=engine)
+    if reset_first:
+        step("reset", reset)
+    step("projects", seed_projects, projects)
+    if comments:
+        step("comments", seed_comments, comments)
+    if page_views:
+        step("page views", seed_page_views, page_views, days)
+    step("admin user", ensure_admin)
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        backfill_daily_views(db)
+    finally:
+        db.close()
+    print(f"daily rollup: {time.perf_counter() - started:.1f}s")
+
+    # rows inserted with SQL skip the ORM hooks that pre-render project JSON
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        backfill_project_json(db)
+    finally:
+        db.close()
+    print(f"project JSON: {time.perf_counter() - started:.1f}s")
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    return catalog_size()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--comments", type=int, default=20, help="comments per project")
+    parser.add_argument("--page-views", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=90, help="spread page views over this many days")
+    parser.add_argument("--reset", action="store_true", help="delete previously seeded bench-* data first")
+    args = parser.parse_args()
+    print(seed(args.projects, args.comments, args.page_views, args.days, args.reset))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# benchmarks/suite.py
+"""
+Backend benchmark suite.
+
+Drives each scenario against the app in-process (httpx ASGI transport)
+and/or over a real uvicorn server, against the database in DATABASE_URL
+(seed it first with `python -m benchmarks.seed`). Chat uses the fake
+inference client from benchmarks/fake_inference.py. Results, with the
+git commit they were measured at, are written as JSON; pass --baseline
+to print the change against an earlier run.
+
+    python -m benchmarks.suite --transport both --concurrency 32 --duration 10
+    python -m benchmarks.suite --scenarios list_projects get_project --baseline old.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import httpx
+
+from .loadgen import BACKEND_DIR, run_load, uvicorn_server
+from .seed import ADMIN_EMAIL, ADMIN_PASSWORD, bench_project_ids, catalog_size
+
+RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+
+
+# ─── scenarios: each returns the request list `run_load` cycles through ──
+def list_projects(ids: List[int]) -> List[dict]:
+    return [
+        {"method": "GET", "url": "/api/v1/projects/", "params": {"limit": limit}}
+        for limit in (10, 20, 50, 100)
+    ]
+
+
+def get_project(ids: List[int]) -> List[dict]:
+    return [{"method": "GET", "url": f"/api/v1/projects/{pid}"} for pid in ids]
+
+
+def add_comment(ids: List[int]) -> List[dict]:
+    return [
+        {
+            "method": "POST",
+            "url": f"/api/v1/projects/{pid}/comments",
+            "json": {"author_name": "bench", "content": f"Benchmark comment on {pid}"},
+        }
+        for pid in ids
+    ]
+
+
+def record_view(ids: List[int]) -> List[dict]:
+    return [
+        {
+            "method": "POST",
+            "url": "/api/v1/analytics/views",
+            "json": {"project_id": pid, "path": f"/projects/{pid}", "user_agent": "bench"},
+        }
+        for pid in ids
+    ]
+
+
+def daily_views(ids: List[int]) -> List[dict]:
+    start = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
+    return [
+        {"method": "GET", "url": "/api/v1/analytics/views", "params": {"project_id": pid, "from_date": start}}
+        for pid in ids
+    ]
+
+
+def tag_popularity(ids: List[int]) -> List[dict]:
+    start = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
+    return [
+        {"method": "GET", "url": "/api/v1/analytics/tags/popularity", "params": {"from_date": start}},
+        {"method": "GET", "url": "/api/v1/analytics/tags/popularity", "params": {"weight_by_views": "true"}},
+    ]
+
+
+def chat(ids: List[int]) -> List[dict]:
+    # distinct questions so the reply cache does not answer most of them
+    return [
+        {"method": "POST", "url": "/api/v1/chat", "json": {"message": f"Tell me about project {pid} ({i})"}}
+        for i in range(10)
+        for pid in ids
+    ]
+
+
+SCENARIOS: Dict[str, Callable[[List[int]], List[dict]]] = {
+    "list_projects": list_projects,
+    "get_project": get_project,
+    "add_comment": add_comment,
+    "record_view": record_view,
+    "daily_views": daily_views,
+    "tag_popularity": tag_popularity,
+    "chat": chat,
+}
+ADMIN_SCENARIOS = {"daily_views", "tag_popularity"}
+
+
+async def login(client: httpx.AsyncClient) -> Dict[str, str]:
+    resp = await client.post(
+        "/api/v1/auth/login", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
+    )
+    resp.raise_for_status()
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+async def run_scenarios(client: httpx.AsyncClient, args, ids: List[int]) -> Dict[str, dict]:
+    auth = await login(client) if ADMIN_SCENARIOS & set(args.scenarios) else {}
+    results = {}
+    for name in args.scenarios:
+        requests = SCENARIOS[name](ids)
+        random.Random(0).shuffle(requests)
+        if name in ADMIN_SCENARIOS:
+            requests = [{**r, "headers": auth} for r in requests]
+        await run_load(client, requests, min(args.concurrency, 4), args.warmup)
+        results[name] = await run_load(client, requests, args.concurrency, args.duration)
+        print(f"  {name:<15} {results[name]}")
+    return results
+
+
+async def bench_asgi(args, ids: List[int]) -> Dict[str, dict]:
+    from main import app
+    from src.routes import chat as chat_routes
+
+    from .fake_inference import FakeInferenceClient
+
+    chat_routes.hf_client = FakeInferenceClient()
+    # ASGITransport does not send lifespan events, so run startup/shutdown here
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await run_scenarios(client, args, ids)
+
+
+async def bench_http(base_url: str, args, ids: List[int]) -> Dict[str, dict]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        return await run_scenarios(client, args, ids)
+
+
+def git_commit() -> Dict[str, object]:
+    def git(*cmd):
+        return subprocess.run(["git", *cmd], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain"))}
+
+
+def print_comparison(results: dict, baseline: dict) -> None:
+    print(f"\n{'transport/scenario':<30} {'rps':>9} {'Δrps':>8} {'p95 ms':>9} {'Δp95':>8}")
+    for transport, scenarios in results["results"].items():
+        for name, r in scenarios.items():
+            old = baseline.get("results", {}).get(transport, {}).get(name)
+            if old is None:
+                continue
+
+            def delta(new, prev):
+                return f"{(new - prev) / prev * 100:+.0f}%" if prev else "n/a"
+
+            print(
+                f"{transport + '/' + name:<30} {r['rps']:>9} {delta(r['rps'], old['rps']):>8} "
+                f"{r['p95_ms']:>9} {delta(r['p95_ms'], old['p95_ms']):>8}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", choices=["asgi", "uvicorn", "both"], default="both")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds before each scenario")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--no-cache", action="store_true", help="disable the project and chat reply caches")
+    parser.add_argument("--json", help="results file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    if args.no_cache:
+        os.environ["PROJECT_CACHE_TTL"] = "0"
+        os.environ["CHAT_CACHE_SIZE"] = "0"
+
+    ids = bench_project_ids()
+    if not ids:
+        raise SystemExit("No benchmark catalog found; run `python -m benchmarks.seed` first.")
+
+    results = {
+        "meta": {
+            **git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+            "catalog": catalog_size(),
+        },
+        "results": {},
+    }
+    if args.transport in ("asgi", "both"):
+        print("in-process (ASGI transport)")
+        results["results"]["asgi"] = asyncio.run(bench_asgi(args, ids))
+    if args.transport in ("uvicorn", "both"):
+        print(f"uvicorn ({args.workers} worker(s))")
+        with uvicorn_server(args.port, workers=args.workers, app="benchmarks.app:app") as base_url:
+            results["results"]["uvicorn"] = asyncio.run(bench_http(base_url, args, ids))
+
+    path = Path(args.json) if args.json else RESULTS_DIR / (
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{results['meta']['commit'] or 'nogit'}.json"
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {path}")
+
+    if args.baseline:
+        print_comparison(results, json.loads(Path(args.baseline).read_text()))
+
+
+if __name__ == "__main__":
+    main()
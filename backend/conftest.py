@@ -0,0 +1,201 @@
+# conftest.py
+"""
+Shared pytest fixtures.
+
+Most tests exercise single components and need no database. Those using
+`client` talk to the PostgreSQL database at DATABASE_URL (tables are
+created if missing, rows they add are removed again) and are skipped
+when it is not reachable.
+
+`assert_max_queries` fails a test when a block issues more SQL statements
+than allowed, so N+1 regressions show up in CI:
+
+    def test_get_project(client, assert_max_queries):
+        with assert_max_queries(1):
+            client.get("/api/v1/projects/1")
+"""
+import contextlib
+import os
+import threading
+import uuid
+
+import pytest
+
+# src.db.database builds its engine at import; nothing connects until a
+# test talks to the database, so the pure-component tests need no server
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "postgresql://localhost/portfolio_test"
+
+
+@pytest.fixture
+def anyio_backend():
+    # async tests (`@pytest.mark.anyio`) run on asyncio, like uvicorn
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def database():
+    from sqlalchemy.exc import OperationalError
+
+    from src.db.database import engine
+    from src.db.models import Base
+    from src.project_search import install_search_vector
+
+    try:
+        with engine.connect():
+            pass
+    except OperationalError as e:
+        pytest.skip(f"PostgreSQL not reachable at DATABASE_URL: {e.orig}")
+    Base.metadata.create_all(bind=engine)
+    install_search_vector(engine)
+    return engine
+
+
+@pytest.fixture
+def client(database):
+    """TestClient with the in-process caches emptied, so each test starts cold."""
+    from fastapi.testclient import TestClient
+
+    from main import app
+    from src.principal_cache import principal_cache
+    from src.response_cache import project_cache
+    from src.tag_index import tag_index
+    from src.tag_popularity import tag_popularity_cache
+
+    project_cache.invalidate()
+    tag_index.invalidate()
+    tag_popularity_cache.clear()
+    principal_cache.clear()
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def db_session(database):
+    from src.db.database import SessionLocal
+
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def admin_headers(db_session):
+    from src import auth
+    from src.db import models
+
+    user = models.User(
+        name="Test admin",
+        email=f"admin-{uuid.uuid4().hex[:8]}@example.com",
+        password_hash="!",
+        is_admin=True,
+    )
+    db_session.add(user)
+    db_session.commit()
+    token = auth.create_access_token(auth.user_claims(user))
+    yield {"Authorization": f"Bearer {token}"}
+    db_session.delete(user)
+    db_session.commit()
+
+
+@pytest.fixture
+def sample_projects(db_session):
+    """Three projects with two comments and a page view each; returns their ids."""
+    from datetime import datetime, timezone
+
+    from src.db import models
+    from src.view_rollup import record_daily_views
+
+    run = uuid.uuid4().hex[:8]
+    projects = [
+        models.Project(
+            title=f"Test project {run} {i}",
+            short_desc="A project created by the test suite",
+            detail_desc="Rows like this are removed when the test ends.",
+            tech_tags=[f"test-{run}", f"test-{run}-{i}"],
+            thumbnail="https://example.com/thumb.png",
+            images=[],
+            github_url="https://github.com/example/project",
+            view_count=0,
+            comments=2,
+        )
+        for i in range(3)
+    ]
+    db_session.add_all(projects)
+    db_session.flush()
+    ids = [p.id for p in projects]
+    now = datetime.now(timezone.utc)
+    views = [{"project_id": pid, "path": f"/projects/{pid}", "timestamp": now} for pid in ids]
+    db_session.add_all(models.PageView(**v) for v in views)
+    record_daily_views(db_session, views)
+    db_session.add_all(
+        models.Comment(author_name="Tester", project_id=pid, content=f"Comment {n}")
+        for pid in ids for n in range(2)
+    )
+    db_session.commit()
+
+    yield ids
+
+    # page views and their daily counts cascade with the projects
+    db_session.query(models.Comment).filter(models.Comment.project_id.in_(ids)).delete(synchronize_session=False)
+    db_session.query(models.Project).filter(models.Project.id.in_(ids)).delete(synchronize_session=False)
+    db_session.commit()
+
+
+@contextlib.contextmanager
+def count_queries(*engines, ignore_threads=()):
+    """
+    Collect the statements the engines run inside the block, from any
+    thread (TestClient serves requests on its own thread) except those
+    named in `ignore_threads`.
+    """
+    from sqlalchemy import event
+
+    statements = []
+    ignored = frozenset(ignore_threads)
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        if threading.current_thread().name not in ignored:
+            statements.append(statement)
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", before)
+
+
+@pytest.fixture
+def assert_max_queries():
+    from src import page_view_buffer, view_counter
+    from src.db.database import async_engine, engine
+
+    # the background writers flush on their own schedule, so their
+    # statements belong to no test
+    background = (view_counter.THREAD_NAME, page_view_buffer.THREAD_NAME)
+    engines = [engine] + ([async_engine.sync_engine] if async_engine is not None else [])
+
+    @contextlib.contextmanager
+    def check(limit: int):
+        with count_queries(*engines, ignore_threads=background) as statements:
+            yield statements
+        if len(statements) > limit:
+            listing = "\n".join(f"  {i + 1}. {s}" for i, s in enumerate(statements))
+            pytest.fail(f"{len(statements)} SQL statements, expected at most {limit}:\n{listing}")
+
+    return check
+
+
+@pytest.fixture
+def assert_num_queries(assert_max_queries):
+    """Exact count: also catches a query that silently stopped running."""
+    @contextlib.contextmanager
+    def check(expected: int):
+        with assert_max_queries(expected) as statements:
+            yield statements
+        if len(statements) != expected:
+            pytest.fail(f"{len(statements)} SQL statements, expected {expected}")
+
+    return check
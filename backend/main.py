@@ -1,25 +1,101 @@
-from fastapi import FastAPI
+import time
+
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+import logging
 import os
 
 from src.db.models import Base
-from src.db.database import engine
+from src.db.database import async_engine, engine
 from src.routes import auth, projects, analytics
 from src.routes import chat
 from src.routes import signaling_server
+from src.view_counter import view_counter
+from src.page_view_buffer import page_view_buffer
+from src.reply_cache import reply_cache
+from src.inference_pool import inference_pool
+from src.password_hasher import password_hasher
+from src.image_pipeline import IMAGE_URL_PATH, MediaFiles, image_pipeline, image_store
+from src.project_search import install_search_vector
+from src.metrics import MetricsMiddleware, instrument_engine, registry as metrics_registry
+from src.query_profiler import query_profiler
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+IMPORT_SECONDS = time.perf_counter() - _import_started
 
 # Load environment variables
 load_dotenv()
 ALLOWED_ORIGIN = os.getenv("ALLOWED_ORIGIN")
+# Tables are created by `python -m src.db.maintenance upgrade-schema`;
+# set DB_CREATE_ON_STARTUP=1 to run create_all at startup instead.
+DB_CREATE_ON_STARTUP = os.getenv("DB_CREATE_ON_STARTUP", "0") == "1"
+# when set, /metrics requires `Authorization: Bearer <METRICS_TOKEN>`
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# uvicorn's application logger, so the report shows up without extra config
+logger = logging.getLogger("uvicorn.error")
+
+
+class StartupTimer:
+    """Wall time of each startup phase, logged as one line."""
+
+    def __init__(self):
+        self.phases = [("imports", IMPORT_SECONDS)]
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def report(self) -> str:
+        total = sum(seconds for _, seconds in self.phases)
+        parts = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases)
+        return f"Startup: {parts}; total {total * 1000:.0f}ms"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    timer = StartupTimer()
+    if DB_CREATE_ON_STARTUP:
+        with timer.phase("schema"):
+            Base.metadata.create_all(bind=engine)
+            install_search_vector(engine)
+    with timer.phase("reply cache"):
+        reply_cache.load()
+        reply_cache.start()
+    with timer.phase("media directory"):
+        image_store.ensure_dir()
+    with timer.phase("background writers"):
+        view_counter.start()
+        page_view_buffer.start()
+    app.state.startup_timings = {name: round(seconds * 1000, 1) for name, seconds in timer.phases}
+    logger.info(timer.report())
+
+    yield
+
+    # flush buffered view counts and page views before the process exits
+    view_counter.stop()
+    page_view_buffer.stop()
+    reply_cache.stop()
+    inference_pool.shutdown()
+    password_hasher.shutdown()
+    image_pipeline.shutdown()
+    if query_profiler is not None:
+        query_profiler.write_report(engine)
+
 
 app = FastAPI(
     title="Portfolio Showcase API",
     description="Backend API for Portfolio Showcase application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # during dev you can allow *; in prod lock this down
@@ -34,7 +110,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+# outermost, so latency includes the other middleware
+app.add_middleware(MetricsMiddleware, profiler=query_profiler)
+instrument_engine(engine, "sync")
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine, "async")
 
 # Include routers
 app.include_router(auth.router)
@@ -42,7 +124,28 @@ app.include_router(projects.router)
 app.include_router(analytics.router)
 app.include_router(chat.router)
 app.include_router(signaling_server.router)
+# uploaded image variants: content-addressed, served with immutable caching
+app.mount(IMAGE_URL_PATH, MediaFiles(directory=image_store.root, check_dir=False), name="media")
+
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to Portfolio Showcase API"}
+
+
+def metrics_auth(request: Request):
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(metrics_auth)])
+async def metrics():
+    """Prometheus text exposition of request, database and threadpool metrics."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
+if query_profiler is not None:
+    @app.get("/debug/query-profile", include_in_schema=False)
+    def query_profile():
+        """QUERY_PROFILE=1 only: per-endpoint statement counts and slow-query plans."""
+        return query_profiler.report(engine)
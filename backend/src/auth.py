@@ -1,14 +1,16 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
+import uuid
 from dotenv import load_dotenv
-from .db.database import get_db
+from .db.database import get_async_db
 from .db import models, schemas
+from .principal_cache import principal_cache
+from .password_hasher import pwd_context
 
 load_dotenv()
 
@@ -16,8 +18,9 @@ load_dotenv()
 SECRET_KEY = os.getenv("JWT_SECRET", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+# 1 = resolve every request against the database, bypassing the principal cache
+AUTH_STRICT = os.getenv("AUTH_STRICT", "0") == "1"
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
 
@@ -36,40 +39,105 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    # token id: key for the principal cache
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-async def get_current_user(
-        token: str = Depends(oauth2_scheme),
-        db: Session = Depends(get_db)
-) -> models.User:
-    credentials_exception = HTTPException(
+def user_claims(user: models.User) -> dict:
+    """Claims identifying `user` in an access token."""
+    return {"sub": user.email, "uid": user.id, "adm": bool(user.is_admin)}
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _decode_token(token: str) -> schemas.TokenData:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(email=email)
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    email: str = payload.get("sub")
+    if email is None:
+        raise _credentials_exception()
+    return schemas.TokenData(
+        email=email,
+        user_id=payload.get("uid"),
+        is_admin=payload.get("adm"),
+        jti=payload.get("jti"),
+    )
 
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
+
+def _load_user(session, token_data: schemas.TokenData) -> Optional[models.User]:
+    # older tokens only carry the email
+    q = session.query(models.User)
+    if token_data.user_id is not None:
+        q = q.filter(models.User.id == token_data.user_id)
+    user = q.filter(models.User.email == token_data.email).first()
+    if user is not None:
+        # detach so the instance can be cached and shared across requests
+        session.expunge(user)
+    return user
+
+
+async def _resolve_user(token: str, db: AsyncSession, strict: bool) -> models.User:
+    # 1) Signature and expiry are checked on every request
+    token_data = _decode_token(token)
+
+    # 2) A token already resolved recently skips the database
+    cacheable = token_data.jti is not None
+    if cacheable and not (strict or AUTH_STRICT):
+        user = principal_cache.get(token_data.jti)
+        if user is not None:
+            return user
+
+    # 3) Otherwise the database decides; the admin claim is never trusted alone
+    user = await db.run_sync(_load_user, token_data)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    if cacheable:
+        principal_cache.put(token_data.jti, user)
     return user
 
 
-async def get_current_active_admin(
-        current_user: models.User = Depends(get_current_user),
+async def get_current_user(
+        token: str = Depends(oauth2_scheme),
+        db: AsyncSession = Depends(get_async_db)
+) -> models.User:
+    return await _resolve_user(token, db, strict=False)
+
+
+async def get_current_user_strict(
+        token: str = Depends(oauth2_scheme),
+        db: AsyncSession = Depends(get_async_db)
 ) -> models.User:
+    """Like `get_current_user` but always reads the user from the database."""
+    return await _resolve_user(token, db, strict=True)
+
+
+def _require_admin(current_user: models.User) -> models.User:
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="The user doesn't have enough privileges"
         )
     return current_user
+
+
+async def get_current_active_admin(
+        current_user: models.User = Depends(get_current_user),
+) -> models.User:
+    return _require_admin(current_user)
+
+
+async def get_current_active_admin_strict(
+        current_user: models.User = Depends(get_current_user_strict),
+) -> models.User:
+    """Admin check against the live users row, for destructive operations."""
+    return _require_admin(current_user)
@@ -0,0 +1,152 @@
+# src/chat_context.py
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, true, tuple_, update
+from sqlalchemy.orm import Session
+
+from .db import models
+
+# Prompt budget for summary + recent turns (the new message comes on top).
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "1024"))
+# Hard cap on rows read per turn, whatever the budget.
+CHAT_CONTEXT_MAX_MESSAGES = int(os.getenv("CHAT_CONTEXT_MAX_MESSAGES", "40"))
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "200"))
+CHAT_SUMMARY_BATCH = int(os.getenv("CHAT_SUMMARY_BATCH", "20"))
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation so far in a few sentences. Keep any facts, "
+    "names and preferences the user shared; drop greetings and filler."
+)
+
+ROLES = {"user": "user", "bot": "assistant"}
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Cheap tokenizer-free estimate (~4 characters per token, plus framing)."""
+    return len(text) // 4 + 4 if text else 0
+
+
+@dataclass
+class ChatContext:
+    summary: Optional[str] = None
+    turns: List[Dict[str, str]] = field(default_factory=list)
+    # id of the oldest message kept verbatim; older unsummarized rows exist
+    # before it when `needs_summary` is set
+    oldest_turn_id: Optional[int] = None
+    needs_summary: bool = False
+
+    @property
+    def has_history(self) -> bool:
+        return bool(self.summary or self.turns)
+
+    def as_messages(self) -> List[Dict[str, str]]:
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"})
+        return messages + self.turns
+
+
+# Messages are ordered by (timestamp, id) everywhere: a turn's user message
+# carries the time it was sent but is inserted after the reply, so ids
+# alone disagree with the conversation order.
+_ORDER = tuple_(models.ChatMessage.timestamp, models.ChatMessage.id)
+
+
+def _position(session: Session, message_id: int):
+    """(timestamp, id) of a message, to compare other messages against."""
+    timestamp = session.query(models.ChatMessage.timestamp).filter_by(id=message_id).scalar()
+    # a deleted mark falls back to id order rather than matching nothing
+    return tuple_(timestamp, message_id) if timestamp is not None else None
+
+
+def _after(session: Session, message_id: int):
+    """Filter for the messages after `message_id` in conversation order."""
+    if not message_id:
+        return true()
+    mark = _position(session, message_id)
+    return _ORDER > mark if mark is not None else models.ChatMessage.id > message_id
+
+
+def load_context(session: Session, session_id: int) -> ChatContext:
+    """
+    Recent messages of a session that fit in CHAT_CONTEXT_TOKENS, newest
+    kept first, after the stored rolling summary.
+    """
+    chat_session = session.get(models.ChatSession, session_id)
+    summary = chat_session.summary if chat_session else None
+    floor = (chat_session.summarized_until_id if chat_session else None) or 0
+
+    rows = (
+        session.query(models.ChatMessage.id, models.ChatMessage.sender, models.ChatMessage.message)
+        .filter(models.ChatMessage.session_id == session_id, _after(session, floor))
+        .order_by(models.ChatMessage.timestamp.desc(), models.ChatMessage.id.desc())
+        .limit(CHAT_CONTEXT_MAX_MESSAGES + 1)
+        .all()
+    )
+
+    budget = CHAT_CONTEXT_TOKENS - estimate_tokens(summary)
+    kept = []
+    for row in rows[:CHAT_CONTEXT_MAX_MESSAGES]:
+        cost = estimate_tokens(row.message)
+        if cost > budget:
+            break
+        budget -= cost
+        kept.append(row)
+
+    return ChatContext(
+        summary=summary,
+        turns=[
+            {"role": ROLES[getattr(r.sender, "value", r.sender)], "content": r.message}
+            for r in reversed(kept)
+        ],
+        oldest_turn_id=kept[-1].id if kept else None,
+        needs_summary=len(rows) > len(kept),
+    )
+
+
+def load_summary_batch(session: Session, session_id: int, before_id: Optional[int]):
+    """
+    The stored summary plus the oldest unsummarized messages, up to
+    CHAT_SUMMARY_BATCH, that are no longer in the verbatim window.
+    """
+    chat_session = session.get(models.ChatSession, session_id)
+    floor = chat_session.summarized_until_id or 0
+    q = session.query(models.ChatMessage).filter(
+        models.ChatMessage.session_id == session_id, _after(session, floor)
+    )
+    if before_id is not None:
+        mark = _position(session, before_id)
+        q = q.filter(_ORDER < mark if mark is not None else models.ChatMessage.id < before_id)
+    batch = (
+        q.order_by(models.ChatMessage.timestamp.asc(), models.ChatMessage.id.asc())
+        .limit(CHAT_SUMMARY_BATCH)
+        .all()
+    )
+    return chat_session.summary, floor, [
+        (m.id, ROLES[getattr(m.sender, "value", m.sender)], m.message) for m in batch
+    ]
+
+
+def summary_request(previous: Optional[str], batch) -> List[Dict[str, str]]:
+    transcript = "\n".join(f"{role}: {text}" for _, role, text in batch)
+    body = f"Previous summary: {previous}\n\nNew messages:\n{transcript}" if previous else transcript
+    return [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {"role": "user", "content": body},
+    ]
+
+
+def store_summary(session: Session, session_id: int, expected_floor: int, summary: str, until_id: int) -> bool:
+    """Save a new rolling summary unless another writer moved the mark first."""
+    updated = session.execute(
+        update(models.ChatSession)
+        .where(
+            models.ChatSession.id == session_id,
+            func.coalesce(models.ChatSession.summarized_until_id, 0) == expected_floor,
+        )
+        .values(summary=summary, summarized_until_id=until_id)
+    ).rowcount
+    session.commit()
+    return bool(updated)
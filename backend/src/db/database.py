@@ -1,9 +1,14 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from fastapi.concurrency import run_in_threadpool
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
+from ..metrics import TimedAsyncQueuePool, TimedQueuePool
+
 load_dotenv()
 
 # Get database URL from environment variable
@@ -20,6 +25,9 @@ engine = create_engine(
     max_overflow=10,
     pool_timeout=30,
     pool_recycle=1800,  # Recycle connections after 30 minutes
+    # times checkout waits under the name main.py instruments it with
+    poolclass=TimedQueuePool,
+    pool_logging_name="sync",
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -32,4 +40,67 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+# ─── Optional async engine ────────────────────────────────────────────
+# DB_ASYNC=1 serves the async routes from an AsyncSession over asyncpg.
+# The sync engine above stays in use for scripts (init_db, maintenance)
+# and the background writers.
+DB_ASYNC = os.getenv("DB_ASYNC", "0").lower() in ("1", "true", "yes")
+
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    _url = make_url(SQLALCHEMY_DATABASE_URL)
+    _query = dict(_url.query)
+    # asyncpg has no `sslmode`; map the common libpq values onto `ssl`
+    _sslmode = _query.pop("sslmode", None)
+    async_engine = create_async_engine(
+        _url.set(drivername="postgresql+asyncpg", query=_query),
+        connect_args={"ssl": "require"} if _sslmode in ("require", "verify-ca", "verify-full") else {},
+        pool_size=5,
+        max_overflow=10,
+        pool_timeout=30,
+        pool_recycle=1800,
+        poolclass=TimedAsyncQueuePool,
+        pool_logging_name="async",
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+class ThreadedSession:
+    """
+    A sync Session behind the `run_sync` API of AsyncSession, so async
+    routes work the same in both modes: the callable runs on the threadpool
+    here, and in a greenlet over asyncpg with DB_ASYNC=1.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+
+@asynccontextmanager
+async def async_session_scope():
+    """AsyncSession (DB_ASYNC=1) or ThreadedSession, closed on exit."""
+    if DB_ASYNC:
+        async with AsyncSessionLocal() as session:
+            yield session
+    else:
+        db = SessionLocal()
+        try:
+            yield ThreadedSession(db)
+        finally:
+            await run_in_threadpool(db.close)
+
+
+# Async dependency
+async def get_async_db():
+    async with async_session_scope() as session:
+        yield session
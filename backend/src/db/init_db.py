@@ -4,6 +4,7 @@ import os
 from dotenv import load_dotenv
 from .database import Base
 from ..auth import get_password_hash
+from ..project_search import install_search_vector
 
 load_dotenv()
 
@@ -23,6 +24,7 @@ def init_db():
 
     # Create all tables
     Base.metadata.create_all(bind=engine)
+    install_search_vector(engine)
 
     # Create session
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
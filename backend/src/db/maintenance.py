@@ -0,0 +1,150 @@
+import argparse
+from sqlalchemy import text
+from dotenv import load_dotenv
+from .database import SessionLocal, engine
+from .models import Base
+from ..project_search import SEARCH_VECTOR_DDL
+
+load_dotenv()
+
+# Indexes/columns added after the first release. `create_all` only creates
+# missing tables, so existing databases pick these up via `upgrade-schema`.
+SCHEMA_UPGRADES = [
+    "CREATE INDEX IF NOT EXISTS ix_page_views_timestamp ON page_views (timestamp)",
+    "CREATE INDEX IF NOT EXISTS ix_projects_tech_tags ON projects USING gin (tech_tags)",
+    "CREATE INDEX IF NOT EXISTS ix_projects_created_at_id ON projects (created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_comments_project_created_at_id"
+    " ON comments (project_id, created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_chat_messages_session_timestamp ON chat_messages (session_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS ix_chat_messages_session_id_id ON chat_messages (session_id, id)",
+    "ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS summary TEXT",
+    "ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS summarized_until_id INTEGER",
+    "ALTER TABLE projects ADD COLUMN IF NOT EXISTS json_head BYTEA",
+    "ALTER TABLE projects ADD COLUMN IF NOT EXISTS search_vector TSVECTOR",
+    "ALTER TABLE projects ADD COLUMN IF NOT EXISTS image_sets JSONB",
+    # optional in the API, so an omitted value is stored as NULL
+    "ALTER TABLE projects ALTER COLUMN detail_desc DROP NOT NULL",
+    "ALTER TABLE projects ALTER COLUMN thumbnail DROP NOT NULL",
+    "ALTER TABLE projects ALTER COLUMN github_url DROP NOT NULL",
+    "CREATE INDEX IF NOT EXISTS ix_projects_search_vector ON projects USING gin (search_vector)",
+    # room versions come from a sequence now; start it past the per-room counters
+    "SELECT setval('signaling_room_version_seq', GREATEST("
+    "(SELECT coalesce(max(version), 1) FROM signaling_rooms),"
+    " (SELECT last_value FROM signaling_room_version_seq)))",
+    *SEARCH_VECTOR_DDL,
+]
+
+
+# One-off data fixes. Unlike SCHEMA_UPGRADES they are not safe to repeat, so
+# each runs once per database and is then recorded in `schema_migrations`.
+DATA_MIGRATIONS = {
+    # JSON heads rendered before imageSets existed; re-rendered by upgrade_schema
+    "project-json-image-sets": (
+        "UPDATE projects SET json_head = NULL"
+        " WHERE json_head IS NOT NULL AND position('\"imageSets\"'::bytea IN json_head) = 0"
+    ),
+}
+
+
+def apply_data_migrations(conn) -> list:
+    """Run the data migrations this database has not had yet; returns their names."""
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations"
+        " (name VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+    ))
+    done = set(conn.execute(text("SELECT name FROM schema_migrations")).scalars())
+    applied = []
+    for name, stmt in DATA_MIGRATIONS.items():
+        if name in done:
+            continue
+        conn.execute(text(stmt))
+        conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": name})
+        applied.append(name)
+    return applied
+
+
+def upgrade_schema():
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for stmt in SCHEMA_UPGRADES:
+            conn.execute(text(stmt))
+        applied = apply_data_migrations(conn)
+    render_missing_project_json()
+    print(f"Schema up to date ({len(SCHEMA_UPGRADES)} upgrade statements, "
+          f"data migrations applied: {', '.join(applied) or 'none'}).")
+
+
+def backfill_daily_views():
+    from ..view_rollup import backfill_daily_views as backfill
+    db = SessionLocal()
+    try:
+        rows = backfill(db)
+        print(f"Backfilled {rows} page_views_daily rows.")
+    finally:
+        db.close()
+
+
+def repair_comment_counts():
+    """Reconcile projects.comments with the actual rows in `comments`."""
+    with engine.begin() as conn:
+        result = conn.execute(text("""
+            UPDATE projects p
+            SET comments = COALESCE(c.cnt, 0)
+            FROM projects p2
+            LEFT JOIN (
+                SELECT project_id, count(*) AS cnt FROM comments GROUP BY project_id
+            ) c ON c.project_id = p2.id
+            WHERE p.id = p2.id AND p.comments IS DISTINCT FROM COALESCE(c.cnt, 0)
+        """))
+    print(f"Repaired comment counts on {result.rowcount} projects.")
+
+
+def repair_project_urls():
+    """Turn the literal "None" that create_project used to store for omitted URLs back into NULL."""
+    with engine.begin() as conn:
+        result = conn.execute(text("""
+            UPDATE projects
+            SET thumbnail = NULLIF(thumbnail, 'None'),
+                demo_url = NULLIF(demo_url, 'None'),
+                github_url = NULLIF(github_url, 'None'),
+                json_head = NULL
+            WHERE 'None' IN (thumbnail, demo_url, github_url)
+        """))
+    render_missing_project_json()
+    print(f"Repaired URLs on {result.rowcount} projects.")
+
+
+def render_missing_project_json():
+    from ..project_json import backfill
+    db = SessionLocal()
+    try:
+        backfill(db)
+    finally:
+        db.close()
+
+
+def render_project_json():
+    """(Re)render every project's stored JSON head, e.g. after SQL edits."""
+    from ..project_json import backfill
+    db = SessionLocal()
+    try:
+        rows = backfill(db, only_missing=False)
+        print(f"Rendered JSON for {rows} projects.")
+    finally:
+        db.close()
+
+
+COMMANDS = {
+    "upgrade-schema": upgrade_schema,
+    "backfill-daily-views": backfill_daily_views,
+    "repair-comment-counts": repair_comment_counts,
+    "repair-project-urls": repair_project_urls,
+    "render-project-json": render_project_json,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Database maintenance commands")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    COMMANDS[args.command]()
@@ -1,7 +1,9 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, Text, ARRAY, ForeignKey, DateTime, CheckConstraint, Enum
+from sqlalchemy import Column, Integer, String, Boolean, Text, ForeignKey, DateTime, Date, CheckConstraint, Enum, Index, LargeBinary, Sequence
+# the PostgreSQL ARRAY provides contains (@>) / overlap (&&) for tag filters
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 import uuid
 import enum
@@ -26,16 +28,33 @@ class Project(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), unique=True, nullable=False)
     short_desc = Column(Text, nullable=False)
-    detail_desc = Column(Text, nullable=False)
+    detail_desc = Column(Text, nullable=True)
     tech_tags = Column(ARRAY(String), nullable=False)
-    thumbnail = Column(String, nullable=False)
+    thumbnail = Column(String, nullable=True)
     view_count = Column(Integer, nullable=True)
     images = Column(ARRAY(String))
-    comments = Column(Integer, nullable=True)
+    # uploaded image URL (thumbnail or images entry) -> variants, see src/image_pipeline.py
+    image_sets = Column(JSONB)
+    # denormalized comment count, kept in step by add_comment/delete_comment
+    comments = Column(Integer, nullable=True, default=0)
     demo_url = Column(String)
-    github_url = Column(String, nullable=False)
+    github_url = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # pre-rendered camelCase JSON of the stable fields, open-ended so the
+    # counters can be appended (see src/project_json.py)
+    json_head = deferred(Column(LargeBinary))
+    # weighted title/tags/descriptions, maintained by a trigger (see src/project_search.py)
+    search_vector = deferred(Column(TSVECTOR))
+
+    __table_args__ = (
+        # serves `tech_tags @> ARRAY[...]` filters and tag aggregation
+        Index("ix_projects_tech_tags", "tech_tags", postgresql_using="gin"),
+        # keyset pagination order for list_projects
+        Index("ix_projects_created_at_id", created_at.desc(), id.desc()),
+        # full-text matches for /projects/search
+        Index("ix_projects_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
 
 class Comment(Base):
@@ -47,6 +66,11 @@ class Comment(Base):
     content = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # keyset pagination order for list_comments
+        Index("ix_comments_project_created_at_id", project_id, created_at.desc(), id.desc()),
+    )
+
 
 class PageView(Base):
     __tablename__ = "page_views"
@@ -56,7 +80,36 @@ class PageView(Base):
     path = Column(String, nullable=False)
     user_agent = Column(String)
     ip_address = Column(String)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class PageViewDaily(Base):
+    """Per-project, per-UTC-day view counts maintained alongside `page_views`."""
+    __tablename__ = "page_views_daily"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True, index=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+# shared by every room, so versions keep growing when an expired room is
+# created again and clients holding an old version still see a change
+signaling_room_version_seq = Sequence("signaling_room_version_seq", metadata=Base.metadata)
+
+
+class SignalingRoom(Base):
+    """Shared signalling state, one row per room, for multi-worker deployments."""
+    __tablename__ = "signaling_rooms"
+
+    room = Column(String(64), primary_key=True)
+    invite_link = Column(Text, nullable=True)
+    share_link = Column(Text, nullable=True)
+    guest_count = Column(Integer, nullable=False, default=0)
+    expected_guests = Column(Integer, nullable=False, default=0)
+    # next value of signaling_room_version_seq on every change; long-poll and
+    # event-stream clients compare it
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=False, index=True)
 
 
 class SenderType(enum.Enum):
@@ -69,6 +122,10 @@ class ChatSession(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    # rolling summary of every message up to and including summarized_until_id,
+    # in (timestamp, id) order
+    summary = Column(Text, nullable=True)
+    summarized_until_id = Column(Integer, nullable=True)
 
     messages = relationship(
         "ChatMessage",
@@ -82,6 +139,10 @@ class ChatMessage(Base):
     __table_args__ = (
         # still useful if you prefer strings over Enum
         CheckConstraint("sender IN ('user','bot')", name="valid_sender"),
+        # recent-window reads for conversation context
+        Index("ix_chat_messages_session_timestamp", "session_id", "timestamp"),
+        # incremental/paged history fetches range-scan by id within a session
+        Index("ix_chat_messages_session_id_id", "session_id", "id"),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -99,3 +160,8 @@ class ChatMessage(Base):
         "ChatSession",
         back_populates="messages",
     )
+
+
+# Registers the ORM hooks that keep Project.json_head current, so every writer
+# that imports the models (scripts and tests too, not only the API) renders it.
+from .. import project_json  # noqa: E402,F401
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, HttpUrl, ConfigDict, field_validator, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 
@@ -73,8 +73,19 @@ class ProjectUpdate(ProjectBase):
     pass
 
 
+class ImageSet(BaseModel):
+    """Resized variants of an uploaded image, ready for <img srcset> / <picture>."""
+    src: str
+    width: int
+    height: int
+    # MIME type -> srcset string ("url 320w, url 640w, ...")
+    srcset: Dict[str, str]
+
+
 class Project(ProjectBase):
     id: int
+    # keyed by the `thumbnail` / `images` URL they belong to; uploaded images only
+    image_sets: Dict[str, ImageSet] = {}
     created_at: datetime
     updated_at: datetime
     view_count: int
@@ -83,12 +94,42 @@ class Project(ProjectBase):
         **ProjectBase.model_config,
     )
 
+    @field_validator("image_sets", mode="before")
+    def ensure_image_sets(cls, v):
+        return v or {}
+
     @field_validator("comments", mode="before")
     def ensure_comments_list(cls, v):
         # if the ORM attr is None, turn it into []
         return [] if v is None else v
 
 
+class ProjectPage(BaseModel):
+    """`list_projects` body with `facets=true`."""
+    items: List[Project]
+    # projects matching the tag filter, across all pages
+    total: int
+    # tag -> matching projects carrying it
+    facets: Dict[str, int]
+
+
+class ProjectSearchHit(BaseModel):
+    project: Project
+    rank: float
+    # HTML-escaped, matches wrapped in <mark>
+    title_highlight: str
+    snippet: str
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
+
+
+class ProjectSearchPage(BaseModel):
+    query: str
+    total: int
+    limit: int
+    offset: int
+    results: List[ProjectSearchHit]
+
+
 # Auth schemas
 class Token(BaseModel):
     access_token: str
@@ -98,6 +139,9 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    user_id: Optional[int] = None
+    is_admin: Optional[bool] = None
+    jti: Optional[str] = None
 
 
 class ChatMessageIn(BaseModel):
@@ -127,10 +171,17 @@ class ChatMessageOut(BaseModel):
     # enable ORM mode under Pydantic v2
     model_config = ConfigDict(from_attributes=True)
 
+    @field_validator("session_id", "sender", mode="before")
+    def coerce_to_str(cls, v):
+        # ORM gives an int session id and a SenderType enum
+        return str(getattr(v, "value", v))
+
 
 class ChatHistoryOut(BaseModel):
     session_id: str
     messages: List[ChatMessageOut]
+    # more messages exist beyond this page in the direction that was fetched
+    has_more: bool = False
 
 
 # Analytics schemas
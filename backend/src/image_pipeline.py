@@ -0,0 +1,204 @@
+# src/image_pipeline.py
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.staticfiles import StaticFiles
+from PIL import Image, ImageOps
+
+# 0 decodes on the threadpool instead of in worker processes
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(2, os.cpu_count() or 1))))
+# uploads decoding or waiting; beyond this the upload endpoint answers 503
+IMAGE_MAX_PENDING = int(os.getenv("IMAGE_MAX_PENDING", "8"))
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(15 * 1024 * 1024)))
+# refuse to decode anything larger (decompression bombs)
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(50_000_000)))
+IMAGE_WIDTHS = tuple(sorted(int(w) for w in os.getenv("IMAGE_WIDTHS", "320,640,1280,1920").split(",")))
+# width of the JPEG used as the plain `src` (thumbnail/images URL)
+IMAGE_DEFAULT_WIDTH = int(os.getenv("IMAGE_DEFAULT_WIDTH", "640"))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_STORAGE_DIR = os.getenv("IMAGE_STORAGE_DIR", "media")
+# where the storage directory is served; IMAGE_PUBLIC_URL (e.g. a CDN) overrides
+# the URLs written into projects, which otherwise use the request's host
+IMAGE_URL_PATH = "/media"
+IMAGE_PUBLIC_URL = os.getenv("IMAGE_PUBLIC_URL", "")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+# Variant = (format, width, height, encoded bytes)
+Variant = Tuple[str, int, int, bytes]
+
+
+class InvalidImage(Exception):
+    """The upload is not an image Pillow can decode, or is too large."""
+
+
+# Runs inside the worker processes; they import only this module.
+def _render_variants(
+        data: bytes, widths: Sequence[int], quality: int, max_pixels: int,
+) -> Tuple[int, int, List[Variant]]:
+    try:
+        with Image.open(io.BytesIO(data)) as probe:
+            # only the header is read so far
+            if probe.width * probe.height > max_pixels:
+                raise InvalidImage(f"Image is larger than {max_pixels} pixels")
+            probe.verify()
+        image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+        image.load()
+    except InvalidImage:
+        raise
+    except Exception:
+        raise InvalidImage("Not a supported image file") from None
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    if has_alpha:
+        # JPEG has no alpha channel: flatten onto white
+        flat = Image.new("RGB", image.size, (255, 255, 255))
+        flat.paste(image, mask=image.getchannel("A"))
+    else:
+        flat = image
+
+    orig_w, orig_h = image.size
+    variants: List[Variant] = []
+    sources = {"webp": image, "jpeg": flat}
+    # largest first, each width resized from the previous one rather than the
+    # original; never upscale (a narrower image gets its own size instead)
+    for width in sorted({min(w, orig_w) for w in widths}, reverse=True):
+        height = max(1, round(orig_h * width / orig_w))
+        for fmt in FORMATS:
+            sources[fmt] = sources[fmt].resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+            out = io.BytesIO()
+            if fmt == "webp":
+                sources[fmt].save(out, "WEBP", quality=quality, method=4)
+            else:
+                sources[fmt].save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+            variants.append((fmt, width, height, out.getvalue()))
+    variants.reverse()
+    return orig_w, orig_h, variants
+
+
+class ImageStore:
+    """Content-addressed files under `root`: identical variants are stored once."""
+
+    def __init__(self, root: str = IMAGE_STORAGE_DIR):
+        self.root = Path(root)
+
+    def ensure_dir(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def put(self, data: bytes, ext: str) -> str:
+        """Store `data` if new; returns its path relative to the root."""
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        relative = f"{digest[:2]}/{digest[2:]}.{ext}"
+        path = self.root / relative
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        return relative
+
+
+class ImagePipelineBusy(Exception):
+    """Too many uploads are already being processed."""
+
+    retry_after = 2
+
+
+class ImagePipeline:
+    """
+    Decodes uploads and renders resized WebP/JPEG variants in a small
+    process pool (started on first use), then stores them in `store`.
+    """
+
+    def __init__(
+            self,
+            store: ImageStore,
+            workers: int = IMAGE_WORKERS,
+            max_pending: int = IMAGE_MAX_PENDING,
+            widths: Sequence[int] = IMAGE_WIDTHS,
+    ):
+        self.store = store
+        self.workers = workers
+        self.max_pending = max_pending
+        self.widths = tuple(widths)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that runs writer threads is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    async def _render(self, data: bytes) -> Tuple[int, int, List[Variant]]:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise ImagePipelineBusy()
+            self._pending += 1
+        try:
+            args = (data, self.widths, IMAGE_QUALITY, IMAGE_MAX_PIXELS)
+            if self.workers <= 0:
+                return await run_in_threadpool(_render_variants, *args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), _render_variants, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def ingest(self, data: bytes, base_url: str) -> Dict:
+        """
+        Render and store the variants of one upload. Returns its image set:
+        `src` (a JPEG near IMAGE_DEFAULT_WIDTH), intrinsic size and a
+        `srcset` string per MIME type, with URLs under `base_url`.
+        """
+        width, height, variants = await self._render(data)
+
+        def store() -> List[Tuple[str, int, str]]:
+            return [(fmt, w, self.store.put(body, fmt)) for fmt, w, _, body in variants]
+
+        stored = await run_in_threadpool(store)
+        base_url = base_url.rstrip("/")
+        srcset = {
+            FORMATS[fmt]: ", ".join(f"{base_url}/{path} {w}w" for f, w, path in stored if f == fmt)
+            for fmt in FORMATS
+        }
+        jpegs = [(w, path) for fmt, w, path in stored if fmt == "jpeg"]
+        _, src_path = max((j for j in jpegs if j[0] <= IMAGE_DEFAULT_WIDTH), default=jpegs[0])
+        return {"src": f"{base_url}/{src_path}", "width": width, "height": height, "srcset": srcset}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+class MediaFiles(StaticFiles):
+    """Stored variants never change under a given name, so cache them for good."""
+
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE
+        return response
+
+
+image_store = ImageStore()
+image_pipeline = ImagePipeline(image_store)
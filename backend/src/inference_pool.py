@@ -0,0 +1,236 @@
+# src/inference_pool.py
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Hashable
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "4"))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "16"))
+
+_DONE = object()
+
+
+class InferencePoolSaturated(Exception):
+    """Every worker is busy and the wait queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference pool saturated")
+        self.retry_after = retry_after
+
+
+class LatencyStats:
+    """Count/sum plus a window of recent samples for percentiles."""
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.total = 0.0
+        self._recent: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self._recent.append(seconds)
+
+    def mean(self) -> float:
+        with self._lock:
+            return self.total / self.count if self.count else 0.0
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            recent = sorted(self._recent)
+            count, total = self.count, self.total
+
+        def pct(p: float) -> float:
+            return recent[min(len(recent) - 1, int(p * len(recent)))] if recent else 0.0
+
+        return {
+            "count": count,
+            "avg_ms": round(total / count * 1000, 2) if count else 0.0,
+            "p50_ms": round(pct(0.50) * 1000, 2),
+            "p95_ms": round(pct(0.95) * 1000, 2),
+            "max_ms": round(recent[-1] * 1000, 2) if recent else 0.0,
+        }
+
+
+class InferencePool:
+    """
+    Dedicated, size-limited executor for blocking inference calls.
+
+    At most `workers` calls run at once and at most `queue_size` more may
+    wait; beyond that callers get `InferencePoolSaturated` straight away
+    instead of tying up Starlette's shared threadpool. Identical in-flight
+    requests (same key) share one call.
+    """
+
+    def __init__(self, workers: int = INFERENCE_WORKERS, queue_size: int = INFERENCE_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._admitted = 0
+        self._running = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.coalesced = 0
+        self.wait_time = LatencyStats()
+        self.latency = LatencyStats()
+
+    # ─── admission ───────────────────────────────────────────────────
+    def _admit(self) -> None:
+        with self._lock:
+            if self._admitted >= self.workers + self.queue_size:
+                self.rejected += 1
+                raise InferencePoolSaturated(self._retry_after())
+            self._admitted += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._admitted -= 1
+
+    def _retry_after(self) -> int:
+        # roughly how long until a queue slot frees up
+        return max(1, math.ceil(self.latency.mean() * (1 + self.queue_size / self.workers)))
+
+    def _call(self, submitted_at: float, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        started = time.monotonic()
+        self.wait_time.observe(started - submitted_at)
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+            self.latency.observe(time.monotonic() - started)
+
+    # ─── public API ──────────────────────────────────────────────────
+    async def run(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """Run `fn` on the pool, joining an identical in-flight call if any."""
+        existing = self._inflight.get(key)
+        if existing is not None:
+            self.coalesced += 1
+            return await asyncio.shield(existing)
+
+        self._admit()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, self._call, time.monotonic(), fn, args, kwargs)
+        self._inflight[key] = future
+
+        def finished(_):
+            # runs when the call ends, even if every waiter has gone away
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            self._release()
+
+        future.add_done_callback(finished)
+        return await asyncio.shield(future)
+
+    def stream(self, fn: Callable, *args, **kwargs) -> "PooledStream":
+        """
+        Run a blocking iterator factory on the pool and relay its items.
+        Admission happens here, before the caller starts responding.
+        """
+        self._admit()
+        return PooledStream(self, time.monotonic(), fn, args, kwargs)
+
+    async def _relay(self, submitted_at: float, fn: Callable, args: tuple, kwargs: dict) -> AsyncIterator[Any]:
+        # owns the admission slot from its first step: released when it ends
+        producer = None
+        cancelled = threading.Event()
+        try:
+            loop = asyncio.get_running_loop()
+            queue: asyncio.Queue = asyncio.Queue()
+
+            def produce():
+                try:
+                    for item in fn(*args, **kwargs):
+                        if cancelled.is_set():
+                            break
+                        loop.call_soon_threadsafe(queue.put_nowait, item)
+                except Exception as exc:
+                    loop.call_soon_threadsafe(queue.put_nowait, exc)
+                finally:
+                    loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+            producer = loop.run_in_executor(self._executor, self._call, submitted_at, produce, (), {})
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # consumer went away or finished: stop the producer between chunks
+            cancelled.set()
+            if producer is None:
+                self._release()
+            else:
+                producer.add_done_callback(lambda _: self._release())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            admitted, running = self._admitted, self._running
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "running": running,
+            "queue_depth": max(0, admitted - running),
+            "rejected": self.rejected,
+            "coalesced": self.coalesced,
+            "wait_time": self.wait_time.snapshot(),
+            "latency": self.latency.snapshot(),
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PooledStream:
+    """
+    Items of one `InferencePool.stream` call. It holds an admission slot
+    from creation, so a stream that is never iterated (the client left
+    first) must still give it back: on `aclose()` or when collected.
+    """
+
+    def __init__(self, pool: InferencePool, submitted_at: float, fn: Callable, args: tuple, kwargs: dict):
+        self._pool = pool
+        self._call = (submitted_at, fn, args, kwargs)
+        self._relay = None
+        self._held = True
+        self._lock = threading.Lock()
+
+    def _take_slot(self) -> bool:
+        with self._lock:
+            held, self._held = self._held, False
+            return held
+
+    def __aiter__(self) -> "PooledStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        if self._relay is None:
+            if not self._take_slot():
+                raise StopAsyncIteration
+            # the relay releases the slot from here on
+            self._relay = self._pool._relay(*self._call)
+        return await self._relay.__anext__()
+
+    async def aclose(self) -> None:
+        if self._relay is not None:
+            await self._relay.aclose()
+        elif self._take_slot():
+            self._pool._release()
+
+    def __del__(self) -> None:
+        if self._held and self._take_slot():
+            self._pool._release()
+
+
+inference_pool = InferencePool()
@@ -0,0 +1,322 @@
+# src/metrics.py
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import anyio.to_thread
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+POOL_HOLD_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0)
+# statements per request
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_label_str(self.labels, k)} {v}" for k, v in items]
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, *labels: str) -> None:
+        self.inc(*labels, amount=-1)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        # per label set: [count per bucket (+Inf last)], sum
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][idx] += 1
+            series[1][0] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(counts), total[0]) for k, (counts, total) in self._series.items()]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_label_str(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labels, labels)} {total}")
+            lines.append(f"{self.name}_count{_label_str(self.labels, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+        # callables returning (name, help, {labels: value}) sampled at scrape time
+        self._collectors: List[Callable[[], List[Tuple[str, str, Dict[Labels, float], Sequence[str]]]]] = []
+
+    def add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collect in self._collectors:
+            for name, help, values, label_names in collect():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+                lines += [f"{name}{_label_str(label_names, k)} {v}" for k, v in values.items()]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.add(Histogram(
+    "http_request_duration_seconds", "Request latency by route", LATENCY_BUCKETS, ("method", "route"),
+))
+REQUESTS = registry.add(Counter(
+    "http_requests_total", "Requests by route and status code", ("method", "route", "status"),
+))
+IN_FLIGHT = registry.add(Gauge(
+    "http_requests_in_flight", "Requests currently being served", ("method",),
+))
+REQUEST_QUERIES = registry.add(Histogram(
+    "http_request_db_queries", "SQL statements issued per request", QUERY_COUNT_BUCKETS, ("method", "route"),
+))
+REQUEST_DB_TIME = registry.add(Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request", DB_TIME_BUCKETS, ("method", "route"),
+))
+POOL_WAIT = registry.add(Histogram(
+    "db_pool_checkout_wait_seconds", "Time waiting for a pooled connection", POOL_WAIT_BUCKETS, ("engine",),
+))
+POOL_HOLD = registry.add(Histogram(
+    "db_pool_checkout_seconds", "Time a pooled connection stays checked out", POOL_HOLD_BUCKETS, ("engine",),
+))
+THREADPOOL_SATURATED = registry.add(Counter(
+    "threadpool_saturated_total", "Requests that arrived with every threadpool worker busy",
+))
+
+
+# ─── per-request database attribution ────────────────────────────────
+class RequestStats:
+    __slots__ = ("queries", "db_time", "statements")
+
+    def __init__(self, capture: bool = False):
+        self.queries = 0
+        self.db_time = 0.0
+        # (statement, parameters, seconds) when the query profiler is on
+        self.statements: Optional[list] = [] if capture else None
+
+
+# set by the middleware; copied into threadpool workers with the context
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = current_request.get()
+    if stats is not None:
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.db_time += elapsed
+        if stats.statements is not None:
+            stats.statements.append((statement, parameters, elapsed))
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not run for failed statements
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+class _TimedCheckout:
+    """
+    Times each connect(), i.e. how long a caller waits for a connection
+    (including opening a new one). Labelled by the pool's logging name,
+    which database.py sets to the name instrument_engine() gets.
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - started, self.logging_name or "default")
+
+
+# passed to create_engine(poolclass=...); dispose() recreates the same class
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+_engines: Dict[str, Engine] = {}
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Attribute statements to the current request and time how long connections stay checked out."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+    # checkout wait is timed by the pool class; listening on the engine
+    # keeps these hooks when dispose() replaces its pool
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+
+    def checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is not None:
+            POOL_HOLD.observe(time.perf_counter() - started, name)
+
+    event.listen(engine, "checkout", checkout)
+    event.listen(engine, "checkin", checkin)
+    _engines[name] = engine
+
+
+@registry.collector
+def _pool_gauges():
+    pools = [(n, e.pool) for n, e in _engines.items()]
+    return [
+        ("db_pool_checked_out", "Connections currently checked out",
+         {(n,): p.checkedout() for n, p in pools}, ("engine",)),
+        ("db_pool_size", "Configured pool size", {(n,): p.size() for n, p in pools}, ("engine",)),
+        ("db_pool_overflow", "Connections open beyond the pool size",
+         {(n,): max(0, p.overflow()) for n, p in pools}, ("engine",)),
+    ]
+
+
+@registry.collector
+def _threadpool_gauges():
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return [
+        ("threadpool_busy", "Threadpool workers running sync routes and run_sync calls", {(): limiter.borrowed_tokens}, ()),
+        ("threadpool_capacity", "Threadpool size", {(): limiter.total_tokens}, ()),
+    ]
+
+
+# ─── ASGI middleware ─────────────────────────────────────────────────
+def _route_label(scope, root_path: str) -> str:
+    """
+    The route template once routing has run. A mount (e.g. /media) extends
+    `root_path` with its prefix but sets no route, so its requests are
+    labelled by that prefix rather than lumped in with real 404s.
+    """
+    mount = scope.get("root_path", "")[len(root_path):]
+    route_path = getattr(scope.get("route"), "path", None)
+    if route_path:
+        return mount + route_path
+    if mount:
+        return mount + "/{path:path}"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no per-request task or body buffering): latency,
+    status, in-flight and DB attribution per route template.
+    """
+
+    def __init__(self, app, profiler=None):
+        self.app = app
+        # optional QueryProfiler, handed every request's statements
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        if limiter.borrowed_tokens >= limiter.total_tokens:
+            THREADPOOL_SATURATED.inc()
+
+        stats = RequestStats(capture=self.profiler is not None)
+        token = current_request.set(stats)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if self.profiler is not None:
+                    # statements issued before the response started
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"x-query-count", str(stats.queries).encode()),
+                    ]
+            await send(message)
+
+        root_path = scope.get("root_path", "")
+        started = time.perf_counter()
+        IN_FLIGHT.inc(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec(method)
+            current_request.reset(token)
+            path = _route_label(scope, root_path)
+            REQUEST_LATENCY.observe(elapsed, method, path)
+            REQUESTS.inc(method, path, str(status[0]))
+            REQUEST_QUERIES.observe(stats.queries, method, path)
+            REQUEST_DB_TIME.observe(stats.db_time, method, path)
+            if self.profiler is not None:
+                self.profiler.record(method, path, stats)
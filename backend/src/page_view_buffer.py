@@ -0,0 +1,200 @@
+# src/page_view_buffer.py
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import exc, insert
+
+from .db import models
+from .db.database import SessionLocal
+from .view_rollup import record_daily_views
+from .tag_popularity import tag_popularity_cache
+
+logger = logging.getLogger(__name__)
+
+# "buffered" queues views and writes them in batches; "direct" keeps the
+# old insert-and-commit-per-request behaviour.
+PAGE_VIEW_INGEST_MODE = os.getenv("PAGE_VIEW_INGEST_MODE", "buffered")
+PAGE_VIEW_BUFFER_SIZE = int(os.getenv("PAGE_VIEW_BUFFER_SIZE", "10000"))
+PAGE_VIEW_BATCH_SIZE = int(os.getenv("PAGE_VIEW_BATCH_SIZE", "500"))
+PAGE_VIEW_FLUSH_INTERVAL = float(os.getenv("PAGE_VIEW_FLUSH_INTERVAL", "2"))
+# consecutive failed flushes (database unreachable) before the oldest batch is dropped
+PAGE_VIEW_MAX_RETRIES = int(os.getenv("PAGE_VIEW_MAX_RETRIES", "10"))
+# name of the flusher thread; tests ignore its statements
+THREAD_NAME = "page-view-buffer"
+
+# worth retrying later; any other error is a row the database will never accept
+TRANSIENT_ERRORS = (exc.OperationalError, exc.InterfaceError, exc.TimeoutError)
+
+
+class PageViewBuffer:
+    """
+    Bounded in-memory queue of page-view rows with a background flusher.
+
+    Rows are written with a single multi-row INSERT per batch. When the
+    queue is full new events are rejected (and counted as dropped) instead
+    of growing memory without limit. A batch the database refuses (e.g. an
+    unknown project_id) is retried row by row and the bad rows discarded;
+    one that fails for transient reasons is retried up to `max_retries` times.
+    """
+
+    def __init__(
+            self,
+            max_size: int = PAGE_VIEW_BUFFER_SIZE,
+            batch_size: int = PAGE_VIEW_BATCH_SIZE,
+            flush_interval: float = PAGE_VIEW_FLUSH_INTERVAL,
+            max_retries: int = PAGE_VIEW_MAX_RETRIES,
+    ):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._failures = 0
+        self._rows: Deque[Dict[str, Any]] = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def enqueue(self, views: List[Dict[str, Any]]) -> bool:
+        """
+        Queue a batch of page views (all or nothing).
+        Returns False when there is not enough room left.
+        """
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            if len(self._rows) + len(views) > self.max_size:
+                self.dropped += len(views)
+                return False
+            for v in views:
+                # stamp on arrival, not on flush
+                self._rows.append({**v, "timestamp": v.get("timestamp") or now})
+            self.queued += len(views)
+            backlog = len(self._rows)
+        if backlog >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "flushed": self.flushed,
+                "dropped": self.dropped,
+                "rejected": self.rejected,
+                "depth": len(self._rows),
+                "capacity": self.max_size,
+            }
+
+    def _take(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            n = min(self.batch_size, len(self._rows))
+            return [self._rows.popleft() for _ in range(n)]
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        db = SessionLocal()
+        try:
+            # executemany on psycopg2 is rendered as multi-row VALUES batches
+            db.execute(insert(models.PageView), rows)
+            record_daily_views(db, rows)
+            db.commit()
+        finally:
+            db.close()
+        tag_popularity_cache.note_views(r["timestamp"] for r in rows)
+
+    def _write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Write a batch, or row by row if the database refuses it, discarding
+        the rows it refuses. A transient error propagates, leaving `rows`
+        holding only the rows not yet written.
+        """
+        try:
+            self._write(rows)
+            self._count_flushed(len(rows))
+            return
+        except TRANSIENT_ERRORS:
+            raise
+        except Exception:
+            logger.warning("Page view batch refused; writing its %d rows one by one", len(rows), exc_info=True)
+        while rows:
+            try:
+                self._write(rows[:1])
+                self._count_flushed(1)
+            except TRANSIENT_ERRORS:
+                raise
+            except Exception as e:
+                with self._lock:
+                    self.rejected += 1
+                logger.warning("Discarding page view %r: %s", rows[0], e)
+            del rows[0]
+
+    def _count_flushed(self, n: int) -> None:
+        with self._lock:
+            self.flushed += n
+
+    def _retry_later(self, rows: List[Dict[str, Any]]) -> None:
+        self._failures += 1
+        if self._failures > self.max_retries:
+            self._failures = 0
+            with self._lock:
+                self.dropped += len(rows)
+            logger.exception("Page view flush failed %d times in a row; %d rows dropped",
+                             self.max_retries + 1, len(rows))
+            return
+        # requeue at the front; the next tick retries them
+        with self._lock:
+            self._rows.extendleft(reversed(rows))
+        logger.exception("Page view flush failed; %d rows re-queued", len(rows))
+
+    def flush(self) -> int:
+        """Drain the queue batch by batch. Returns rows written."""
+        with self._lock:
+            before = self.flushed
+        while True:
+            rows = self._take()
+            if not rows:
+                break
+            try:
+                self._write_batch(rows)
+            except TRANSIENT_ERRORS:
+                self._retry_later(rows)
+                break
+            self._failures = 0
+        with self._lock:
+            return self.flushed - before
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=THREAD_NAME, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher thread and write out whatever is still queued."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
+
+
+page_view_buffer = PageViewBuffer()
@@ -0,0 +1,57 @@
+# src/pagination.py
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query as OrmQuery
+
+# Clients get the next page's cursor in this header; the body stays a plain list.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, id_: int) -> str:
+    raw = json.dumps({"c": created_at.isoformat(), "i": id_}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(data["c"]), int(data["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def keyset_page(
+        query: OrmQuery,
+        created_col: Any,
+        id_col: Any,
+        limit: int,
+        cursor: Optional[str],
+        offset: int = 0,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Newest-first page of `query` ordered by (created_at, id), starting
+    after `cursor`, or skipping `offset` rows when there is none (old
+    clients). Returns the rows and the next page's cursor, if any.
+    """
+    query = query.order_by(created_col.desc(), id_col.desc())
+    if cursor:
+        created_at, id_ = decode_cursor(cursor)
+        query = query.filter(tuple_(created_col, id_col) < tuple_(created_at, id_))
+    elif offset:
+        query = query.offset(offset)
+
+    # one extra row tells us whether there is a next page
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, None
@@ -0,0 +1,102 @@
+# src/password_hasher.py
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from passlib.context import CryptContext
+
+# bcrypt cost factor; hashes below it are upgraded on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# 0 hashes on the threadpool instead of in worker processes
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# hashes running or waiting; beyond this login/register answer 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
+
+
+# Run inside the worker processes; they import only this module.
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed)
+
+
+class PasswordHasherBusy(Exception):
+    """Too many hashes are already running or queued."""
+
+    retry_after = 1
+
+
+class PasswordHasher:
+    """
+    bcrypt off the event loop and off the GIL: calls run in a small process
+    pool (started on first use) with a cap on outstanding work.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that runs writer threads is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self._pending += 1
+        try:
+            if self.workers <= 0:
+                return await run_in_threadpool(fn, *args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(matches, replacement hash if the stored one is below the current cost)."""
+        return await self._run(_verify_and_update, password, hashed)
+
+    def warm_up(self) -> None:
+        """Start the worker processes now (blocking) rather than on the first login."""
+        if self.workers > 0:
+            executor = self._get_executor()
+            for future in [executor.submit(_hash, "") for _ in range(self.workers)]:
+                future.result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+password_hasher = PasswordHasher()
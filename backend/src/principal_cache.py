@@ -0,0 +1,96 @@
+# src/principal_cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from sqlalchemy import event, inspect
+
+from .db import models
+
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+# a role change made outside this process shows up after at most this long
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+
+
+@dataclass
+class CachedPrincipal:
+    user: models.User
+    expires_at: float
+
+
+class PrincipalCache:
+    """
+    TTL + LRU cache of resolved users keyed by token id (`jti`), so an
+    authenticated request does not need a users query each time.
+    """
+
+    def __init__(self, max_entries: int = AUTH_CACHE_SIZE, ttl: float = AUTH_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CachedPrincipal]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, jti: str) -> Optional[models.User]:
+        with self._lock:
+            entry = self._entries.get(jti)
+            if entry is None or entry.expires_at < time.monotonic():
+                self._entries.pop(jti, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(jti)
+            self.hits += 1
+            return entry.user
+
+    def put(self, jti: str, user: models.User) -> None:
+        """`user` must be detached from its session; it is shared read-only."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[jti] = CachedPrincipal(user=user, expires_at=time.monotonic() + self.ttl)
+            self._entries.move_to_end(jti)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> int:
+        """Forget every token resolved to this user; returns how many."""
+        with self._lock:
+            keys = [k for k, e in self._entries.items() if e.user.id == user_id]
+            for k in keys:
+                del self._entries[k]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "capacity": self.max_entries,
+            }
+
+
+principal_cache = PrincipalCache()
+
+
+# Role and password changes made through the ORM drop the user's cached
+# principals right away. Bulk `query.update()` calls bypass these hooks and
+# must call `principal_cache.invalidate_user` themselves.
+@event.listens_for(models.User, "after_update")
+def _user_updated(mapper, connection, target: models.User) -> None:
+    state = inspect(target)
+    if state.attrs.is_admin.history.has_changes() or state.attrs.password_hash.history.has_changes():
+        principal_cache.invalidate_user(target.id)
+
+
+@event.listens_for(models.User, "after_delete")
+def _user_deleted(mapper, connection, target: models.User) -> None:
+    principal_cache.invalidate_user(target.id)
@@ -0,0 +1,127 @@
+# src/project_json.py
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, event, inspect, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .db import models, schemas
+
+logger = logging.getLogger(__name__)
+
+# columns rendered into `Project.json_head`; a change to any of them re-renders it
+HEAD_FIELDS = (
+    "title", "short_desc", "detail_desc", "tech_tags", "thumbnail",
+    "images", "demo_url", "github_url", "image_sets", "created_at",
+)
+# fields appended per response, in `schemas.Project` order (they come last)
+TAIL_FIELDS = {"updated_at", "view_count", "comments"}
+
+
+def render_head(project: models.Project) -> bytes:
+    """
+    camelCase JSON of a project's stable fields, validated once through
+    `schemas.Project` and stored without its closing brace so the
+    per-response fields can be appended as bytes.
+    """
+    data = {name: getattr(project, name) for name in HEAD_FIELDS}
+    # image sets of URLs no longer on the project are dropped
+    in_use = {project.thumbnail, *(project.images or ())}
+    data["image_sets"] = {url: s for url, s in (project.image_sets or {}).items() if url in in_use}
+    model = schemas.Project.model_validate({
+        **data, "id": project.id, "updated_at": project.created_at, "view_count": 0, "comments": 0,
+    })
+    body = model.model_dump_json(by_alias=True, exclude=TAIL_FIELDS).encode()
+    return body[:-1]
+
+
+def _isoformat(value: Optional[datetime]) -> str:
+    # matches pydantic's JSON output: UTC is written as "Z"
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+def render(head: bytes, updated_at: Optional[datetime], view_count: int, comments: int) -> bytes:
+    """Complete `schemas.Project` JSON from a stored head and the volatile fields."""
+    return b'%s,"updatedAt":"%s","viewCount":%d,"comments":%d}' % (
+        head, _isoformat(updated_at).encode(), view_count, comments,
+    )
+
+
+def render_list(docs: Iterable[bytes]) -> bytes:
+    return b"[" + b",".join(docs) + b"]"
+
+
+def render_missing_heads(session: Session, project_ids: List[int]) -> Dict[int, bytes]:
+    """
+    Heads for rows that have none stored yet, rendered on the fly. A row
+    that does not validate is serialized as stored instead of failing the
+    whole page.
+    """
+    if not project_ids:
+        return {}
+    projects = session.query(models.Project).filter(models.Project.id.in_(project_ids))
+    heads = {}
+    for p in projects:
+        try:
+            heads[p.id] = render_head(p)
+        except ValidationError:
+            heads[p.id] = _unvalidated_head(p)
+    return heads
+
+
+def _unvalidated_head(project: models.Project) -> bytes:
+    data = {name: getattr(project, name) for name in HEAD_FIELDS}
+    model = schemas.Project.model_construct(**{**data, "id": project.id, "image_sets": project.image_sets or {}})
+    body = model.model_dump_json(by_alias=True, exclude=TAIL_FIELDS, warnings=False).encode()
+    return body[:-1]
+
+
+def backfill(session: Session, only_missing: bool = True) -> int:
+    """Render heads for rows written outside the ORM (seed scripts, SQL). Returns rows updated."""
+    query = session.query(models.Project)
+    if only_missing:
+        query = query.filter(models.Project.json_head.is_(None))
+    params = [{"pid": p.id, "head": _safe_render(p)} for p in query]
+    if params:
+        session.connection().execute(
+            update(models.Project)
+            .where(models.Project.id == bindparam("pid"))
+            # not an edit; keep updated_at (and anything keyed on it) stable
+            .values(json_head=bindparam("head"), updated_at=models.Project.updated_at),
+            params,
+        )
+    session.commit()
+    return len(params)
+
+
+def _safe_render(project: models.Project) -> Optional[bytes]:
+    # a row that does not validate keeps no head and is serialized unvalidated per request
+    try:
+        return render_head(project)
+    except ValidationError:
+        logger.warning("Project %s does not validate; not storing its JSON", project.id)
+        return None
+
+
+# Kept current for ORM writes. Bulk `query.update()` calls and raw SQL bypass
+# these hooks; run `python -m src.db.maintenance render-project-json` after them.
+@event.listens_for(models.Project, "after_insert")
+def _project_inserted(mapper, connection, target: models.Project) -> None:
+    # id and created_at only exist once the row is in
+    head = _safe_render(target)
+    table = models.Project.__table__
+    connection.execute(
+        update(table).where(table.c.id == target.id).values(json_head=head, updated_at=table.c.updated_at)
+    )
+    set_committed_value(target, "json_head", head)
+
+
+@event.listens_for(models.Project, "before_update")
+def _project_updating(mapper, connection, target: models.Project) -> None:
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in HEAD_FIELDS):
+        target.json_head = _safe_render(target)
@@ -0,0 +1,280 @@
+# src/project_search.py
+import html
+import math
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .db import models
+
+# "auto" uses PostgreSQL full-text search when the database is PostgreSQL
+# and the in-process index otherwise; "memory" forces the index
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+# the in-process index is rebuilt after writes and at most this old otherwise
+SEARCH_INDEX_TTL = float(os.getenv("SEARCH_INDEX_TTL", "60"))
+# text search configuration baked into the projects.search_vector trigger
+SEARCH_CONFIG = "english"
+
+# highlight markers; the matched text is HTML-escaped and wrapped in <mark>
+_START, _STOP = "\ue000", "\ue001"
+SNIPPET_WORDS = 20
+
+# setweight() labels: title and tags (A), short_desc (B), detail_desc (C),
+# with ts_rank's default weights
+FIELD_WEIGHTS = {"title": 1.0, "tech_tags": 1.0, "short_desc": 0.4, "detail_desc": 0.2}
+
+# Trigger keeping projects.search_vector current, and a one-off backfill;
+# applied by `upgrade-schema` and wherever tables are made with create_all.
+SEARCH_VECTOR_DDL = [
+    f"""
+    CREATE OR REPLACE FUNCTION projects_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(array_to_string(NEW.tech_tags, ' '), '')), 'A') ||
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.short_desc, '')), 'B') ||
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.detail_desc, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS projects_search_vector ON projects",
+    """
+    CREATE TRIGGER projects_search_vector
+    BEFORE INSERT OR UPDATE OF title, short_desc, detail_desc, tech_tags ON projects
+    FOR EACH ROW EXECUTE FUNCTION projects_search_vector_update()
+    """,
+    # fires the trigger for rows written before it existed
+    "UPDATE projects SET title = title WHERE search_vector IS NULL",
+]
+
+
+def install_search_vector(bind) -> None:
+    """
+    Apply SEARCH_VECTOR_DDL on PostgreSQL. create_all makes the column but
+    not the trigger, so every create_all path calls this too; it is safe
+    to repeat.
+    """
+    if bind.dialect.name != "postgresql":
+        return
+    with bind.begin() as conn:
+        # workers starting together would race on CREATE OR REPLACE FUNCTION
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('projects_search_vector'))"))
+        for stmt in SEARCH_VECTOR_DDL:
+            conn.execute(text(stmt))
+
+
+@dataclass
+class SearchHit:
+    project_id: int
+    rank: float
+    title: str
+    snippet: str
+
+
+def _highlight(marked: str) -> str:
+    return html.escape(marked).replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+# ─── PostgreSQL: tsvector + GIN ──────────────────────────────────────
+_PG_SEARCH = text(f"""
+    WITH q AS (SELECT websearch_to_tsquery('{SEARCH_CONFIG}', :q) AS query),
+    ranked AS (
+        SELECT p.id, p.title, p.short_desc, p.detail_desc,
+               ts_rank_cd(p.search_vector, q.query, 32) AS rank,
+               count(*) OVER () AS total
+        FROM projects p, q
+        WHERE p.search_vector @@ q.query
+        ORDER BY rank DESC, p.id DESC
+        LIMIT :limit OFFSET :offset
+    )
+    -- headlines are the expensive part: only for the page being returned
+    SELECT r.id, r.rank, r.total,
+           ts_headline('{SEARCH_CONFIG}', r.title, q.query, :title_opts) AS title,
+           ts_headline('{SEARCH_CONFIG}', r.short_desc || ' ' || coalesce(r.detail_desc, ''),
+                       q.query, :snippet_opts) AS snippet
+    FROM ranked r, q
+    ORDER BY r.rank DESC, r.id DESC
+""")
+
+
+def _pg_search(session: Session, q: str, limit: int, offset: int) -> Tuple[List[SearchHit], int]:
+    rows = session.execute(_PG_SEARCH, {
+        "q": q,
+        "limit": limit,
+        "offset": offset,
+        "title_opts": f'StartSel="{_START}", StopSel="{_STOP}", HighlightAll=true',
+        "snippet_opts": (
+            f'StartSel="{_START}", StopSel="{_STOP}", MaxWords={SNIPPET_WORDS}, MinWords=5,'
+            " MaxFragments=2, FragmentDelimiter=\" … \""
+        ),
+    }).all()
+    hits = [SearchHit(r.id, round(r.rank, 6), _highlight(r.title), _highlight(r.snippet)) for r in rows]
+    if not rows and offset:
+        # past the last page; the window count is gone with the rows
+        return hits, _pg_count(session, q)
+    return hits, rows[0].total if rows else 0
+
+
+def _pg_count(session: Session, q: str) -> int:
+    return session.execute(
+        text(f"SELECT count(*) FROM projects WHERE search_vector @@ websearch_to_tsquery('{SEARCH_CONFIG}', :q)"),
+        {"q": q},
+    ).scalar_one()
+
+
+# ─── fallback: in-process inverted index ─────────────────────────────
+_WORD = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was with".split()
+)
+
+
+def tokenize(value: str) -> List[str]:
+    return [w for w in _WORD.findall(value.lower()) if w not in _STOPWORDS]
+
+
+def parse_query(q: str) -> Tuple[List[List[str]], List[str]]:
+    """
+    websearch_to_tsquery syntax, loosely: words and "quoted phrases" are
+    ANDed (phrases as plain words), `or` separates alternatives and a
+    leading `-` excludes. Returns (OR groups of required terms, excluded).
+    """
+    groups: List[List[str]] = [[]]
+    excluded: List[str] = []
+    for quoted, word in re.findall(r'(-?"[^"]*"?)|(\S+)', q):
+        chunk = quoted or word
+        if chunk.lower() == "or":
+            groups.append([])
+        elif chunk.startswith("-"):
+            excluded += tokenize(chunk[1:])
+        else:
+            groups[-1] += tokenize(chunk)
+    return [g for g in groups if g], excluded
+
+
+@dataclass
+class _Doc:
+    title: str
+    body: str
+
+
+class InvertedIndex:
+    """
+    Term -> {project id: weighted frequency} over the searchable fields,
+    for databases without full-text search. Built from the projects table
+    on first use and again after `invalidate()` or `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float = SEARCH_INDEX_TTL):
+        self.ttl = ttl
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._docs: Dict[int, _Doc] = {}
+        self._built_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._built_at = None
+
+    def _ensure(self, session: Session) -> None:
+        with self._lock:
+            if self._built_at is not None and time.monotonic() - self._built_at < self.ttl:
+                return
+            rows = session.query(
+                models.Project.id, models.Project.title, models.Project.short_desc,
+                models.Project.detail_desc, models.Project.tech_tags,
+            ).all()
+            postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+            docs: Dict[int, _Doc] = {}
+            for row in rows:
+                fields = {
+                    "title": row.title or "",
+                    "tech_tags": " ".join(row.tech_tags or ()),
+                    "short_desc": row.short_desc or "",
+                    "detail_desc": row.detail_desc or "",
+                }
+                for name, value in fields.items():
+                    for term in tokenize(value):
+                        posting = postings[term]
+                        posting[row.id] = posting.get(row.id, 0.0) + FIELD_WEIGHTS[name]
+                docs[row.id] = _Doc(fields["title"], f'{fields["short_desc"]} {fields["detail_desc"]}'.strip())
+            self._postings, self._docs = dict(postings), docs
+            self._built_at = time.monotonic()
+
+    def _matching(self, terms: List[str]) -> set:
+        postings = self._postings
+        if not terms or any(t not in postings for t in terms):
+            return set()
+        return set.intersection(*(set(postings[t]) for t in terms))
+
+    def search(self, session: Session, q: str, limit: int, offset: int) -> Tuple[List[SearchHit], int]:
+        self._ensure(session)
+        groups, excluded = parse_query(q)
+        postings, docs = self._postings, self._docs
+
+        # every term of some OR group must match, like websearch_to_tsquery
+        matches = set().union(*(self._matching(g) for g in groups)) if groups else set()
+        for term in excluded:
+            matches -= set(postings.get(term, ()))
+
+        # tf * idf over the query terms a project contains
+        terms = list(dict.fromkeys(t for g in groups for t in g))
+        n = len(docs)
+        scores = {
+            pid: sum(
+                postings[t][pid] * math.log(1 + n / len(postings[t]))
+                for t in terms if pid in postings.get(t, ())
+            )
+            for pid in matches
+        }
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], -kv[0]))
+        term_set = set(terms)
+        hits = [
+            SearchHit(
+                pid,
+                round(score / (score + 1), 6),
+                _mark(docs[pid].title, term_set, whole=True),
+                _mark(docs[pid].body, term_set),
+            )
+            for pid, score in ranked[offset:offset + limit]
+        ]
+        return hits, len(ranked)
+
+
+def _mark(value: str, terms: set, whole: bool = False) -> str:
+    """Highlight `terms` in `value`; unless `whole`, only a window around the first match."""
+    words = list(_WORD.finditer(value))
+    if not whole and words:
+        first = next((i for i, m in enumerate(words) if m.group().lower() in terms), 0)
+        start = max(0, first - SNIPPET_WORDS // 4)
+        window = words[start:start + SNIPPET_WORDS]
+        value, shift = value[window[0].start():window[-1].end()], window[0].start()
+        words = window
+    else:
+        shift = 0
+    out, pos = [], 0
+    for m in words:
+        if m.group().lower() in terms:
+            s, e = m.start() - shift, m.end() - shift
+            out += [value[pos:s], _START, value[s:e], _STOP]
+            pos = e
+    out.append(value[pos:])
+    return _highlight("".join(out))
+
+
+search_index = InvertedIndex()
+
+
+def search_projects(session: Session, q: str, limit: int, offset: int) -> Tuple[List[SearchHit], int]:
+    """Ranked hits for one page and the total number of matches."""
+    if SEARCH_BACKEND != "memory" and session.get_bind().dialect.name == "postgresql":
+        return _pg_search(session, q, limit, offset)
+    return search_index.search(session, q, limit, offset)
@@ -0,0 +1,141 @@
+# src/query_profiler.py
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from sqlalchemy.engine import Engine
+
+from .metrics import RequestStats
+
+logger = logging.getLogger(__name__)
+
+# development/profiling only: capture every statement of every request
+QUERY_PROFILE = os.getenv("QUERY_PROFILE", "0") == "1"
+# requests issuing more statements than this are flagged
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "5"))
+# statements slower than this get an EXPLAIN ANALYZE in the report
+QUERY_SLOW_MS = float(os.getenv("QUERY_SLOW_MS", "50"))
+QUERY_PROFILE_REPORT = os.getenv("QUERY_PROFILE_REPORT", "query_profile.json")
+# distinct slow statements kept per endpoint
+MAX_SLOW_PER_ENDPOINT = 10
+
+
+def normalize_statement(statement: str) -> str:
+    """Collapse whitespace and IN-lists so repeated shapes group together."""
+    statement = re.sub(r"\s+", " ", statement).strip()
+    return re.sub(r"IN \(__\[POSTCOMPILE_\w+\]\)|IN \([^)]*\)", "IN (...)", statement)
+
+
+@dataclass
+class SlowStatement:
+    statement: str
+    parameters: object
+    max_ms: float
+    count: int = 1
+    plan: Optional[str] = None
+
+
+@dataclass
+class EndpointProfile:
+    requests: int = 0
+    total_queries: int = 0
+    max_queries: int = 0
+    over_budget: int = 0
+    total_db_ms: float = 0.0
+    # statement shape -> times seen, to spot N+1 loops
+    statements: Dict[str, int] = field(default_factory=dict)
+    slow: Dict[str, SlowStatement] = field(default_factory=dict)
+
+
+class QueryProfiler:
+    """
+    Per-endpoint SQL statistics fed by MetricsMiddleware. Requests over
+    `budget` statements are logged; statements slower than `slow_ms` are
+    EXPLAIN ANALYZEd (SELECTs) or EXPLAINed (writes) when the report is
+    written, off the request path.
+    """
+
+    def __init__(self, budget: int = QUERY_BUDGET, slow_ms: float = QUERY_SLOW_MS, path: str = QUERY_PROFILE_REPORT):
+        self.budget = budget
+        self.slow_ms = slow_ms
+        self.path = path
+        self._endpoints: Dict[str, EndpointProfile] = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, route: str, stats: RequestStats) -> None:
+        key = f"{method} {route}"
+        if stats.queries > self.budget:
+            logger.warning("%s issued %d SQL statements (budget %d)", key, stats.queries, self.budget)
+        with self._lock:
+            profile = self._endpoints.setdefault(key, EndpointProfile())
+            profile.requests += 1
+            profile.total_queries += stats.queries
+            profile.max_queries = max(profile.max_queries, stats.queries)
+            profile.total_db_ms += stats.db_time * 1000
+            if stats.queries > self.budget:
+                profile.over_budget += 1
+            for statement, parameters, seconds in stats.statements or ():
+                shape = normalize_statement(statement)
+                profile.statements[shape] = profile.statements.get(shape, 0) + 1
+                ms = seconds * 1000
+                if ms < self.slow_ms:
+                    continue
+                slow = profile.slow.get(shape)
+                if slow is not None:
+                    slow.count += 1
+                    slow.max_ms = max(slow.max_ms, ms)
+                elif len(profile.slow) < MAX_SLOW_PER_ENDPOINT:
+                    profile.slow[shape] = SlowStatement(statement, parameters, ms)
+
+    def _explain(self, engine: Engine, slow: SlowStatement) -> None:
+        # ANALYZE really runs the statement, so only for reads; rolled back either way
+        analyze = slow.statement.lstrip().upper().startswith(("SELECT", "WITH"))
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+        try:
+            with engine.connect() as conn:
+                rows = conn.exec_driver_sql(prefix + slow.statement, slow.parameters or ()).all()
+                conn.rollback()
+            slow.plan = "\n".join(r[0] for r in rows)
+        except Exception as exc:
+            slow.plan = f"EXPLAIN failed: {exc}"
+
+    def report(self, engine: Optional[Engine] = None) -> Dict[str, dict]:
+        """Per-endpoint summary, worst average statement count first."""
+        with self._lock:
+            endpoints = list(self._endpoints.items())
+        if engine is not None:
+            for _, profile in endpoints:
+                for slow in profile.slow.values():
+                    if slow.plan is None:
+                        self._explain(engine, slow)
+        out = {}
+        for key, p in sorted(endpoints, key=lambda kv: -kv[1].total_queries / kv[1].requests):
+            out[key] = {
+                "requests": p.requests,
+                "avg_queries": round(p.total_queries / p.requests, 2),
+                "max_queries": p.max_queries,
+                "over_budget": p.over_budget,
+                "avg_db_ms": round(p.total_db_ms / p.requests, 2),
+                "statements": dict(sorted(p.statements.items(), key=lambda kv: -kv[1])),
+                "slow": [
+                    {"statement": s.statement, "count": s.count, "max_ms": round(s.max_ms, 2), "plan": s.plan}
+                    for s in p.slow.values()
+                ],
+            }
+        return out
+
+    def write_report(self, engine: Optional[Engine] = None) -> None:
+        report = self.report(engine)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"budget": self.budget, "slow_ms": self.slow_ms, "endpoints": report}, f, indent=2, default=str)
+        os.replace(tmp, self.path)
+        logger.warning("Query profile for %d endpoints written to %s", len(report), self.path)
+
+
+query_profiler = QueryProfiler() if QUERY_PROFILE else None
+
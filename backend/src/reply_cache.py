@@ -0,0 +1,197 @@
+# src/reply_cache.py
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", "1000"))
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "86400"))
+# empty disables persistence; otherwise a JSON file that survives restarts
+CHAT_CACHE_PATH = os.getenv("CHAT_CACHE_PATH", "")
+# seconds between background saves of a changed cache; it is also saved on shutdown
+CHAT_CACHE_SAVE_INTERVAL = float(os.getenv("CHAT_CACHE_SAVE_INTERVAL", "60"))
+
+
+def normalize_message(message: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the answer."""
+    return re.sub(r"\s+", " ", message).strip().lower().rstrip("?!. ")
+
+
+@dataclass
+class CachedReply:
+    message: str
+    reply: str
+    expires_at: float
+    hits: int = 0
+
+
+class ReplyCache:
+    """
+    TTL + LRU cache of chat replies keyed on (model, system prompt,
+    normalized user message), optionally mirrored to a JSON file by a
+    background thread, off the request path.
+    """
+
+    def __init__(
+            self,
+            max_entries: int = CHAT_CACHE_SIZE,
+            ttl: float = CHAT_CACHE_TTL,
+            path: str = CHAT_CACHE_PATH,
+            save_interval: float = CHAT_CACHE_SAVE_INTERVAL,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.save_interval = save_interval
+        self._entries: "OrderedDict[str, CachedReply]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(model: Optional[str], system_prompt: str, message: str) -> str:
+        raw = json.dumps([model or "", system_prompt, normalize_message(message)])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at < time.time():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            self.hits += 1
+            return entry.reply
+
+    def put(self, key: str, message: str, reply: str) -> None:
+        with self._lock:
+            self._entries[key] = CachedReply(
+                message=normalize_message(message),
+                reply=reply,
+                expires_at=time.time() + self.ttl,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def purge(self, message: Optional[str] = None) -> int:
+        """Drop every entry, or only those for one (normalized) message."""
+        with self._lock:
+            if message is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                wanted = normalize_message(message)
+                keys = [k for k, e in self._entries.items() if e.message == wanted]
+                for k in keys:
+                    del self._entries[k]
+                removed = len(keys)
+            self._dirty = self._dirty or bool(removed)
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "capacity": self.max_entries,
+            }
+
+    def entries(self, limit: int = 100) -> List[dict]:
+        """Most recently used entries first."""
+        with self._lock:
+            items = list(self._entries.values())[::-1][:limit]
+            return [
+                {"message": e.message, "reply": e.reply, "hits": e.hits, "expires_at": e.expires_at}
+                for e in items
+            ]
+
+    def load(self) -> None:
+        """Merge entries persisted at `path` (called once at startup)."""
+        if not self.path:
+            return
+        try:
+            with open(self.path) as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            logger.exception("Could not read chat reply cache from %s", self.path)
+            return
+        if not isinstance(raw, dict):
+            logger.error("Ignoring chat reply cache %s: expected an object, got %s", self.path, type(raw).__name__)
+            return
+        now = time.time()
+        with self._lock:
+            for key, data in raw.items():
+                # a bad entry costs only itself, never the startup
+                try:
+                    entry = CachedReply(**data)
+                    fresh = entry.expires_at > now
+                except TypeError as e:
+                    logger.warning("Skipping malformed chat reply cache entry %r in %s: %s", key, self.path, e)
+                    continue
+                if fresh:
+                    self._entries[key] = entry
+
+    def save(self) -> None:
+        """Write the cache to `path` if it changed since the last save."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = {k: asdict(e) for k, e in self._entries.items()}
+            self._dirty = False
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp = None
+        try:
+            # a temp file of our own: other workers may be saving the same cache
+            with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False) as f:
+                tmp = f.name
+                json.dump(snapshot, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            logger.exception("Could not write chat reply cache to %s", self.path)
+            if tmp and os.path.exists(tmp):
+                os.unlink(tmp)
+            with self._lock:
+                self._dirty = True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.save_interval):
+            self.save()
+
+    def start(self) -> None:
+        if not self.path or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="reply-cache-saver", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the saver thread and write out any unsaved changes."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.save()
+
+
+reply_cache = ReplyCache()
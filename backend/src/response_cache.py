@@ -0,0 +1,140 @@
+# src/response_cache.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response, status
+
+PROJECT_CACHE_SIZE = int(os.getenv("PROJECT_CACHE_SIZE", "256"))
+# view counts inside cached bodies may lag by up to this many seconds
+PROJECT_CACHE_TTL = float(os.getenv("PROJECT_CACHE_TTL", "30"))
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    last_modified: Optional[str]
+    expires_at: float
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    def validators(self) -> Dict[str, str]:
+        headers = {"ETag": self.etag, "Cache-Control": "public, no-cache"}
+        if self.last_modified:
+            headers["Last-Modified"] = self.last_modified
+        return headers
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so ignore any W/ prefix
+    candidates = (t.strip() for t in if_none_match.split(","))
+    return any((t[2:] if t.startswith("W/") else t) == etag for t in candidates)
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU of serialized JSON responses with strong ETags.
+
+    Entries expire after `ttl` seconds and the whole store is dropped by
+    `invalidate()` whenever the underlying data is written. A response
+    built while an invalidation ran is served but not stored.
+    """
+
+    def __init__(self, max_entries: int = PROJECT_CACHE_SIZE, ttl: float = PROJECT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        # bumped by invalidate(); a build that saw an older one may be stale
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def key_for(request: Request) -> str:
+        query = "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+        return f"{request.url.path}?{query}"
+
+    def _get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _put(self, key: str, entry: CachedResponse, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def serve(
+            self,
+            request: Request,
+            build: Callable[[], Awaitable[Tuple[bytes, Optional[datetime], Dict[str, str]]]],
+    ) -> Response:
+        """
+        Answer from cache (or 304) when possible, otherwise await `build`,
+        which returns (json_body, last_modified, extra_headers).
+        """
+        key = self.key_for(request)
+        entry = self._get(key)
+        if entry is None:
+            generation = self._generation
+            body, last_modified, headers = await build()
+            entry = CachedResponse(
+                body=body,
+                etag='"%s"' % hashlib.sha256(body).hexdigest()[:32],
+                last_modified=(
+                    format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+                    if last_modified else None
+                ),
+                expires_at=time.monotonic() + self.ttl,
+                headers=headers,
+            )
+            self._put(key, entry, generation)
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, entry.etag):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=entry.validators())
+        return Response(
+            content=entry.body,
+            media_type="application/json",
+            headers={**entry.headers, **entry.validators()},
+        )
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "entries": len(self._entries),
+                "capacity": self.max_entries,
+            }
+
+
+project_cache = ResponseCache()
@@ -1,74 +1,106 @@
-from fastapi import APIRouter, Depends, Query
+import math
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import List, Dict, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 from ..db import models
 from .. import auth
-from ..db.database import get_db
+from ..db.database import get_async_db
 from ..db import schemas
+from ..page_view_buffer import PAGE_VIEW_INGEST_MODE, page_view_buffer
+from ..view_rollup import as_utc, daily_view_counts, record_daily_views
+from ..tag_popularity import compute_tag_popularity, tag_popularity_cache
 
 router = APIRouter(prefix="/api/v1/analytics", tags=["analytics"])
 
 
-@router.post("/views", response_model=schemas.PageView)
-def create_page_view(
+def _enqueue_views(views: List[schemas.PageViewCreate]) -> dict:
+    if not page_view_buffer.enqueue([v.model_dump() for v in views]):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Page view buffer is full",
+            headers={"Retry-After": str(math.ceil(page_view_buffer.flush_interval))},
+        )
+    return {"status": "queued", "count": len(views)}
+
+
+@router.post("/views", status_code=status.HTTP_202_ACCEPTED)
+async def create_page_view(
         view: schemas.PageViewCreate,
-        db: Session = Depends(get_db)
+        response: Response,
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Record a single page view.
+    In buffered mode the view is queued and written in a later batch (202);
+    in direct mode it is inserted immediately and returned.
+    """
+    if PAGE_VIEW_INGEST_MODE == "direct":
+        def write(session: Session):
+            db_view = models.PageView(**view.model_dump(), timestamp=datetime.now(timezone.utc))
+            session.add(db_view)
+            record_daily_views(session, [{"project_id": db_view.project_id, "timestamp": db_view.timestamp}])
+            session.commit()
+            session.refresh(db_view)
+            return schemas.PageView.model_validate(db_view)
+
+        created = await db.run_sync(write)
+        tag_popularity_cache.note_views([created.timestamp])
+        response.status_code = status.HTTP_200_OK
+        return created
+    return _enqueue_views([view])
+
+
+@router.post("/views/bulk", status_code=status.HTTP_202_ACCEPTED)
+async def create_page_views_bulk(views: List[schemas.PageViewCreate] = Body(..., max_length=1000)):
+    """
+    Queue a batch of page-view beacons in one request.
+    The batch is accepted or rejected as a whole.
+    """
+    return _enqueue_views(views)
+
+
+@router.get("/ingest/stats", response_model=Dict[str, int])
+def get_ingest_stats(
+        current_user: models.User = Depends(auth.get_current_active_admin)
 ):
-    db_view = models.PageView(**view.model_dump())
-    db.add(db_view)
-    db.commit()
-    db.refresh(db_view)
-    return db_view
+    """Counters for the page-view ingestion buffer."""
+    return page_view_buffer.stats()
 
 
 @router.get("/views", response_model=List[Dict])
-def get_page_views(
+async def get_page_views(
         project_id: Optional[int] = None,
         from_date: datetime = Query(default=None),
         to_date: datetime = Query(default=None),
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_user: models.User = Depends(auth.get_current_active_admin)
 ):
-    query = db.query(
-        func.date(models.PageView.timestamp).label('date'),
-        func.count(models.PageView.id).label('count')
-    )
-
-    if project_id:
-        query = query.filter(models.PageView.project_id == project_id)
-    if from_date:
-        query = query.filter(models.PageView.timestamp >= from_date)
-    if to_date:
-        query = query.filter(models.PageView.timestamp <= to_date)
-
-    results = query.group_by('date').order_by('date').all()
-    return [{"date": str(r.date), "count": r.count} for r in results]
+    # closed days come from page_views_daily, only today/partial days scan raw rows
+    return await db.run_sync(daily_view_counts, project_id, from_date, to_date)
 
 
 @router.get("/tags/popularity", response_model=Dict[str, int])
-def get_tag_popularity(
+async def get_tag_popularity(
         from_date: datetime = Query(default=None),
         to_date: datetime = Query(default=None),
-        db: Session = Depends(get_db),
+        weight_by_views: bool = Query(
+            False,
+            description="Count every view instead of every distinct viewed project",
+        ),
+        db: AsyncSession = Depends(get_async_db),
         current_user: models.User = Depends(auth.get_current_active_admin)
 ):
-    # Get all projects viewed in the date range
-    project_query = db.query(models.PageView.project_id).distinct()
-    if from_date:
-        project_query = project_query.filter(models.PageView.timestamp >= from_date)
-    if to_date:
-        project_query = project_query.filter(models.PageView.timestamp <= to_date)
-
-    viewed_project_ids = [p[0] for p in project_query.all()]
-
-    # Get all tags from viewed projects
-    projects = db.query(models.Project).filter(models.Project.id.in_(viewed_project_ids)).all()
-    tag_counts = {}
-
-    for project in projects:
-        for tag in project.tech_tags:
-            tag_counts[tag] = tag_counts.get(tag, 0) + 1
+    key = (
+        as_utc(from_date) if from_date else None,
+        as_utc(to_date) if to_date else None,
+        weight_by_views,
+    )
+    cached = tag_popularity_cache.get(key)
+    if cached is not None:
+        return cached
 
+    tag_counts = await db.run_sync(compute_tag_popularity, from_date, to_date, weight_by_views)
+    tag_popularity_cache.put(key, tag_counts)
     return tag_counts
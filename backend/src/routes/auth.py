@@ -1,13 +1,16 @@
 import os
 from fastapi import APIRouter, Depends, Form, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from pydantic import EmailStr
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from .. import auth
-from ..db.database import get_db
+from ..db.database import get_async_db
+from ..password_hasher import PasswordHasherBusy, password_hasher
 from ..db import models, schemas
 
 router = APIRouter(prefix="/api/v1/auth", tags=["auth"])
@@ -35,37 +38,77 @@ def verify_token(token: str):
         return None
 
 
+def _busy(exc: PasswordHasherBusy) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-ins in progress, please retry shortly",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def _find_user(session: Session, email: str) -> models.User | None:
+    return session.query(models.User).filter(models.User.email == email).first()
+
+
+def _create_user(session: Session, name: str, email: str, hashed: str) -> models.User:
+    if _find_user(session, email):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    u = models.User(name=name, email=email, password_hash=hashed)
+    session.add(u)
+    session.commit()
+    session.refresh(u)
+    return u
+
+
+def _upgrade_hash(session: Session, user_id: int, old_hash: str, new_hash: str) -> None:
+    # skip if the password was changed while we were hashing
+    session.execute(
+        update(models.User)
+        .where(models.User.id == user_id, models.User.password_hash == old_hash)
+        .values(password_hash=new_hash)
+    )
+    session.commit()
+
+
 @router.post("/register", response_model=schemas.User)
-def register_user(
+async def register_user(
         name: str = Form(...),
         email: EmailStr = Form(...),
         password: str = Form(...),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    if db.query(models.User).filter(models.User.email == email).first():
+    # 1) Cheap duplicate check before spending a hash on it
+    if await db.run_sync(_find_user, email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    hashed = auth.get_password_hash(password)
-    u = models.User(name=name, email=email, password_hash=hashed)
-    db.add(u)
-    db.commit()
-    db.refresh(u)
-    return u
+    # 2) Hash in the worker pool
+    try:
+        hashed = await password_hasher.hash(password)
+    except PasswordHasherBusy as exc:
+        raise _busy(exc)
+    return await db.run_sync(_create_user, name, email, hashed)
 
 
 @router.post("/login", response_model=schemas.Token)
-def login(
+async def login(
         form_data: OAuth2PasswordRequestForm = Depends(),
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
 ):
-    user = (
-        db.query(models.User)
-        .filter(models.User.email == form_data.username)
-        .first()
-    )
-    if not user or not auth.verify_password(form_data.password, user.password_hash):
+    user = await db.run_sync(_find_user, form_data.username)
+    verified = False
+    if user:
+        try:
+            verified, new_hash = await password_hasher.verify_and_update(
+                form_data.password, user.password_hash
+            )
+        except PasswordHasherBusy as exc:
+            raise _busy(exc)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -73,13 +116,18 @@ def login(
         )
 
     access_token = auth.create_access_token(
-        data={"sub": user.email},
+        data=auth.user_claims(user),
         expires_delta=timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES),
     )
+    user_out = schemas.User.model_validate(user)
+
+    # stored hash is below the configured cost: replace it transparently
+    if new_hash:
+        await db.run_sync(_upgrade_hash, user.id, user.password_hash, new_hash)
 
     # build the full response
     return {
         "access_token": access_token,
         "token_type": "bearer",
-        "user": user,  # Pydantic will extract id, name, email, is_admin, created_at
+        "user": user_out,
     }
@@ -1,158 +1,456 @@
 # src/routes/chat.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Any, Dict, Optional, Set, Tuple
 from datetime import datetime
+import asyncio
+import hashlib
+import json
+import logging
 import os
-from huggingface_hub import InferenceClient
+import threading
+import anyio
 from fastapi.concurrency import run_in_threadpool
 
 from ..db import models, schemas
-from ..db.database import get_db, SessionLocal
+from ..db.database import get_async_db, async_session_scope
+from .. import auth
+from ..reply_cache import reply_cache
+from ..response_cache import etag_matches
+from ..inference_pool import InferencePoolSaturated, inference_pool
+from ..chat_context import (
+    CHAT_SUMMARY_TOKENS,
+    ChatContext,
+    load_context,
+    load_summary_batch,
+    store_summary,
+    summary_request,
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/chat", tags=["chat"])
 
-# — load HF client once —
 HF_TOKEN = os.getenv("HF_API_TOKEN")
 HF_MODEL = os.getenv("HF_MODEL")
-if not HF_TOKEN:
-    raise RuntimeError("HF_API_TOKEN environment variable is required")
-hf_client = InferenceClient(api_key=HF_TOKEN)
+# created on first use so importing this module stays cheap and the rest
+# of the API still starts without an HF token
+hf_client = None
+_hf_client_lock = threading.Lock()
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+MAX_REPLY_TOKENS = 150
+
+
+def get_hf_client():
+    """The shared InferenceClient, built (and huggingface_hub imported) on first use."""
+    global hf_client
+    if hf_client is None:
+        if not HF_TOKEN:
+            raise HTTPException(status_code=503, detail="Chat is not configured (HF_API_TOKEN is missing)")
+        with _hf_client_lock:
+            if hf_client is None:
+                from huggingface_hub import InferenceClient
+                hf_client = InferenceClient(api_key=HF_TOKEN)
+    return hf_client
+
+
+def build_messages(message: str, context: Optional[ChatContext] = None) -> list:
+    """HF chat-completion messages: system prompt, prior context, new turn."""
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    if context:
+        messages += context.as_messages()
+    messages.append({"role": "user", "content": message})
+    return messages
+
+
+async def prepare_prompt(
+        session_id: int,
+        message: str,
+        db: AsyncSession
+) -> Tuple[ChatContext, list, Optional[str], str]:
+    """
+    Load the session's budgeted context and build the prompt.
+    Returns (context, messages, reply_cache_key, in_flight_key); replies
+    are only cached for turns without history.
+    """
+    context = await db.run_sync(load_context, session_id)
+    messages = build_messages(message, context)
+    if context.has_history:
+        cache_key = None
+        flight_key = hashlib.sha256(json.dumps([HF_MODEL, messages]).encode()).hexdigest()
+    else:
+        cache_key = flight_key = reply_cache.key_for(HF_MODEL, SYSTEM_PROMPT, message)
+    return context, messages, cache_key, flight_key
 
 
 async def get_rule_based_response(
         session_id: int,
         message: str,
-        db: Session
+        db: AsyncSession
 ) -> str:
-    # 1) Load prior messages
-    # db_msgs = (
-    #     db.query(models.ChatMessage)
-    #       .filter_by(session_id=str(session_id))
-    #       .order_by(models.ChatMessage.timestamp.asc())
-    #       .all()
-    # )
-    #
-    # # 2) Build HF‐style history, using only plain strings
-    # history = [
-    #     {"role": "system", "content": "You are a helpful assistant."}
-    # ]
-    # for m in db_msgs:
-    #     history.append({
-    #         "role": m.sender.value,   # <-- enum → str
-    #         "content": m.message
-    #     })
-    # # add the new user turn
-    # history.append({"role": "user", "content": message})
-    #
-    # for m in db_msgs:
-    #     history.append({
-    #         "role": m.sender.value,  # user or bot
-    #         "content": m.message
-    #     })
-
-    # 3) Call the model
-    result = await run_in_threadpool(
-        hf_client.chat_completion,
-        [
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": message}
-        ],
-        model=HF_MODEL,
-        max_tokens=150,
+    # 1) Prior turns within the token budget, plus the rolling summary
+    context, messages, cache_key, flight_key = await prepare_prompt(session_id, message, db)
+    schedule_summary(session_id, context)
+
+    # 2) Common questions are answered from the reply cache
+    if cache_key:
+        cached = reply_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    # 3) Call the model on the dedicated inference pool; identical
+    #    prompts already in flight share one call
+    try:
+        result = await inference_pool.run(
+            flight_key,
+            get_hf_client().chat_completion,
+            messages,
+            model=HF_MODEL,
+            max_tokens=MAX_REPLY_TOKENS,
+        )
+    except InferencePoolSaturated as exc:
+        raise _busy(exc)
+    reply = result.choices[0].message.content
+    if cache_key:
+        reply_cache.put(cache_key, message, reply)
+    return reply
+
+
+# ─── rolling summaries ───────────────────────────────────────────────
+_summary_tasks: Set[asyncio.Task] = set()
+_summarizing: Set[int] = set()
+
+
+def schedule_summary(session_id: int, context: ChatContext) -> None:
+    """Fold turns that fell out of the window into the summary, off the request path."""
+    if not context.needs_summary or session_id in _summarizing:
+        return
+    _summarizing.add(session_id)
+    task = asyncio.get_running_loop().create_task(_summarize(session_id, context.oldest_turn_id))
+    _summary_tasks.add(task)
+    task.add_done_callback(_summary_tasks.discard)
+
+
+async def _summarize(session_id: int, before_id: Optional[int]) -> None:
+    try:
+        async with async_session_scope() as db:
+            previous, floor, batch = await db.run_sync(load_summary_batch, session_id, before_id)
+            if not batch:
+                return
+            result = await inference_pool.run(
+                ("summary", session_id, batch[-1][0]),
+                get_hf_client().chat_completion,
+                summary_request(previous, batch),
+                model=HF_MODEL,
+                max_tokens=CHAT_SUMMARY_TOKENS,
+            )
+            summary = result.choices[0].message.content
+            await db.run_sync(store_summary, session_id, floor, summary, batch[-1][0])
+    except InferencePoolSaturated:
+        # chat traffic comes first; the next turn retries
+        pass
+    except Exception:
+        logger.exception("Summarizing chat session %s failed", session_id)
+    finally:
+        _summarizing.discard(session_id)
+
+
+def _busy(exc: InferencePoolSaturated) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Chat is busy, please retry shortly",
+        headers={"Retry-After": str(exc.retry_after)},
     )
-    # result = hf_client.chat_completion(
-    #     [
-    #         {"role": "system", "content": "You are a helpful assistant."},
-    #         {"role": "user", "content": message}
-    #     ],
-    #     model="mistralai/Mistral-7B-Instruct-v0.3",
-    #     max_tokens=50
-    # )
-    return result.choices[0].message.content
+
+
+def _load_session(session: Session, session_id: Optional[str]) -> models.ChatSession:
+    """Existing ChatSession by id (404 if unknown), or a freshly created one."""
+    if session_id:
+        chat_session = session.get(models.ChatSession, int(session_id)) if session_id.isdigit() else None
+        if not chat_session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return chat_session
+    chat_session = models.ChatSession(created_at=datetime.now())
+    session.add(chat_session)
+    session.commit()
+    session.refresh(chat_session)
+    return chat_session
+
+
+def _persist_turn(
+        session: Session,
+        session_id: int,
+        user_text: str,
+        user_sent_at: datetime,
+        reply_text: str,
+) -> Optional[schemas.ChatMessageOut]:
+    """Store the user message and (if any) the bot reply; returns the reply."""
+    user_msg = models.ChatMessage(
+        session_id=session_id,
+        sender="user",
+        message=user_text,
+        timestamp=user_sent_at,
+    )
+    session.add(user_msg)
+    bot_msg = None
+    if reply_text:
+        bot_msg = models.ChatMessage(
+            session_id=session_id,
+            sender="bot",
+            message=reply_text,
+            timestamp=datetime.now(),
+        )
+        session.add(bot_msg)
+    session.commit()
+    if bot_msg is None:
+        return None
+    session.refresh(bot_msg)
+    return schemas.ChatMessageOut.model_validate(bot_msg)
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 @router.post("", response_model=schemas.ChatMessageOut)
 async def chat_message(
         payload: schemas.ChatMessageIn,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
 ):
     """
     Send a single message via REST.
     If no session_id is provided, create a new ChatSession.
     """
     # 1) Ensure or create session
-    if payload.session_id:
-        session = db.query(models.ChatSession).get(payload.session_id)
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-    else:
-        session = models.ChatSession(created_at=datetime.now())
-        db.add(session)
-        db.commit()
-        db.refresh(session)
+    chat_session = await db.run_sync(_load_session, payload.session_id)
+    user_sent_at = datetime.now()
 
-    # 2) Persist user message
-    user_msg = models.ChatMessage(
-        session_id=session.id,
-        sender="user",
-        message=payload.message,
-        timestamp=datetime.now(),
+    # 2) Generate the bot reply (no transaction is held open meanwhile)
+    reply_text = await get_rule_based_response(chat_session.id, payload.message, db)
+
+    # 3) Persist user message & bot reply together
+    return await db.run_sync(
+        _persist_turn, chat_session.id, payload.message, user_sent_at, reply_text
     )
-    db.add(user_msg)
-
-    # 3) Generate & persist bot reply
-    reply_text = await get_rule_based_response(session.id, payload.message, db)
-    bot_msg = models.ChatMessage(
-        session_id=session.id,
-        sender="bot",
-        message=reply_text,
-        timestamp=datetime.now(),
+
+
+@router.post("/stream", summary="Send a message and stream the reply as Server-Sent Events")
+async def chat_message_stream(
+        payload: schemas.ChatMessageIn,
+        db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Like POST /api/v1/chat, but the reply is streamed token by token.
+
+    Events: `session` (session_id), then one `token` per chunk, then
+    `done` with the stored bot message (or `error`). The assembled reply
+    is persisted when the stream ends, fails or the client disconnects.
+    """
+    chat_session = await db.run_sync(_load_session, payload.session_id)
+    session_id = chat_session.id
+    user_sent_at = datetime.now()
+
+    context, messages, cache_key, _ = await prepare_prompt(session_id, payload.message, db)
+    schedule_summary(session_id, context)
+    cached = reply_cache.get(cache_key) if cache_key else None
+    chunks = None
+    if cached is None:
+        # admission happens now, so a saturated pool is a plain 503
+        try:
+            chunks = inference_pool.stream(
+                get_hf_client().chat_completion,
+                messages,
+                model=HF_MODEL,
+                max_tokens=MAX_REPLY_TOKENS,
+                stream=True,
+            )
+        except InferencePoolSaturated as exc:
+            raise _busy(exc)
+
+    async def events():
+        parts = []
+        failed = False
+        completed = False
+        try:
+            yield _sse("session", {"session_id": str(session_id)})
+            if cached is not None:
+                parts.append(cached)
+                yield _sse("token", {"token": cached})
+            else:
+                async for chunk in chunks:
+                    token = chunk.choices[0].delta.content if chunk.choices else None
+                    if token:
+                        parts.append(token)
+                        yield _sse("token", {"token": token})
+                completed = True
+        except Exception:
+            logger.exception("Streaming chat completion failed for session %s", session_id)
+            failed = True
+        finally:
+            # runs on disconnect too, so shield the write from cancellation
+            with anyio.CancelScope(shield=True):
+                if chunks is not None:
+                    # gives the pool slot back even if no chunk was read
+                    await chunks.aclose()
+                async with async_session_scope() as session:
+                    bot_msg = await session.run_sync(
+                        _persist_turn, session_id, payload.message, user_sent_at, "".join(parts)
+                    )
+
+        if completed and cache_key:
+            # only whole, context-free replies are worth caching
+            reply_cache.put(cache_key, payload.message, "".join(parts))
+        if failed:
+            yield _sse("error", {"detail": "Reply generation failed"})
+        else:
+            yield _sse("done", bot_msg.model_dump(mode="json") if bot_msg else None)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _history_etag(
+        session: Session,
+        session_id: str,
+        after_id: Optional[int],
+        before_id: Optional[int],
+        limit: int,
+) -> str:
+    """
+    Validator for a history page: the session's newest message id plus the
+    page parameters. One index lookup, no message rows read; 404 if unknown.
+    """
+    row = (
+        session.query(models.ChatSession.id, func.max(models.ChatMessage.id))
+        .outerjoin(models.ChatMessage, models.ChatMessage.session_id == models.ChatSession.id)
+        .filter(models.ChatSession.id == (int(session_id) if session_id.isdigit() else -1))
+        .group_by(models.ChatSession.id)
+        .first()
     )
-    db.add(bot_msg)
-    db.commit()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return f'"{row[0]}-{row[1] or 0}-{after_id or 0}-{before_id or 0}-{limit}"'
 
-    return bot_msg
+
+def _load_history_page(
+        session: Session,
+        session_id: int,
+        after_id: Optional[int],
+        before_id: Optional[int],
+        limit: int,
+) -> Tuple[list, bool]:
+    """
+    One page of messages, oldest first, via a range scan on (session_id, id).
+    `after_id` pages forward (newer messages); otherwise the newest `limit`
+    messages below `before_id` (or overall) are returned.
+    """
+    q = session.query(models.ChatMessage).filter(models.ChatMessage.session_id == session_id)
+    if after_id is not None:
+        rows = q.filter(models.ChatMessage.id > after_id).order_by(models.ChatMessage.id.asc()).limit(limit + 1).all()
+        return rows[:limit], len(rows) > limit
+    if before_id is not None:
+        q = q.filter(models.ChatMessage.id < before_id)
+    rows = q.order_by(models.ChatMessage.id.desc()).limit(limit + 1).all()
+    return rows[:limit][::-1], len(rows) > limit
 
 
 @router.get(
     "/history",
     response_model=schemas.ChatHistoryOut,
-    summary="Fetch or create a chat session and its full history"
+    summary="Fetch or create a chat session and a page of its history"
 )
-def get_history(
+async def get_history(
+        request: Request,
+        response: Response,
         session_id: Optional[str] = Query(
             None,
             description="Existing session to load; omit to start a new one"
         ),
-        db: Session = Depends(get_db),
+        after_id: Optional[int] = Query(
+            None, ge=0, description="Only messages newer than this id (incremental sync)"
+        ),
+        before_id: Optional[int] = Query(
+            None, ge=1, description="Only messages older than this id (scrolling back)"
+        ),
+        limit: int = Query(50, ge=1, le=200),
+        db: AsyncSession = Depends(get_async_db),
 ):
     """
-    If `session_id` is provided, return that session's messages (oldest first).
+    If `session_id` is provided, return a page of that session's messages
+    (oldest first): the latest `limit` by default, newer than `after_id`,
+    or older than `before_id`. `has_more` tells whether another page exists
+    in that direction. Responses carry an ETag, so polling with
+    `If-None-Match` gets a 304 without any messages being read.
+
     Otherwise create a new session and return it with an empty message list.
     """
-    if session_id:
-        # load existing session
-        session = db.get(models.ChatSession, session_id)
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
+    if after_id is not None and before_id is not None:
+        raise HTTPException(status_code=400, detail="Use either after_id or before_id, not both")
 
-        msgs = (
-            db.query(models.ChatMessage)
-            .filter_by(session_id=session.id)
-            .order_by(models.ChatMessage.timestamp.asc())
-            .all()
-        )
-    else:
-        # create brand‐new session
-        session = models.ChatSession()
-        db.add(session)
-        db.commit()
-        db.refresh(session)
-        msgs = []
-
-    # return both the session_id and the list of messages
+    if not session_id:
+        chat_session = await db.run_sync(_load_session, None)
+        return schemas.ChatHistoryOut(session_id=str(chat_session.id), messages=[])
+
+    # 1) Cheap validator first; unchanged history is a 304
+    etag = await db.run_sync(_history_etag, session_id, after_id, before_id, limit)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    # 2) Range scan for the requested page
+    msgs, has_more = await db.run_sync(_load_history_page, int(session_id), after_id, before_id, limit)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
     return schemas.ChatHistoryOut(
-        session_id=str(session.id),
-        messages=msgs
+        session_id=session_id,
+        messages=[schemas.ChatMessageOut.model_validate(m) for m in msgs],
+        has_more=has_more,
     )
+
+
+@router.head("/history", summary="Check whether a chat session's history changed")
+async def head_history(
+        request: Request,
+        session_id: str = Query(...),
+        after_id: Optional[int] = Query(None, ge=0),
+        before_id: Optional[int] = Query(None, ge=1),
+        limit: int = Query(50, ge=1, le=200),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """Same ETag as GET /history for these parameters, without a body."""
+    etag = await db.run_sync(_history_etag, session_id, after_id, before_id, limit)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+
+@router.get("/cache", summary="Inspect the chat reply cache")
+async def get_reply_cache(
+        limit: int = Query(100, ge=1, le=1000),
+        current_user: models.User = Depends(auth.get_current_active_admin),
+) -> Dict[str, Any]:
+    return {"stats": reply_cache.stats(), "entries": reply_cache.entries(limit)}
+
+
+@router.delete("/cache", summary="Purge the chat reply cache")
+async def purge_reply_cache(
+        message: Optional[str] = Query(None, description="Only purge replies to this question"),
+        current_user: models.User = Depends(auth.get_current_active_admin),
+):
+    removed = await run_in_threadpool(reply_cache.purge, message)
+    return {"removed": removed}
+
+
+@router.get("/pool", summary="Inference pool queue depth, wait time and latency")
+async def get_inference_pool_stats(
+        current_user: models.User = Depends(auth.get_current_active_admin),
+) -> Dict[str, Any]:
+    return inference_pool.stats()
@@ -1,97 +1,191 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy import func
-from sqlalchemy.orm import Session, selectinload
-from typing import List, Optional, Dict, Any
+import json
+
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, status, Query
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List, Optional, Dict, Any, Union
 from ..db import models, schemas
-from ..db.database import get_db
-from .. import auth
+from ..db.database import get_db, get_async_db
+from .. import auth, project_json, project_search
+from ..view_counter import view_counter
+from ..tag_popularity import tag_popularity_cache
+from ..tag_index import tag_index
+from ..image_pipeline import (
+    IMAGE_MAX_BYTES, IMAGE_PUBLIC_URL, IMAGE_URL_PATH, ImagePipelineBusy, InvalidImage, image_pipeline,
+)
+from ..pagination import NEXT_CURSOR_HEADER, keyset_page
+from ..response_cache import project_cache
 
 router = APIRouter(prefix="/api/v1/projects", tags=["projects"])
 
+MAX_FILTER_TAGS = 10
+
+# what a listing or detail response needs; the rest is in `json_head`
+PAGE_COLUMNS = (
+    models.Project.id,
+    models.Project.created_at,
+    models.Project.updated_at,
+    models.Project.view_count,
+    models.Project.comments,
+    models.Project.json_head,
+)
+
+
+def invalidate_catalog() -> None:
+    """Drop everything derived from project rows after a write."""
+    project_cache.invalidate()
+    tag_popularity_cache.clear()
+    project_search.search_index.invalidate()
+    tag_index.invalidate()
+
+
+def project_response(project: models.Project, status_code: int = status.HTTP_200_OK) -> Response:
+    """A freshly written project, rendered like the read paths."""
+    body = project_json.render(
+        project_json.render_head(project),
+        project.updated_at,
+        view_counter.apply(project.id, project.view_count),
+        project.comments or 0,
+    )
+    return Response(content=body, media_type="application/json", status_code=status_code)
 
-@router.get("/", response_model=List[schemas.Project])
-def list_projects(
-        tag: Optional[str] = None,
+
+@router.get("/", response_model=Union[List[schemas.Project], schemas.ProjectPage])
+async def list_projects(
+        request: Request,
+        tag: List[str] = Query([], description="Repeat to filter by several tags"),
+        match: str = Query("all", pattern="^(all|any)$", description="Projects need all given tags, or any"),
+        facets: bool = Query(False, description="Wrap the page with the match total and per-tag counts"),
         limit: int = Query(10, ge=1, le=100),
-        offset: int = Query(0, ge=0),
-        db: Session = Depends(get_db),
+        cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+        offset: int = Query(0, ge=0, deprecated=True),
+        db: AsyncSession = Depends(get_async_db),
 ):
-    # 1) Build the base Project query
-    proj_q = db.query(models.Project)
-    if tag:
-        proj_q = proj_q.filter(models.Project.tech_tags.contains([tag]))
-
-    # 2) Build a subquery that counts comments per project_id
-    comment_counts = (
-        db.query(
-            models.Comment.project_id.label("pid"),
-            func.count(models.Comment.id).label("cnt")
+    """
+    Newest projects first. Follow the `X-Next-Cursor` response header to
+    page through; `offset` is kept for old clients only.
+    With `facets=true` the body is `{"items", "total", "facets"}`, where
+    `facets` counts the matching projects per tag.
+    Served from the catalog response cache with ETag/304 support.
+    """
+    if len(tag) > MAX_FILTER_TAGS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_FILTER_TAGS} tags")
+    tags = list(dict.fromkeys(tag))
+
+    def load(session: Session):
+        # 1) Only the keyset columns, the counters and the pre-rendered JSON
+        proj_q = session.query(*PAGE_COLUMNS)
+        if tags:
+            # both GIN-indexed: @> for all, && for any
+            column = models.Project.tech_tags
+            proj_q = proj_q.filter(column.contains(tags) if match == "all" else column.overlap(tags))
+        rows, next_cursor = keyset_page(
+            proj_q, models.Project.created_at, models.Project.id, limit, cursor, offset,
         )
-        .group_by(models.Comment.project_id)
-        .subquery()
-    )
 
-    # 3) Join Projects with that count (outer so 0 shows up when no comments)
-    rows = (
-        db.query(
-            models.Project,
-            comment_counts.c.cnt
+        # 2) Append the per-response fields to each stored head; no per-row validation
+        missing = project_json.render_missing_heads(session, [r.id for r in rows if r.json_head is None])
+        body = project_json.render_list(
+            project_json.render(
+                row.json_head or missing[row.id],
+                row.updated_at,
+                view_counter.apply(row.id, row.view_count),
+                row.comments or 0,
+            )
+            for row in rows
         )
-        .outerjoin(comment_counts, models.Project.id == comment_counts.c.pid)
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
+        if facets:
+            # 3) Counts from the cached tag bitmaps; no query once built
+            total, counts = tag_index.facets(session, tags, match_all=match == "all")
+            body = b'{"items":%s,"total":%d,"facets":%s}' % (body, total, json.dumps(counts).encode())
+        last_modified = max((p.updated_at for p in rows if p.updated_at), default=None)
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        return body, last_modified, headers
+
+    return await project_cache.serve(request, lambda: db.run_sync(load))
+
+
+@router.get("/search", response_model=schemas.ProjectSearchPage)
+async def search_projects(
+        request: Request,
+        q: str = Query(..., min_length=1, max_length=200, description="Words, \"phrases\", or -excluded"),
+        limit: int = Query(10, ge=1, le=50),
+        offset: int = Query(0, ge=0, le=1000),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Ranked full-text search over titles, tags and descriptions, with
+    highlighted title and snippet per hit. Title and tag matches rank
+    above description matches.
+    """
+    def load(session: Session):
+        # 1) Ranked ids and highlights for this page
+        hits, total = project_search.search_projects(session, q, limit, offset)
 
-    # 4) Build a list of dicts, injecting `comments = cnt or 0`
-    result: List[dict] = []
-    for project, cnt in rows:
-        # take all the ORM fields
-        proj_data = {
-            "id": project.id,
-            "title": project.title,
-            "short_desc": project.short_desc,
-            "detail_desc": project.detail_desc,
-            "thumbnail": project.thumbnail,
-            "demo_url": project.demo_url,
-            "github_url": project.github_url,
-            "tech_tags": project.tech_tags,
-            "created_at": project.created_at,
-            "updated_at": project.updated_at,
-            "view_count": project.view_count,
-            # **here** we override / supply the comment count:
-            "comments": int(cnt or 0),
+        # 2) Project bodies from the stored JSON, in rank order
+        rows = {
+            r.id: r for r in session.query(*PAGE_COLUMNS).filter(models.Project.id.in_([h.project_id for h in hits]))
         }
-        result.append(proj_data)
+        missing = project_json.render_missing_heads(session, [r.id for r in rows.values() if r.json_head is None])
+        results = []
+        for hit in hits:
+            row = rows.get(hit.project_id)
+            if row is None:
+                continue  # deleted since it was indexed
+            project = project_json.render(
+                row.json_head or missing[row.id],
+                row.updated_at,
+                view_counter.apply(row.id, row.view_count),
+                row.comments or 0,
+            )
+            results.append(b'{"project":%s,"rank":%s,"titleHighlight":%s,"snippet":%s}' % (
+                project, json.dumps(hit.rank).encode(), json.dumps(hit.title).encode(),
+                json.dumps(hit.snippet).encode(),
+            ))
+        body = b'{"query":%s,"total":%d,"limit":%d,"offset":%d,"results":%s}' % (
+            json.dumps(q).encode(), total, limit, offset, project_json.render_list(results),
+        )
+        last_modified = max((r.updated_at for r in rows.values() if r.updated_at), default=None)
+        return body, last_modified, {}
+
+    return await project_cache.serve(request, lambda: db.run_sync(load))
 
-    return result
+
+@router.get("/cache/stats", response_model=Dict[str, int])
+def get_cache_stats(
+        current_user: models.User = Depends(auth.get_current_active_admin)
+):
+    """Hit/miss counters of the catalog response cache."""
+    return project_cache.stats()
 
 
 @router.get("/{project_id}", response_model=schemas.Project)
-def get_project(project_id: int, db: Session = Depends(get_db)):
-    project = (
-        db.query(models.Project)
-        .filter(models.Project.id == project_id)
-        .first()
-    )
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
-    cnt = (
-              db.query(func.count(models.Comment.id))
-              .filter(models.Comment.project_id == project_id)
-              .scalar()
-          ) or 0
-    project.comments = cnt
-    # ─── increment view count ────────────────────────────────────
-    project.view_count = (project.view_count or 0) + 1
-    db.commit()
-    db.refresh(project)
-    # ──────────────────────────────────────────────────────────────
+async def get_project(project_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    counted = False
+
+    def load(session: Session):
+        nonlocal counted
+        row = session.query(*PAGE_COLUMNS).filter(models.Project.id == project_id).first()
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
+        head = row.json_head or project_json.render_missing_heads(session, [row.id])[row.id]
+        # ─── increment view count (write-behind, flushed in batches) ─
+        view_counter.increment(project_id)
+        counted = True
+        view_count = view_counter.apply(project_id, row.view_count)
+        # ──────────────────────────────────────────────────────────────
+        body = project_json.render(head, row.updated_at, view_count, row.comments or 0)
+        return body, row.updated_at, {}
 
-    return project
+    response = await project_cache.serve(request, lambda: db.run_sync(load))
+    if not counted:
+        # cache hits and 304s are page views too
+        view_counter.increment(project_id)
+    return response
 
 
 @router.post("/", response_model=schemas.Project, status_code=status.HTTP_201_CREATED)
@@ -100,39 +194,26 @@ def create_project(
         db: Session = Depends(get_db),
         current_user: models.User = Depends(auth.get_current_active_admin),
 ):
-    # 1) Dump to a JSON-compatible dict (Url → str, lists stay lists, etc.)
+    # 1) Dump to a JSON-compatible dict (Url → str, omitted URLs stay None)
     proj_data: Dict[str, Any] = project.model_dump(mode="json")
-    print(proj_data)
 
     # 2) Create the SQLAlchemy model with only DB-friendly types
     db_project = models.Project(
-        title=project.title,
-        short_desc=project.short_desc,
-        detail_desc=project.detail_desc,
-        thumbnail=str(project.thumbnail),
-        demo_url=str(project.demo_url),
-        github_url=str(project.github_url),
-        tech_tags=project.tech_tags,
+        title=proj_data["title"],
+        short_desc=proj_data["short_desc"],
+        detail_desc=proj_data["detail_desc"],
+        thumbnail=proj_data["thumbnail"],
+        demo_url=proj_data["demo_url"],
+        github_url=proj_data["github_url"],
+        tech_tags=proj_data["tech_tags"],
     )
     # db_project = models.Project(**filtered_data)
     db.add(db_project)
     db.commit()
     db.refresh(db_project)
-    data = {
-        "id": db_project.id,
-        "title": db_project.title,
-        "short_desc": db_project.short_desc,
-        "detail_desc": db_project.detail_desc,
-        "tech_tags": db_project.tech_tags,
-        "thumbnail": db_project.thumbnail,
-        "images": db_project.images,
-        "demo_url": db_project.demo_url,
-        "github_url": db_project.github_url,
-        "created_at": db_project.created_at,
-        "updated_at": db_project.updated_at,
-    }
-    # Pydantic will treat this as a mapping and use your alias_generator
-    return data
+    invalidate_catalog()
+    # 3) Same bytes the listing serves; counters start at zero
+    return project_response(db_project, status.HTTP_201_CREATED)
 
 
 @router.put("/{project_id}", response_model=schemas.Project)
@@ -156,27 +237,93 @@ def update_project(
 
     db.commit()
     db.refresh(db_project)
-    return db_project
+    invalidate_catalog()
+    return project_response(db_project)
+
+
+@router.post("/{project_id}/images", response_model=schemas.Project, status_code=status.HTTP_201_CREATED)
+async def upload_project_image(
+        project_id: int,
+        request: Request,
+        file: UploadFile = File(...),
+        role: str = Query("gallery", pattern="^(gallery|thumbnail)$",
+                          description="Replace the thumbnail, or append to the gallery images"),
+        db: AsyncSession = Depends(get_async_db),
+        current_user: models.User = Depends(auth.get_current_active_admin),
+):
+    """
+    Upload an image: resized WebP/JPEG variants are rendered and stored
+    under /media, a JPEG becomes the thumbnail (or a gallery image) and
+    `imageSets` carries its srcset.
+    """
+    # 1) Cheap checks before any decoding
+    if file.content_type and not file.content_type.startswith("image/"):
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Not an image")
+    data = await file.read(IMAGE_MAX_BYTES + 1)
+    if len(data) > IMAGE_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Images are limited to {IMAGE_MAX_BYTES // (1024 * 1024)} MB",
+        )
+    exists = await db.run_sync(lambda s: s.query(models.Project.id).filter_by(id=project_id).first())
+    if not exists:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+
+    # 2) Decode and resize in the worker processes, store the variants
+    base_url = IMAGE_PUBLIC_URL or f"{str(request.base_url).rstrip('/')}{IMAGE_URL_PATH}"
+    try:
+        image_set = await image_pipeline.ingest(data, base_url)
+    except InvalidImage as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    except ImagePipelineBusy as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many uploads in progress, please retry shortly",
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    # 3) Point the project at the default-size JPEG and record the srcset
+    def write(session: Session):
+        project = session.get(models.Project, project_id)
+        if not project:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+        url = image_set["src"]
+        if role == "thumbnail":
+            project.thumbnail = url
+        elif url not in (project.images or ()):
+            project.images = [*(project.images or ()), url]
+        project.image_sets = {**(project.image_sets or {}), url: image_set}
+        session.commit()
+        session.refresh(project)
+        return project_response(project, status.HTTP_201_CREATED)
+
+    response = await db.run_sync(write)
+    invalidate_catalog()
+    return response
 
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_project(
         project_id: int,
         db: Session = Depends(get_db),
-        current_user: models.User = Depends(auth.get_current_active_admin)
+        current_user: models.User = Depends(auth.get_current_active_admin_strict)
 ):
-    db_project = (db.query(models.Project)
-                  .options(selectinload(models.Project.comments))
-                  .filter(models.Project.id == project_id)
-                  .first())
-    if not db_project:
+    # `Project.comments` is a counter column, not a relationship, so there
+    # is nothing to eager-load: delete the row directly (page views cascade)
+    deleted = (
+        db.query(models.Project)
+        .filter(models.Project.id == project_id)
+        .delete(synchronize_session=False)
+    )
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
-
-    db.delete(db_project)
+    # comments have no foreign key to projects
+    db.query(models.Comment).filter(models.Comment.project_id == project_id).delete(synchronize_session=False)
     db.commit()
+    invalidate_catalog()
     return None
 
 
@@ -185,33 +332,74 @@ def delete_project(
     response_model=schemas.Comment,
     status_code=status.HTTP_201_CREATED,
 )
-def add_comment(
+async def add_comment(
         project_id: int,
         comment_in: schemas.CommentCreate,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
 ):
-    proj = db.query(models.Project).filter_by(id=project_id).first()
-    if not proj:
-        raise HTTPException(status_code=404, detail="Project not found")
+    def write(session: Session):
+        # bump the stored counter; the row count doubles as the existence check
+        bumped = session.execute(
+            update(models.Project)
+            .where(models.Project.id == project_id)
+            .values(comments=func.coalesce(models.Project.comments, 0) + 1)
+        ).rowcount
+        if not bumped:
+            raise HTTPException(status_code=404, detail="Project not found")
 
-    # exclude project_id so we don’t duplicate it
-    data = comment_in.model_dump(exclude={"project_id"})
-    comment = models.Comment(**data, project_id=project_id)
+        # exclude project_id so we don’t duplicate it
+        data = comment_in.model_dump(exclude={"project_id"})
+        comment = models.Comment(**data, project_id=project_id)
 
-    db.add(comment)
-    db.commit()
-    db.refresh(comment)
+        session.add(comment)
+        session.commit()
+        session.refresh(comment)
+        return schemas.Comment.model_validate(comment)
+
+    comment = await db.run_sync(write)
+    project_cache.invalidate()
     return comment
 
 
-@router.get("/{project_id}/comments", response_model=List[schemas.Comment])
-def list_comments(project_id: int, db: Session = Depends(get_db)):
-    comments = (
+@router.delete("/{project_id}/comments/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_comment(
+        project_id: int,
+        comment_id: int,
+        db: Session = Depends(get_db),
+        current_user: models.User = Depends(auth.get_current_active_admin_strict)
+):
+    deleted = (
         db.query(models.Comment)
-        .filter_by(project_id=project_id)
-        .order_by(models.Comment.created_at.desc())
-        .all()
+        .filter_by(id=comment_id, project_id=project_id)
+        .delete(synchronize_session=False)
+    )
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Comment not found")
+
+    db.execute(
+        update(models.Project)
+        .where(models.Project.id == project_id)
+        .values(comments=func.greatest(func.coalesce(models.Project.comments, 0) - deleted, 0))
     )
-    if not comments:
-        return []
+    db.commit()
+    project_cache.invalidate()
+    return None
+
+
+@router.get("/{project_id}/comments", response_model=List[schemas.Comment])
+async def list_comments(
+        project_id: int,
+        response: Response,
+        limit: int = Query(50, ge=1, le=100),
+        cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """Newest comments first, one page at a time (see `X-Next-Cursor`)."""
+    def load(session: Session):
+        comments_q = session.query(models.Comment).filter_by(project_id=project_id)
+        return keyset_page(comments_q, models.Comment.created_at, models.Comment.id, limit, cursor)
+
+    comments, next_cursor = await db.run_sync(load)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return comments
@@ -1,55 +1,70 @@
 # signaling_server.py
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict
 from fastapi.middleware.cors import CORSMiddleware
+import json
+import os
 
+from ..signaling_store import InviteState, create_store
 
-class InviteState(BaseModel):
-    invite_link: Optional[str] = None
-    guest_count: int = 0
-    expected_guests: int = 0
-    share_link: Optional[str] = None
+# how long a long-poll request waits for a change before answering anyway
+SIGNALING_POLL_TIMEOUT = float(os.getenv("SIGNALING_POLL_TIMEOUT", "25"))
+# comment line sent on idle event streams so proxies keep them open
+SIGNALING_HEARTBEAT = float(os.getenv("SIGNALING_HEARTBEAT", "15"))
 
+DEFAULT_ROOM = "default"
 
 router = APIRouter(prefix="/api/v1/signalling", tags=["singaling"])
-# global state
-state = InviteState()
+# room-scoped state; SIGNALING_STORE picks in-process or shared storage
+store = create_store()
+
+
+def room_param(
+        room: str = Query(DEFAULT_ROOM, min_length=1, max_length=64, description="Signalling room"),
+) -> str:
+    return room
+
+
+def snapshot(state: InviteState, version: int) -> Dict[str, Any]:
+    return {**state.model_dump(), "version": version}
 
 
 @router.post("/invite")
-async def set_invite(payload: InviteState):
+async def set_invite(payload: InviteState, room: str = Depends(room_param)):
     """
     Host calls this once it has the invite link.
     Resets guest_count to 0.
     """
-    state.invite_link = payload.invite_link
-    state.expected_guests = payload.expected_guests
-    state.guest_count = 0
+    await store.set_invite(room, payload.invite_link, payload.expected_guests)
+    await store.maybe_sweep()
     return {"status": "invite registered"}
 
 
 @router.get("/invite")
-async def get_invite():
+async def get_invite(room: str = Depends(room_param)):
     """
     Guests poll this until state.invite_link is set.
     """
+    state, _ = await store.get(room)
     return {"invite_link": state.invite_link}
 
 
 @router.get("/share_link")
-async def get_invite():
+async def get_share_link(room: str = Depends(room_param)):
     """
     human poll this until state.invite_link is set.
     """
+    state, _ = await store.get(room)
     return {"invite_link": state.share_link}
 
 
 @router.get("/guest_count")
-async def get_guest_count():
+async def get_guest_count(room: str = Depends(room_param)):
     """
     Host polls this to see how many guests have joined.
     """
+    state, _ = await store.get(room)
     return {
         "guest_count": state.guest_count,
         "expected_guests": state.expected_guests,
@@ -57,36 +72,70 @@ async def get_guest_count():
 
 
 @router.post("/share_link")
-async def set_share_link():
+async def set_share_link(room: str = Depends(room_param)):
     """
     Host calls this once it has the share link.
     """
-    if state.invite_link is None:
+    if not await store.set_share_link(room):
         raise HTTPException(400, "Invite link must be set before share link")
-    state.share_link = state.invite_link
     return {"status": "share link registered"}
 
 
 @router.post("/guest_join")
-async def guest_join():
+async def guest_join(room: str = Depends(room_param)):
     """
     Each Guest calls this once it has successfully joined the room.
+    Admission is atomic, so concurrent joins never exceed expected_guests.
     """
-    if state.guest_count < state.expected_guests:
-        state.guest_count += 1
-        return {"guest_count": state.guest_count}
-    else:
+    guest_count = await store.guest_join(room)
+    if guest_count is None:
         # defensive
         raise HTTPException(400, "All guests already joined")
+    return {"guest_count": guest_count}
 
 
 @router.get("/clear")
-async def clear_state():
+async def clear_state(room: str = Depends(room_param)):
     """
     Reset the invite link, guest count, and expected guests back to defaults.
     """
-    state.invite_link = None
-    state.guest_count = 0
-    state.expected_guests = 0
-    state.share_link = None
+    await store.clear(room)
     return {"status": "state cleared"}
+
+
+@router.get("/state")
+async def poll_state(
+        room: str = Depends(room_param),
+        since: int = Query(-1, description="Last version seen; answer as soon as it changes"),
+        timeout: float = Query(SIGNALING_POLL_TIMEOUT, ge=0, le=60),
+):
+    """
+    Long-poll fallback: returns the full state (with `version`) immediately
+    if its version differs from `since`, otherwise once it does or
+    `timeout` passes.
+    """
+    return snapshot(*await store.wait(room, since, timeout))
+
+
+@router.get("/events")
+async def state_events(request: Request, room: str = Depends(room_param)):
+    """
+    Server-Sent Events: a `state` event with the full state (and `version`)
+    on connect and after every change, replacing the polling endpoints.
+    """
+    async def events():
+        state, seen = await store.get(room)
+        yield f"event: state\ndata: {json.dumps(snapshot(state, seen))}\n\n"
+        while not await request.is_disconnected():
+            state, version = await store.wait(room, seen, SIGNALING_HEARTBEAT)
+            if version != seen:
+                seen = version
+                yield f"event: state\ndata: {json.dumps(snapshot(state, version))}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
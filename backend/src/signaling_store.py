@@ -0,0 +1,331 @@
+# src/signaling_store.py
+import asyncio
+import itertools
+import os
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .db import models
+from .db.database import async_session_scope
+from .view_rollup import as_utc
+
+# `memory` keeps rooms in this process; `database` shares them between
+# workers through the `signaling_rooms` table
+SIGNALING_STORE = os.getenv("SIGNALING_STORE", "memory")
+# rooms untouched for this many seconds are dropped
+SIGNALING_ROOM_TTL = float(os.getenv("SIGNALING_ROOM_TTL", "3600"))
+# shared store only: how often waiters re-read a room for other workers' writes
+SIGNALING_SYNC_INTERVAL = float(os.getenv("SIGNALING_SYNC_INTERVAL", "1"))
+# minimum seconds between sweeps of expired rooms
+SIGNALING_SWEEP_INTERVAL = 60.0
+
+
+class InviteState(BaseModel):
+    invite_link: Optional[str] = None
+    guest_count: int = 0
+    expected_guests: int = 0
+    share_link: Optional[str] = None
+
+
+class SignalingStore(ABC):
+    """
+    Room-scoped signalling state. Every state has a version that grows on
+    each change; `wait()` returns as soon as it differs from the caller's.
+    Versions come from one store-wide counter, so a room that expires and
+    is created again never repeats a version a client may still hold.
+    """
+
+    # seconds between re-reads while waiting; None = local writes only
+    sync_interval: Optional[float] = None
+
+    def __init__(self, ttl: float = SIGNALING_ROOM_TTL):
+        self.ttl = ttl
+        # rooms with someone waiting: their change event and how many wait on it
+        self._events: Dict[str, asyncio.Event] = {}
+        self._waiters: Dict[str, int] = {}
+        self._last_sweep = 0.0
+
+    # ─── storage, per backend ────────────────────────────────────────
+    @abstractmethod
+    async def get(self, room: str) -> Tuple[InviteState, int]:
+        """The room's state and version; an unknown room is empty at version 0."""
+
+    @abstractmethod
+    async def set_invite(self, room: str, invite_link: Optional[str], expected_guests: int) -> None:
+        """Start the room over with a new invite link; no guests yet."""
+
+    @abstractmethod
+    async def set_share_link(self, room: str) -> bool:
+        """Copy the invite link to the share link; False if there is none."""
+
+    @abstractmethod
+    async def guest_join(self, room: str) -> Optional[int]:
+        """Admit one guest atomically; the new count, or None if the room is full."""
+
+    @abstractmethod
+    async def clear(self, room: str) -> None:
+        """Reset the room's state."""
+
+    @abstractmethod
+    async def sweep(self) -> int:
+        """Drop expired rooms; returns how many."""
+
+    # ─── change notification ─────────────────────────────────────────
+    def publish(self, room: str) -> None:
+        event = self._events.pop(room, None)
+        if event is not None:
+            event.set()
+
+    async def wait(self, room: str, since: int, timeout: float) -> Tuple[InviteState, int]:
+        """Current state once its version differs from `since`, or at `timeout`."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            state, version = await self.get(room)
+            remaining = deadline - loop.time()
+            if version != since or remaining <= 0:
+                return state, version
+            event = self._subscribe(room)
+            try:
+                await asyncio.wait_for(event.wait(), min(remaining, self.sync_interval or remaining))
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._unsubscribe(room)
+
+    def _subscribe(self, room: str) -> asyncio.Event:
+        event = self._events.get(room)
+        if event is None:
+            event = self._events[room] = asyncio.Event()
+        self._waiters[room] = self._waiters.get(room, 0) + 1
+        return event
+
+    def _unsubscribe(self, room: str) -> None:
+        left = self._waiters.pop(room) - 1
+        if left:
+            self._waiters[room] = left
+        else:
+            # room names come from clients: keep nothing for rooms nobody waits on
+            self._events.pop(room, None)
+
+    async def maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep >= SIGNALING_SWEEP_INTERVAL:
+            self._last_sweep = now
+            await self.sweep()
+
+
+@dataclass
+class _Room:
+    state: InviteState = field(default_factory=InviteState)
+    version: int = 0
+    touched_at: float = field(default_factory=time.monotonic)
+
+
+class MemoryStore(SignalingStore):
+    """
+    Rooms in a dict. Methods never await between read and write, so
+    admission is atomic within the event loop; state is per process.
+    """
+
+    def __init__(self, ttl: float = SIGNALING_ROOM_TTL):
+        super().__init__(ttl)
+        self._rooms: Dict[str, _Room] = {}
+        self._versions = itertools.count(1)
+
+    def _room(self, room: str, create: bool = False) -> Optional[_Room]:
+        entry = self._rooms.get(room)
+        if entry is not None and time.monotonic() - entry.touched_at > self.ttl:
+            del self._rooms[room]
+            entry = None
+        if entry is None and create:
+            entry = self._rooms[room] = _Room()
+        return entry
+
+    def _changed(self, room: str, entry: _Room) -> None:
+        entry.version = next(self._versions)
+        entry.touched_at = time.monotonic()
+        self.publish(room)
+
+    async def get(self, room: str) -> Tuple[InviteState, int]:
+        entry = self._room(room)
+        if entry is None:
+            return InviteState(), 0
+        return entry.state.model_copy(), entry.version
+
+    async def set_invite(self, room: str, invite_link: Optional[str], expected_guests: int) -> None:
+        entry = self._room(room, create=True)
+        entry.state.invite_link = invite_link
+        entry.state.expected_guests = expected_guests
+        entry.state.guest_count = 0
+        self._changed(room, entry)
+
+    async def set_share_link(self, room: str) -> bool:
+        entry = self._room(room)
+        if entry is None or entry.state.invite_link is None:
+            return False
+        entry.state.share_link = entry.state.invite_link
+        self._changed(room, entry)
+        return True
+
+    async def guest_join(self, room: str) -> Optional[int]:
+        entry = self._room(room)
+        if entry is None or entry.state.guest_count >= entry.state.expected_guests:
+            return None
+        entry.state.guest_count += 1
+        self._changed(room, entry)
+        return entry.state.guest_count
+
+    async def clear(self, room: str) -> None:
+        entry = self._room(room)
+        if entry is not None:
+            entry.state = InviteState()
+            self._changed(room, entry)
+
+    async def sweep(self) -> int:
+        cutoff = time.monotonic() - self.ttl
+        expired = [r for r, e in self._rooms.items() if e.touched_at < cutoff]
+        for r in expired:
+            del self._rooms[r]
+        return len(expired)
+
+
+# ─── shared (database) store ─────────────────────────────────────────
+Room = models.SignalingRoom
+_next_version = models.signaling_room_version_seq.next_value
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _db_get(session: Session, room: str, cutoff: datetime) -> Tuple[InviteState, int]:
+    row = session.get(Room, room)
+    if row is None or as_utc(row.updated_at) < cutoff:
+        return InviteState(), 0
+    state = InviteState(
+        invite_link=row.invite_link,
+        guest_count=row.guest_count,
+        expected_guests=row.expected_guests,
+        share_link=row.share_link,
+    )
+    return state, row.version
+
+
+def _db_update(session: Session, room: str, *conditions, **values) -> Optional[int]:
+    """Apply `values` and bump the version if the row matches; the new guest_count."""
+    result = session.execute(
+        update(Room)
+        .where(Room.room == room, *conditions)
+        .values(version=_next_version(), updated_at=_now(), **values)
+        .returning(Room.guest_count)
+    ).first()
+    session.commit()
+    return None if result is None else result[0]
+
+
+def _db_set_invite(
+        session: Session,
+        room: str,
+        invite_link: Optional[str],
+        expected_guests: int,
+        cutoff: datetime,
+) -> None:
+    # an expired room starts over rather than reviving its old share link
+    session.execute(delete(Room).where(Room.room == room, Room.updated_at < cutoff))
+    values = dict(invite_link=invite_link, expected_guests=expected_guests, guest_count=0)
+    if _db_update(session, room, **values) is not None:
+        return
+    session.add(Room(room=room, version=_next_version(), updated_at=_now(), **values))
+    try:
+        session.commit()
+    except IntegrityError:
+        # another worker created the room first
+        session.rollback()
+        _db_update(session, room, **values)
+
+
+def _db_share_link(session: Session, room: str, cutoff: datetime) -> bool:
+    return _db_update(
+        session, room, Room.invite_link.isnot(None), Room.updated_at >= cutoff,
+        share_link=Room.invite_link,
+    ) is not None
+
+
+def _db_guest_join(session: Session, room: str, cutoff: datetime) -> Optional[int]:
+    return _db_update(
+        session, room, Room.guest_count < Room.expected_guests, Room.updated_at >= cutoff,
+        guest_count=Room.guest_count + 1,
+    )
+
+
+def _db_clear(session: Session, room: str) -> None:
+    _db_update(session, room, invite_link=None, share_link=None, guest_count=0, expected_guests=0)
+
+
+def _db_sweep(session: Session, cutoff: datetime) -> int:
+    removed = session.execute(delete(Room).where(Room.updated_at < cutoff)).rowcount
+    session.commit()
+    return removed
+
+
+class DatabaseStore(SignalingStore):
+    """
+    Rooms in the `signaling_rooms` table, shared by every worker. Guest
+    admission is one conditional UPDATE, so it cannot over-admit. Versions
+    come from `signaling_room_version_seq`: expired rows are deleted, and a
+    per-row count would restart at 1 and could repeat the `since` a client
+    still holds from the old room, hiding a change from it.
+    """
+
+    sync_interval = SIGNALING_SYNC_INTERVAL
+
+    async def _run(self, fn, *args):
+        async with async_session_scope() as db:
+            return await db.run_sync(fn, *args)
+
+    def _cutoff(self) -> datetime:
+        return _now() - timedelta(seconds=self.ttl)
+
+    async def get(self, room: str) -> Tuple[InviteState, int]:
+        return await self._run(_db_get, room, self._cutoff())
+
+    async def set_invite(self, room: str, invite_link: Optional[str], expected_guests: int) -> None:
+        await self._run(_db_set_invite, room, invite_link, expected_guests, self._cutoff())
+        self.publish(room)
+
+    async def set_share_link(self, room: str) -> bool:
+        updated = await self._run(_db_share_link, room, self._cutoff())
+        if updated:
+            self.publish(room)
+        return updated
+
+    async def guest_join(self, room: str) -> Optional[int]:
+        count = await self._run(_db_guest_join, room, self._cutoff())
+        if count is not None:
+            self.publish(room)
+        return count
+
+    async def clear(self, room: str) -> None:
+        await self._run(_db_clear, room)
+        self.publish(room)
+
+    async def sweep(self) -> int:
+        return await self._run(_db_sweep, self._cutoff())
+
+
+STORES = {"memory": MemoryStore, "database": DatabaseStore}
+
+
+def create_store(kind: str = SIGNALING_STORE) -> SignalingStore:
+    if kind not in STORES:
+        raise RuntimeError(f"SIGNALING_STORE must be one of {', '.join(STORES)}, got {kind!r}")
+    return STORES[kind]()
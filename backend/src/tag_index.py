@@ -0,0 +1,71 @@
+# src/tag_index.py
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from .db import models
+
+# rebuilt after project writes in this process, and at most this old otherwise
+TAG_INDEX_TTL = float(os.getenv("TAG_INDEX_TTL", "60"))
+
+
+class TagIndex:
+    """
+    Tag -> bitmap of projects carrying it, with Python ints as bitsets
+    (bit i is the i-th project by id). AND/OR filters are `&`/`|` over a
+    few bitmaps and each facet count is one popcount, so a filter change
+    costs no query once the index is built.
+    """
+
+    def __init__(self, ttl: float = TAG_INDEX_TTL):
+        self.ttl = ttl
+        self._bitmaps: Dict[str, int] = {}
+        self._all = 0
+        self._built_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._built_at = None
+
+    def _ensure(self, session: Session) -> Tuple[Dict[str, int], int]:
+        with self._lock:
+            if self._built_at is None or time.monotonic() - self._built_at >= self.ttl:
+                rows = session.query(models.Project.id, models.Project.tech_tags).order_by(models.Project.id).all()
+                bitmaps: Dict[str, int] = {}
+                for bit, row in enumerate(rows):
+                    for tag in set(row.tech_tags or ()):
+                        bitmaps[tag] = bitmaps.get(tag, 0) | (1 << bit)
+                self._bitmaps, self._all = bitmaps, (1 << len(rows)) - 1
+                self._built_at = time.monotonic()
+            return self._bitmaps, self._all
+
+    def facets(self, session: Session, tags: Sequence[str], match_all: bool) -> Tuple[int, Dict[str, int]]:
+        """
+        Projects matching the filter, and per tag how many of them carry it
+        (for `match_all`, the result size if that tag were added). Tags
+        with no matching project are left out.
+        """
+        bitmaps, everything = self._ensure(session)
+        if not tags:
+            selected = everything
+        elif match_all:
+            selected = everything
+            for tag in tags:
+                selected &= bitmaps.get(tag, 0)
+        else:
+            selected = 0
+            for tag in tags:
+                selected |= bitmaps.get(tag, 0)
+
+        counts = {tag: (bm & selected).bit_count() for tag, bm in bitmaps.items()}
+        ranked: List[Tuple[str, int]] = sorted(
+            ((t, n) for t, n in counts.items() if n), key=lambda kv: (-kv[1], kv[0])
+        )
+        return selected.bit_count(), dict(ranked)
+
+
+tag_index = TagIndex()
@@ -0,0 +1,109 @@
+# src/tag_popularity.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .db import models
+
+CacheKey = Tuple[Optional[datetime], Optional[datetime], bool]
+
+# views written by other workers only reach this process's cache by expiry
+TAG_POPULARITY_TTL = float(os.getenv("TAG_POPULARITY_TTL", "30"))
+
+
+def compute_tag_popularity(
+        db: Session,
+        from_date: Optional[datetime] = None,
+        to_date: Optional[datetime] = None,
+        weight_by_views: bool = False,
+) -> Dict[str, int]:
+    """
+    Count tags of projects viewed in [from_date, to_date] in one statement.
+
+    By default each tag counts the distinct viewed projects carrying it;
+    with `weight_by_views` every view of such a project counts.
+    """
+    # 1) Views per project in the range (one row per project)
+    views = select(
+        models.PageView.project_id.label("pid"),
+        func.count().label("n"),
+    ).where(models.PageView.project_id.isnot(None))
+    if from_date:
+        views = views.where(models.PageView.timestamp >= from_date)
+    if to_date:
+        views = views.where(models.PageView.timestamp <= to_date)
+    views = views.group_by(models.PageView.project_id).subquery()
+
+    # 2) Unnest tags of those projects and aggregate per tag
+    tag = func.unnest(models.Project.tech_tags).table_valued("tag").render_derived()
+    score = func.sum(views.c.n) if weight_by_views else func.count(func.distinct(models.Project.id))
+    stmt = (
+        select(tag.c.tag, score.label("score"))
+        .select_from(models.Project)
+        .join(views, views.c.pid == models.Project.id)
+        .join(tag, tag.c.tag.isnot(None))
+        .group_by(tag.c.tag)
+    )
+    return {row.tag: int(row.score) for row in db.execute(stmt)}
+
+
+class TagPopularityCache:
+    """
+    LRU cache of tag popularity per (from_date, to_date, weighting).
+
+    An entry stays valid for `ttl` seconds, until page views are written in
+    this process whose timestamps fall inside its range, or until project
+    tags change.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl: float = TAG_POPULARITY_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Dict[str, int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, int]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: CacheKey, value: Dict[str, int]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def note_views(self, timestamps: Iterable[datetime]) -> None:
+        """Drop entries whose range covers any of the newly written views."""
+        timestamps = list(timestamps)
+        if not timestamps:
+            return
+        lo, hi = min(timestamps), max(timestamps)
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if (key[0] is None or key[0] <= hi) and (key[1] is None or key[1] >= lo)
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+tag_popularity_cache = TagPopularityCache()
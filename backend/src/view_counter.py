@@ -0,0 +1,104 @@
+# src/view_counter.py
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, func, update
+
+from .db import models
+from .db.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+VIEW_COUNT_FLUSH_INTERVAL = float(os.getenv("VIEW_COUNT_FLUSH_INTERVAL", "5"))
+# name of the flusher thread; tests ignore its statements
+THREAD_NAME = "view-counter"
+
+
+class ViewCounter:
+    """
+    Write-behind aggregator for `Project.view_count`.
+
+    Increments are collected in memory and written out periodically as one
+    batched `UPDATE projects SET view_count = view_count + n` per project,
+    so serving a project page never opens a write transaction.
+    """
+
+    def __init__(self, flush_interval: float = VIEW_COUNT_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._pending: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def increment(self, project_id: int, n: int = 1) -> None:
+        with self._lock:
+            self._pending[project_id] = self._pending.get(project_id, 0) + n
+
+    def pending(self, project_id: int) -> int:
+        """Views recorded for `project_id` that are not yet in the database."""
+        with self._lock:
+            return self._pending.get(project_id, 0)
+
+    def apply(self, project_id: int, stored: Optional[int]) -> int:
+        """Stored count plus any pending delta, for read paths."""
+        return (stored or 0) + self.pending(project_id)
+
+    def flush(self) -> int:
+        """Write all pending deltas in one transaction. Returns rows touched."""
+        # 1) Swap out the pending map so increments keep flowing meanwhile
+        with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+
+        stmt = (
+            update(models.Project)
+            .where(models.Project.id == bindparam("pid"))
+            .values(
+                view_count=func.coalesce(models.Project.view_count, 0) + bindparam("delta"),
+                # views are not edits; keep updated_at (and anything keyed on it) stable
+                updated_at=models.Project.updated_at,
+            )
+        )
+        params = [{"pid": pid, "delta": delta} for pid, delta in batch.items()]
+
+        # 2) One executemany UPDATE for the whole batch
+        db = SessionLocal()
+        try:
+            db.connection().execute(stmt, params)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # put the deltas back so the next flush retries them
+            with self._lock:
+                for pid, delta in batch.items():
+                    self._pending[pid] = self._pending.get(pid, 0) + delta
+            logger.exception("View count flush failed; %d projects re-queued", len(batch))
+            return 0
+        finally:
+            db.close()
+        return len(batch)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=THREAD_NAME, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher thread and write out whatever is still pending."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
+
+
+view_counter = ViewCounter()
@@ -0,0 +1,129 @@
+# src/view_rollup.py
+from collections import Counter
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, or_, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from .db import models
+
+# Rollup days are UTC calendar days.
+UTC = timezone.utc
+
+
+def as_utc(ts: datetime) -> datetime:
+    # naive datetimes are taken to be UTC already
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=UTC)
+    return ts.astimezone(UTC)
+
+
+def utc_day(ts: datetime) -> date:
+    return as_utc(ts).date()
+
+
+def _day_start(d: date) -> datetime:
+    return datetime.combine(d, time.min, tzinfo=UTC)
+
+
+def record_daily_views(db: Session, rows: Iterable[Dict[str, Any]]) -> None:
+    """
+    Add freshly inserted page-view rows to `page_views_daily`.
+    Call inside the same transaction as the raw insert.
+    """
+    counts = Counter(
+        (r["project_id"], utc_day(r["timestamp"]))
+        for r in rows
+        if r.get("project_id") is not None
+    )
+    if not counts:
+        return
+    stmt = pg_insert(models.PageViewDaily).values([
+        {"project_id": pid, "date": day, "count": n}
+        for (pid, day), n in counts.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.PageViewDaily.project_id, models.PageViewDaily.date],
+        set_={"count": models.PageViewDaily.count + stmt.excluded["count"]},
+    )
+    db.execute(stmt)
+
+
+def daily_view_counts(
+        db: Session,
+        project_id: Optional[int] = None,
+        from_date: Optional[datetime] = None,
+        to_date: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Views per UTC day in [from_date, to_date].
+
+    Whole days that are already closed come from the rollup table; only
+    partially covered boundary days and today are counted from raw rows.
+    """
+    today = datetime.now(UTC).date()
+
+    # 1) The span of whole, closed days the rollup can answer for
+    first_full: Optional[date] = None
+    if from_date:
+        first_full = utc_day(from_date)
+        if as_utc(from_date) > _day_start(first_full):
+            first_full += timedelta(days=1)
+    last_full = today - timedelta(days=1)
+    if to_date:
+        # to_date is inclusive, so its own day is only whole if it is the last instant
+        last_full = min(last_full, utc_day(to_date) - timedelta(days=1))
+
+    totals: Counter = Counter()
+    has_rollup_span = first_full is None or first_full <= last_full
+
+    if has_rollup_span:
+        rq = db.query(
+            models.PageViewDaily.date,
+            func.sum(models.PageViewDaily.count).label("count"),
+        )
+        if project_id:
+            rq = rq.filter(models.PageViewDaily.project_id == project_id)
+        if first_full:
+            rq = rq.filter(models.PageViewDaily.date >= first_full)
+        rq = rq.filter(models.PageViewDaily.date <= last_full)
+        for r in rq.group_by(models.PageViewDaily.date).all():
+            totals[r.date] += int(r.count)
+
+    # 2) Raw rows for everything outside that span
+    day = func.date(func.timezone("UTC", models.PageView.timestamp)).label("date")
+    q = db.query(day, func.count(models.PageView.id).label("count"))
+    if project_id:
+        q = q.filter(models.PageView.project_id == project_id)
+    if from_date:
+        q = q.filter(models.PageView.timestamp >= from_date)
+    if to_date:
+        q = q.filter(models.PageView.timestamp <= to_date)
+    if has_rollup_span:
+        outside = [models.PageView.timestamp >= _day_start(last_full + timedelta(days=1))]
+        if first_full:
+            outside.append(models.PageView.timestamp < _day_start(first_full))
+        q = q.filter(or_(*outside))
+    for r in q.group_by(day).all():
+        totals[r.date] += r.count
+
+    return [{"date": str(d), "count": totals[d]} for d in sorted(totals)]
+
+
+def backfill_daily_views(db: Session) -> int:
+    """
+    Rebuild `page_views_daily` from the raw `page_views` table.
+    Idempotent: existing rollup rows are overwritten with exact counts.
+    """
+    result = db.execute(text("""
+        INSERT INTO page_views_daily (project_id, date, count)
+        SELECT project_id, date(timezone('UTC', timestamp)), count(*)
+        FROM page_views
+        WHERE project_id IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT (project_id, date) DO UPDATE SET count = EXCLUDED.count
+    """))
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,58 @@
+# tests/test_chat_context.py
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src import chat_context
+
+
+@pytest.fixture
+def conversation(db_session):
+    """
+    Three turns, each stored like the chat route does: the reply first,
+    then the user message stamped with the earlier time it was sent.
+    Returns the session id and the message ids in conversation order.
+    """
+    from src.db import models
+
+    chat = models.ChatSession()
+    db_session.add(chat)
+    db_session.flush()
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    ordered = []
+    for turn in range(3):
+        sent = start + timedelta(minutes=2 * turn)
+        bot = models.ChatMessage(session_id=chat.id, sender="bot", message=f"answer {turn}",
+                                 timestamp=sent + timedelta(minutes=1))
+        db_session.add(bot)
+        db_session.flush()
+        user = models.ChatMessage(session_id=chat.id, sender="user", message=f"question {turn}", timestamp=sent)
+        db_session.add(user)
+        db_session.flush()
+        ordered += [user.id, bot.id]
+    db_session.commit()
+
+    yield chat.id, ordered
+
+    db_session.delete(chat)
+    db_session.commit()
+
+
+def test_window_summary_batch_and_floor_share_one_order(db_session, conversation, monkeypatch):
+    session_id, ordered = conversation
+    monkeypatch.setattr(chat_context, "CHAT_CONTEXT_MAX_MESSAGES", 2)
+
+    context = chat_context.load_context(db_session, session_id)
+    assert [t["content"] for t in context.turns] == ["question 2", "answer 2"]
+    assert context.oldest_turn_id == ordered[4] and context.needs_summary
+
+    # everything before the window, nothing in it
+    previous, floor, batch = chat_context.load_summary_batch(db_session, session_id, context.oldest_turn_id)
+    assert (previous, floor) == (None, 0)
+    assert [text for _, _, text in batch] == ["question 0", "answer 0", "question 1", "answer 1"]
+
+    assert chat_context.store_summary(db_session, session_id, floor, "Two questions so far.", batch[-1][0])
+    context = chat_context.load_context(db_session, session_id)
+    assert context.summary == "Two questions so far."
+    assert [t["content"] for t in context.turns] == ["question 2", "answer 2"]
+    assert not context.needs_summary
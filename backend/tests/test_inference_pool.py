@@ -0,0 +1,59 @@
+# tests/test_inference_pool.py
+import gc
+
+import pytest
+
+from src.inference_pool import InferencePool, InferencePoolSaturated
+
+
+def _chunks(n):
+    return iter(range(n))
+
+
+@pytest.fixture
+def pool():
+    pool = InferencePool(workers=1, queue_size=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_abandoned_streams_release_their_slots(pool):
+    # the client disconnected before the body read a single chunk
+    for _ in range(2):
+        pool.stream(_chunks, 3)
+    gc.collect()
+
+    assert pool.stats()["queue_depth"] == 0
+    pool.stream(_chunks, 3)
+
+
+def test_saturated_pool_rejects_streams(pool):
+    held = [pool.stream(_chunks, 3), pool.stream(_chunks, 3)]
+    with pytest.raises(InferencePoolSaturated):
+        pool.stream(_chunks, 3)
+    assert pool.rejected == 1
+    del held
+
+
+@pytest.mark.anyio
+async def test_closing_an_unread_stream_releases_its_slot(pool):
+    streams = [pool.stream(_chunks, 3), pool.stream(_chunks, 3)]
+    for stream in streams:
+        await stream.aclose()
+        await stream.aclose()  # idempotent
+
+    assert [item async for item in pool.stream(_chunks, 3)] == [0, 1, 2]
+
+
+@pytest.mark.anyio
+async def test_consumed_stream_releases_its_slot(pool):
+    for _ in range(3):
+        assert [item async for item in pool.stream(_chunks, 2)] == [0, 1]
+        await pool.stream(_chunks, 0).aclose()
+
+
+@pytest.mark.anyio
+async def test_run_releases_its_slot(pool):
+    for n in range(3):
+        assert await pool.run(("key", n), sum, [n, 1]) == n + 1
+    assert pool.stats()["queue_depth"] == 0
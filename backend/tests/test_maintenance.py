@@ -0,0 +1,39 @@
+# tests/test_maintenance.py
+import pytest
+from sqlalchemy import text
+
+from src.db import maintenance
+
+
+@pytest.fixture
+def conn(database):
+    # everything a test does is rolled back; request it after data fixtures,
+    # whose cleanup would otherwise wait on this transaction's locks
+    with database.connect() as conn:
+        transaction = conn.begin()
+        yield conn
+        transaction.rollback()
+
+
+def test_data_migrations_run_once(conn, monkeypatch):
+    monkeypatch.setattr(maintenance, "DATA_MIGRATIONS", {
+        **maintenance.DATA_MIGRATIONS,
+        "test-counter": "CREATE TEMPORARY TABLE IF NOT EXISTS test_counter (n int); INSERT INTO test_counter VALUES (1)",
+    })
+    first = maintenance.apply_data_migrations(conn)
+    second = maintenance.apply_data_migrations(conn)
+
+    assert "test-counter" in first and second == []
+    assert conn.execute(text("SELECT count(*) FROM test_counter")).scalar() == 1
+
+
+def test_upgrade_keeps_rendered_heads(sample_projects, conn):
+    maintenance.apply_data_migrations(conn)
+    heads = text("SELECT count(*) FROM projects WHERE id = ANY(:ids) AND json_head IS NOT NULL")
+    before = conn.execute(heads, {"ids": sample_projects}).scalar()
+
+    for stmt in maintenance.SCHEMA_UPGRADES:
+        conn.execute(text(stmt))
+    maintenance.apply_data_migrations(conn)
+    assert conn.execute(heads, {"ids": sample_projects}).scalar() == before == len(sample_projects)
+
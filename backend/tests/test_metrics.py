@@ -0,0 +1,76 @@
+# tests/test_metrics.py
+import threading
+import uuid
+
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from src import metrics
+
+
+def test_pool_checkouts_are_timed_through_events():
+    engine = create_engine("sqlite://", poolclass=metrics.TimedQueuePool)
+    name = f"test-{uuid.uuid4().hex[:8]}"
+    metrics.instrument_engine(engine, name)
+    try:
+        with engine.connect():
+            pass
+        with engine.connect():
+            pass
+        counts, _ = metrics.POOL_HOLD._series[(name,)]
+        assert sum(counts) == 2
+        checked_out = dict((g[0], g[2]) for g in metrics._pool_gauges())["db_pool_checked_out"]
+        assert checked_out[(name,)] == 0
+    finally:
+        del metrics._engines[name]
+        engine.dispose()
+
+
+def test_waiting_on_an_exhausted_pool_is_timed():
+    name = f"test-{uuid.uuid4().hex[:8]}"
+    engine = create_engine(
+        "sqlite://", poolclass=metrics.TimedQueuePool, pool_size=1, max_overflow=0,
+        pool_logging_name=name, connect_args={"check_same_thread": False},
+    )
+    held = engine.connect()
+    release = threading.Timer(0.2, held.close)
+    try:
+        release.start()
+        with engine.connect():
+            pass
+        counts, total = metrics.POOL_WAIT._series[(name,)]
+        assert sum(counts) == 2
+        # the second caller waited for the first connection to come back
+        assert total[0] >= 0.2
+        # the pool class survives dispose(), so waits stay timed
+        engine.dispose()
+        assert isinstance(engine.pool, metrics.TimedQueuePool) and engine.pool.logging_name == name
+    finally:
+        release.join()
+        engine.dispose()
+
+
+def test_requests_are_labelled_by_route_mount_or_unmatched(tmp_path):
+    (tmp_path / "a.txt").write_text("hello")
+    prefix = f"/files-{uuid.uuid4().hex[:8]}"
+    app = FastAPI()
+    app.mount(prefix, StaticFiles(directory=tmp_path))
+
+    @app.get(prefix + "-items/{item_id}")
+    def item(item_id: int):
+        return {"id": item_id}
+
+    client = TestClient(metrics.MetricsMiddleware(app))
+
+    assert client.get(f"{prefix}-items/1").status_code == 200
+    assert client.get(f"{prefix}/a.txt").status_code == 200
+    assert client.get(f"{prefix}/missing.txt").status_code == 404
+    assert client.get(f"/nowhere-{prefix[7:]}").status_code == 404
+
+    assert metrics.REQUESTS._values[("GET", prefix + "-items/{item_id}", "200")] == 1
+    mount_label = f"{prefix}/{{path:path}}"
+    assert metrics.REQUESTS._values[("GET", mount_label, "200")] == 1
+    assert metrics.REQUESTS._values[("GET", mount_label, "404")] == 1
+    assert ("GET", "unmatched", "404") in metrics.REQUESTS._values
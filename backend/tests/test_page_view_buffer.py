@@ -0,0 +1,71 @@
+# tests/test_page_view_buffer.py
+from datetime import datetime, timezone
+
+from sqlalchemy import exc
+
+from src.page_view_buffer import PageViewBuffer
+
+
+class FakeDatabase(PageViewBuffer):
+    """Keeps written rows in a list; project 0 breaks the foreign key."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.rows = []
+        self.down = False
+
+    def _write(self, rows):
+        if self.down:
+            raise exc.OperationalError("INSERT", {}, Exception("connection refused"))
+        if any(r["project_id"] == 0 for r in rows):
+            raise exc.IntegrityError("INSERT", {}, Exception("violates foreign key constraint"))
+        self.rows += rows
+
+
+def _views(*project_ids):
+    return [{"project_id": pid, "path": "/", "timestamp": datetime(2024, 1, 1, tzinfo=timezone.utc)}
+            for pid in project_ids]
+
+
+def test_refused_rows_do_not_block_the_queue():
+    buffer = FakeDatabase(batch_size=3)
+    buffer.enqueue(_views(1, 0, 2, 3, 4))
+
+    assert buffer.flush() == 4
+    assert [r["project_id"] for r in buffer.rows] == [1, 2, 3, 4]
+    stats = buffer.stats()
+    assert stats["depth"] == 0 and stats["rejected"] == 1 and stats["flushed"] == 4
+
+
+def test_transient_failure_requeues_in_order():
+    buffer = FakeDatabase(batch_size=2)
+    buffer.enqueue(_views(1, 2, 3))
+    buffer.down = True
+
+    assert buffer.flush() == 0
+    assert buffer.depth() == 3
+
+    buffer.down = False
+    assert buffer.flush() == 3
+    assert [r["project_id"] for r in buffer.rows] == [1, 2, 3]
+
+
+def test_transient_failures_give_up_after_max_retries():
+    buffer = FakeDatabase(batch_size=2, max_retries=2)
+    buffer.enqueue(_views(1, 2, 3))
+    buffer.down = True
+
+    for _ in range(2):
+        buffer.flush()
+        assert buffer.depth() == 3
+    buffer.flush()
+    # the oldest batch is dropped, the rest waits for the database
+    assert buffer.depth() == 1
+    assert buffer.stats()["dropped"] == 2
+
+
+def test_full_buffer_rejects_whole_batches():
+    buffer = FakeDatabase(max_size=3)
+    assert buffer.enqueue(_views(1, 2))
+    assert not buffer.enqueue(_views(3, 4))
+    assert buffer.depth() == 2 and buffer.stats()["dropped"] == 2
@@ -0,0 +1,65 @@
+# tests/test_pagination.py
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from src.pagination import decode_cursor, encode_cursor, keyset_page
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    cursor = encode_cursor(created_at, 42)
+
+    assert "=" not in cursor  # padding is stripped for URLs
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+def test_cursor_keeps_the_utc_offset():
+    created_at = datetime(2024, 5, 1, 23, 0, tzinfo=timezone(timedelta(hours=-5)))
+    decoded, _ = decode_cursor(encode_cursor(created_at, 1))
+    assert decoded == created_at and decoded.utcoffset() == timedelta(hours=-5)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "e30", encode_cursor(datetime(2024, 1, 1), 1)[:-3]])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as info:
+        decode_cursor(cursor)
+    assert info.value.status_code == 400
+
+
+def test_keyset_pages_break_ties_by_id(db_session, sample_projects):
+    from src.db import models
+
+    # every row at the same instant: only the id orders them
+    same_time = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    db_session.query(models.Project).filter(models.Project.id.in_(sample_projects)).update(
+        {"created_at": same_time}, synchronize_session=False,
+    )
+    db_session.commit()
+    query = db_session.query(models.Project.id, models.Project.created_at).filter(
+        models.Project.id.in_(sample_projects)
+    )
+
+    seen, cursor = [], None
+    for _ in range(len(sample_projects)):
+        rows, cursor = keyset_page(query, models.Project.created_at, models.Project.id, 2, cursor)
+        seen += [r.id for r in rows]
+        if cursor is None:
+            break
+
+    assert seen == sorted(sample_projects, reverse=True)
+    assert cursor is None
+
+
+def test_offset_still_pages_for_old_clients(client, sample_projects):
+    tag = client.get(f"/api/v1/projects/{sample_projects[0]}").json()["techTags"][0]
+
+    first = client.get("/api/v1/projects/", params={"tag": tag, "limit": 2})
+    rest = client.get("/api/v1/projects/", params={"tag": tag, "limit": 2, "offset": 2})
+    skipped = client.get("/api/v1/projects/", params={"tag": tag, "limit": 2, "offset": 1})
+
+    assert rest.status_code == skipped.status_code == 200
+    ids = [p["id"] for p in first.json()] + [p["id"] for p in rest.json()]
+    assert ids == sorted(sample_projects, reverse=True)
+    assert [p["id"] for p in skipped.json()] == ids[1:3]
@@ -0,0 +1,73 @@
+# tests/test_project_json.py
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from src import project_json
+from src.db import models, schemas
+
+
+def _project(**overrides):
+    fields = dict(
+        id=7,
+        title="Realtime chat",
+        short_desc="Chat over websockets",
+        detail_desc=None,
+        tech_tags=["python"],
+        thumbnail="https://example.com/t.png",
+        images=["https://example.com/a.png"],
+        demo_url=None,
+        github_url="https://github.com/example/chat",
+        image_sets=None,
+        created_at=datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    )
+    return models.Project(**{**fields, **overrides})
+
+
+def test_rendered_json_matches_the_schema():
+    project = _project()
+    updated_at = datetime(2024, 2, 1, tzinfo=timezone.utc)
+    body = project_json.render(project_json.render_head(project), updated_at, 12, 3)
+
+    expected = schemas.Project.model_validate({
+        **{name: getattr(project, name) for name in project_json.HEAD_FIELDS},
+        "id": 7, "updated_at": updated_at, "view_count": 12, "comments": 3,
+    }).model_dump(mode="json", by_alias=True)
+    assert json.loads(body) == expected
+    assert json.loads(project_json.render_list([body, body])) == [expected, expected]
+
+
+def test_invalid_row_is_not_stored():
+    assert project_json._safe_render(_project(thumbnail="None")) is None
+
+
+def test_omitted_urls_are_stored_as_null(client, db_session, admin_headers):
+    response = client.post(
+        "/api/v1/projects/",
+        json={"title": "Test project without links", "shortDesc": "No URLs", "techTags": ["test"]},
+        headers=admin_headers,
+    )
+    try:
+        assert response.status_code == 201, response.text
+        body = response.json()
+        assert body["thumbnail"] is None and body["githubUrl"] is None and body["demoUrl"] is None
+    finally:
+        db_session.query(models.Project).filter(models.Project.title == "Test project without links").delete()
+        db_session.commit()
+
+
+def test_rows_that_do_not_validate_are_still_served(client, db_session, sample_projects):
+    # what create_project used to store for an omitted URL
+    pid = sample_projects[0]
+    db_session.execute(
+        text("UPDATE projects SET thumbnail = 'None', json_head = NULL WHERE id = :id"), {"id": pid}
+    )
+    db_session.commit()
+
+    listing = client.get("/api/v1/projects/", params={"limit": 100})
+    assert listing.status_code == 200
+    assert pid in [p["id"] for p in listing.json()]
+    detail = client.get(f"/api/v1/projects/{pid}")
+    assert detail.status_code == 200
+    assert detail.json()["thumbnail"] == "None"
@@ -0,0 +1,115 @@
+# tests/test_project_search.py
+from types import SimpleNamespace
+
+import pytest
+
+from src.project_search import InvertedIndex, parse_query, tokenize
+
+
+class FakeSession:
+    """Answers the index's one query with fixed rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def query(self, *columns):
+        self.queries += 1
+        return self
+
+    def all(self):
+        return self.rows
+
+
+def _project(id_, title, tags=(), short_desc="", detail_desc=""):
+    return SimpleNamespace(id=id_, title=title, tech_tags=list(tags), short_desc=short_desc, detail_desc=detail_desc)
+
+
+PROJECTS = [
+    _project(1, "Realtime chat", ["python", "websocket"], "Chat over websockets", "Built with FastAPI."),
+    _project(2, "Image resizer", ["python", "pillow"], "Resizes images", "Mentions chat only in passing."),
+    _project(3, "Portfolio site", ["react"], "A React portfolio", "Has a contact form."),
+    _project(4, "Chat bot", ["python", "chat"], "Chat bot answering chat questions", "Chat history included."),
+]
+
+
+@pytest.fixture
+def index():
+    return InvertedIndex(ttl=60)
+
+
+def _ids(hits):
+    return [h.project_id for h in hits]
+
+
+def test_query_syntax():
+    assert parse_query('fastapi "real time" or react -php') == ([["fastapi", "real", "time"], ["react"]], ["php"])
+    assert parse_query("the and of") == ([], [])
+    assert tokenize("Chat-Bot, the FastAPI app") == ["chat", "bot", "fastapi", "app"]
+
+
+def test_title_and_tag_matches_outrank_body_matches(index):
+    hits, total = index.search(FakeSession(PROJECTS), "chat", limit=10, offset=0)
+
+    assert total == 3
+    # title + tag + every field, title + short desc, then detail desc only
+    assert _ids(hits) == [4, 1, 2]
+    assert hits[0].rank > hits[1].rank > hits[2].rank
+    assert hits[0].title == "<mark>Chat</mark> bot"
+
+
+def test_all_terms_must_match(index):
+    session = FakeSession(PROJECTS)
+    assert _ids(index.search(session, "python chat", 10, 0)[0]) == [4, 1, 2]
+    assert _ids(index.search(session, "python react", 10, 0)[0]) == []
+    # the rarer term weighs more; equal scores go newest id first
+    assert _ids(index.search(session, "python or react", 10, 0)[0]) == [3, 4, 2, 1]
+
+
+def test_excluded_terms(index):
+    hits, total = index.search(FakeSession(PROJECTS), "chat -bot", 10, 0)
+    assert _ids(hits) == [1, 2] and total == 2
+
+
+def test_paging_keeps_the_total(index):
+    session = FakeSession(PROJECTS)
+    hits, total = index.search(session, "chat", limit=2, offset=2)
+    assert _ids(hits) == [2] and total == 3
+    assert index.search(session, "chat", limit=2, offset=10) == ([], 3)
+
+
+def test_snippets_are_escaped_and_highlighted(index):
+    rows = [_project(1, "<b>Chat</b>", [], "Talk & chat safely", "")]
+    hit = index.search(FakeSession(rows), "chat", 10, 0)[0][0]
+    assert hit.title == "&lt;b&gt;<mark>Chat</mark>&lt;/b&gt;"
+    assert hit.snippet == "Talk &amp; <mark>chat</mark> safely"
+
+
+def test_index_is_rebuilt_after_invalidate(index):
+    session = FakeSession(PROJECTS)
+    index.search(session, "chat", 10, 0)
+    index.search(session, "react", 10, 0)
+    assert session.queries == 1
+
+    session.rows = PROJECTS + [_project(5, "Another chat", [], "", "")]
+    index.invalidate()
+    assert index.search(session, "another", 10, 0)[1] == 1
+    assert session.queries == 2
+
+
+def test_postgres_search_finds_new_projects(client, sample_projects, db_session):
+    from src.db import models
+
+    # the trigger filled the vector when the rows were inserted
+    project = db_session.get(models.Project, sample_projects[1])
+    assert db_session.query(models.Project.search_vector).filter_by(id=project.id).scalar() is not None
+
+    run = project.title.split()[2]
+    response = client.get("/api/v1/projects/search", params={"q": f"{run} -nothing"})
+    assert response.status_code == 200
+    assert sorted(hit["project"]["id"] for hit in response.json()["results"]) == sorted(sample_projects)
+
+    db_session.query(models.Project).filter_by(id=project.id).update({"title": f"Renamed {run}x"})
+    db_session.commit()
+    response = client.get("/api/v1/projects/search", params={"q": f"{run}x"})
+    assert [hit["project"]["id"] for hit in response.json()["results"]] == [project.id]
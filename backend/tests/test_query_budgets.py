@@ -0,0 +1,65 @@
+# tests/test_query_budgets.py
+"""
+Statement budgets for the hot read endpoints. Each is independent of the
+page size, so an N+1 (a query per project or comment) fails here.
+"""
+import pytest
+
+PROJECTS = "/api/v1/projects"
+ANALYTICS = "/api/v1/analytics"
+
+
+def test_project_list(client, sample_projects, assert_num_queries):
+    with assert_num_queries(1):
+        response = client.get(f"{PROJECTS}/", params={"limit": 3})
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+
+def test_project_list_with_tag_facets(client, sample_projects, assert_num_queries):
+    tag = client.get(f"{PROJECTS}/{sample_projects[0]}").json()["techTags"][0]
+    with assert_num_queries(2):
+        response = client.get(f"{PROJECTS}/", params={"tag": tag, "facets": True, "limit": 10})
+    assert response.json()["total"] == 3
+
+    # the tag index is built; a different filter costs only the page query
+    with assert_num_queries(1):
+        client.get(f"{PROJECTS}/", params={"tag": f"{tag}-1", "facets": True})
+
+
+def test_project_detail(client, sample_projects, assert_num_queries):
+    with assert_num_queries(1):
+        response = client.get(f"{PROJECTS}/{sample_projects[0]}")
+    assert response.status_code == 200
+    assert response.json()["comments"] == 2
+
+    # served from the response cache
+    with assert_num_queries(0):
+        client.get(f"{PROJECTS}/{sample_projects[0]}")
+
+
+def test_comment_list(client, sample_projects, assert_num_queries):
+    with assert_num_queries(1):
+        response = client.get(f"{PROJECTS}/{sample_projects[0]}/comments")
+    assert len(response.json()) == 2
+
+
+def test_daily_views(client, sample_projects, admin_headers, assert_max_queries):
+    with assert_max_queries(3):
+        response = client.get(f"{ANALYTICS}/views", headers=admin_headers)
+    assert response.status_code == 200
+
+    # the admin is a cached principal now; one project's days stay as cheap
+    with assert_max_queries(2):
+        client.get(f"{ANALYTICS}/views", params={"project_id": sample_projects[0]}, headers=admin_headers)
+
+
+@pytest.mark.parametrize("weight_by_views", [False, True])
+def test_tag_popularity(client, sample_projects, admin_headers, assert_num_queries, weight_by_views):
+    params = {"weight_by_views": weight_by_views}
+    with assert_num_queries(2):
+        response = client.get(f"{ANALYTICS}/tags/popularity", params=params, headers=admin_headers)
+    assert response.status_code == 200
+
+    with assert_num_queries(0):
+        client.get(f"{ANALYTICS}/tags/popularity", params=params, headers=admin_headers)
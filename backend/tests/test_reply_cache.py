@@ -0,0 +1,88 @@
+# tests/test_reply_cache.py
+import json
+import logging
+import os
+import time
+
+import pytest
+
+from src.reply_cache import ReplyCache
+
+
+def test_put_does_not_touch_the_file(tmp_path):
+    path = tmp_path / "replies.json"
+    cache = ReplyCache(path=str(path))
+    cache.put(cache.key_for("m", "sys", "Hello?"), "Hello?", "Hi!")
+    assert not path.exists()
+
+    cache.save()
+    assert len(json.loads(path.read_text())) == 1
+    assert os.listdir(tmp_path) == ["replies.json"]
+
+
+def test_unchanged_cache_is_not_rewritten(tmp_path):
+    path = tmp_path / "replies.json"
+    cache = ReplyCache(path=str(path))
+    cache.put("k", "hello", "hi")
+    cache.save()
+    path.write_text("{}")
+
+    cache.save()
+    assert path.read_text() == "{}"
+    cache.purge("hello")
+    cache.save()
+    assert json.loads(path.read_text()) == {}
+
+
+def test_stop_saves_and_load_restores(tmp_path):
+    path = str(tmp_path / "replies.json")
+    cache = ReplyCache(path=path, save_interval=3600)
+    cache.start()
+    key = cache.key_for("m", "sys", "What is this?")
+    cache.put(key, "What is this?", "A portfolio.")
+    cache.stop()
+
+    restored = ReplyCache(path=path)
+    restored.load()
+    assert restored.get(cache.key_for("m", "sys", "what is this")) == "A portfolio."
+
+
+def test_concurrent_savers_use_their_own_temp_files(tmp_path):
+    path = str(tmp_path / "replies.json")
+    workers = [ReplyCache(path=path) for _ in range(2)]
+    for i, cache in enumerate(workers):
+        cache.put(f"k{i}", f"question {i}", f"answer {i}")
+    for cache in workers:
+        cache.save()
+    assert list(json.loads((tmp_path / "replies.json").read_text())) == ["k1"]
+    assert os.listdir(tmp_path) == ["replies.json"]
+
+
+@pytest.mark.parametrize("content", ["[1, 2]", '"text"', "null", "{not json"])
+def test_load_ignores_a_file_that_is_not_an_object(tmp_path, content):
+    path = tmp_path / "replies.json"
+    path.write_text(content)
+    cache = ReplyCache(path=str(path))
+    cache.load()
+    assert cache.entries() == []
+
+
+def test_load_skips_malformed_entries(tmp_path, caplog):
+    path = tmp_path / "replies.json"
+    good = {"message": "hello", "reply": "hi", "expires_at": time.time() + 60, "hits": 2}
+    path.write_text(json.dumps({
+        "good": good,
+        "missing": {"message": "hello", "reply": "hi"},
+        "extra": {**good, "model": "old"},
+        "not-a-dict": "hi",
+        "bad-expiry": {**good, "expires_at": None},
+    }))
+    cache = ReplyCache(path=str(path))
+    with caplog.at_level(logging.WARNING, logger="src.reply_cache"):
+        cache.load()
+
+    assert cache.get("good") == "hi"
+    assert [e["message"] for e in cache.entries()] == ["hello"]
+    skipped = [r.getMessage() for r in caplog.records]
+    assert len(skipped) == 4
+    assert all(any(repr(k) in m for m in skipped) for k in ("missing", "extra", "not-a-dict", "bad-expiry"))
@@ -0,0 +1,117 @@
+# tests/test_response_cache.py
+from datetime import datetime, timezone
+
+import pytest
+from starlette.requests import Request
+
+from src import response_cache
+from src.response_cache import ResponseCache, etag_matches
+
+pytestmark = pytest.mark.anyio
+
+
+def _request(path="/api/v1/projects/", query="", if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({
+        "type": "http", "method": "GET", "path": path, "query_string": query.encode(),
+        "headers": headers, "scheme": "http", "server": ("testserver", 80),
+    })
+
+
+class Builder:
+    def __init__(self, body=b'[{"id":1}]'):
+        self.body = body
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.body, datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc), {"X-Next-Cursor": "abc"}
+
+
+async def test_second_request_is_a_hit():
+    cache, build = ResponseCache(), Builder()
+    first = await cache.serve(_request(), build)
+    second = await cache.serve(_request(), build)
+
+    assert build.calls == 1
+    assert first.body == second.body == build.body
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.headers["last-modified"] == "Tue, 02 Jan 2024 03:04:05 GMT"
+    assert second.headers["x-next-cursor"] == "abc"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+async def test_matching_etag_is_a_304():
+    cache, build = ResponseCache(), Builder()
+    etag = (await cache.serve(_request(), build)).headers["etag"]
+
+    for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = await cache.serve(_request(if_none_match=header), build)
+        assert response.status_code == 304 and response.body == b""
+        assert response.headers["etag"] == etag
+    assert (await cache.serve(_request(if_none_match='"other"'), build)).status_code == 200
+    assert cache.stats()["not_modified"] == 4
+
+
+async def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache, build = ResponseCache(ttl=30), Builder()
+
+    await cache.serve(_request(), build)
+    now[0] += 29
+    await cache.serve(_request(), build)
+    assert build.calls == 1
+    now[0] += 2
+    await cache.serve(_request(), build)
+    assert build.calls == 2
+
+
+async def test_changed_body_changes_the_etag():
+    cache, build = ResponseCache(), Builder()
+    etag = (await cache.serve(_request(), build)).headers["etag"]
+    cache.invalidate()
+    build.body = b'[{"id":2}]'
+
+    response = await cache.serve(_request(if_none_match=etag), build)
+    assert response.status_code == 200 and response.headers["etag"] != etag
+
+
+async def test_least_recently_used_entry_is_evicted():
+    cache, build = ResponseCache(max_entries=2), Builder()
+    for path in ("/a", "/b", "/a", "/c"):
+        await cache.serve(_request(path), build)
+    assert build.calls == 3
+
+    await cache.serve(_request("/a"), build)
+    await cache.serve(_request("/b"), build)
+    assert build.calls == 4  # only /b had been evicted
+
+
+def test_key_ignores_query_parameter_order():
+    assert ResponseCache.key_for(_request(query="limit=5&tag=a")) == ResponseCache.key_for(_request(query="tag=a&limit=5"))
+    assert ResponseCache.key_for(_request(query="tag=a")) != ResponseCache.key_for(_request(query="tag=b"))
+
+
+def test_etag_comparison_is_weak():
+    assert etag_matches('W/"x"', '"x"')
+    assert not etag_matches('"y"', '"x"')
+
+
+async def test_response_built_across_an_invalidation_is_not_stored():
+    cache = ResponseCache()
+    stale, fresh = Builder(b'[{"id":1,"comments":0}]'), Builder(b'[{"id":1,"comments":1}]')
+
+    async def build_then_write():
+        result = await stale()
+        # a comment lands while the listing is being built
+        cache.invalidate()
+        return result
+
+    first = await cache.serve(_request(), build_then_write)
+    second = await cache.serve(_request(), fresh)
+
+    assert first.body == stale.body
+    assert second.body == fresh.body and fresh.calls == 1
+    assert second.headers["etag"] != first.headers["etag"]
+    assert (await cache.serve(_request(), fresh)).body == fresh.body and fresh.calls == 1
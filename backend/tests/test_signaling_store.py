@@ -0,0 +1,155 @@
+# tests/test_signaling_store.py
+import asyncio
+
+import pytest
+
+from src import signaling_store
+from src.signaling_store import MemoryStore
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_every_change_bumps_the_version():
+    store = MemoryStore()
+    assert await store.get("room") == (signaling_store.InviteState(), 0)
+
+    await store.set_invite("room", "https://example.com/join", expected_guests=2)
+    assert (await store.get("room"))[1] == 1
+    assert await store.set_share_link("room")
+    assert await store.guest_join("room") == 1
+    assert await store.guest_join("room") == 2
+    state, version = await store.get("room")
+    assert version == 4
+    assert state.share_link == "https://example.com/join" and state.guest_count == 2
+
+    # a full room refuses guests without a new version
+    assert await store.guest_join("room") is None
+    assert (await store.get("room"))[1] == 4
+    await store.clear("room")
+    assert await store.get("room") == (signaling_store.InviteState(), 5)
+
+
+async def test_rooms_are_independent():
+    store = MemoryStore()
+    await store.set_invite("a", "link-a", 1)
+    assert await store.get("b") == (signaling_store.InviteState(), 0)
+    assert not await store.set_share_link("b")
+    assert await store.guest_join("b") is None
+
+
+async def test_wait_returns_on_change():
+    store = MemoryStore()
+    await store.set_invite("room", "link", 3)
+
+    waiter = asyncio.create_task(store.wait("room", since=1, timeout=5))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    await store.guest_join("room")
+
+    state, version = await asyncio.wait_for(waiter, 1)
+    assert version == 2 and state.guest_count == 1
+
+
+async def test_wait_returns_at_once_for_a_stale_version():
+    store = MemoryStore()
+    await store.set_invite("room", "link", 3)
+    assert (await store.wait("room", since=0, timeout=5))[1] == 1
+
+
+async def test_wait_times_out_with_the_same_version():
+    store = MemoryStore()
+    await store.set_invite("room", "link", 3)
+    assert (await store.wait("room", since=1, timeout=0.05))[1] == 1
+
+
+async def test_rooms_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(signaling_store.time, "monotonic", lambda: now[0])
+    store = MemoryStore(ttl=60)
+    await store.set_invite("old", "link", 1)
+    now[0] += 30
+    await store.set_invite("new", "link", 1)
+
+    now[0] += 31
+    assert await store.sweep() == 1
+    assert await store.get("old") == (signaling_store.InviteState(), 0)
+    assert (await store.get("new"))[1] == 2
+
+
+async def test_versions_keep_growing_after_a_room_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(signaling_store.time, "monotonic", lambda: now[0])
+    store = MemoryStore(ttl=60)
+    await store.set_invite("room", "link", 2)
+    await store.guest_join("room")
+    held = (await store.get("room"))[1]
+
+    now[0] += 61
+    await store.set_invite("room", "new link", 2)
+    assert (await store.get("room"))[1] > held
+    assert (await store.wait("room", since=held, timeout=5))[0].invite_link == "new link"
+
+
+def test_a_store_missing_a_method_cannot_be_created():
+    class Incomplete(signaling_store.SignalingStore):
+        async def get(self, room):
+            return signaling_store.InviteState(), 0
+
+    with pytest.raises(TypeError, match="abstract"):
+        Incomplete()
+
+
+async def test_database_store_versions_survive_expiry(database):
+    import uuid
+
+    from src.db.database import SessionLocal
+    from src.db.models import SignalingRoom
+
+    room = f"test-{uuid.uuid4().hex[:8]}"
+    store = signaling_store.DatabaseStore(ttl=3600)
+    try:
+        await store.set_invite(room, "link", 1)
+        assert await store.guest_join(room) == 1
+        assert await store.guest_join(room) is None
+        state, held = await store.get(room)
+        assert state.guest_count == 1
+
+        # the old row expires and the room starts over
+        store.ttl = 0
+        await store.set_invite(room, "new link", 1)
+        store.ttl = 3600
+        state, version = await store.get(room)
+        assert state.invite_link == "new link" and version > held
+    finally:
+        with SessionLocal() as session:
+            session.query(SignalingRoom).filter(SignalingRoom.room == room).delete()
+            session.commit()
+
+
+async def test_waiting_on_many_rooms_leaves_nothing_behind():
+    store = MemoryStore()
+    await asyncio.gather(*(store.wait(f"room-{i}", since=0, timeout=0.01) for i in range(100)))
+    assert store._events == {} and store._waiters == {}
+
+
+async def test_event_is_kept_while_a_waiter_remains():
+    store = MemoryStore()
+    await store.set_invite("room", "link", 3)
+    first = asyncio.create_task(store.wait("room", since=1, timeout=0.05))
+    second = asyncio.create_task(store.wait("room", since=1, timeout=5))
+    await first
+    assert "room" in store._events
+
+    await store.guest_join("room")
+    assert (await asyncio.wait_for(second, 1))[1] == 2
+    assert store._events == {} and store._waiters == {}
+
+
+async def test_cancelled_waiter_is_forgotten():
+    store = MemoryStore()
+    waiter = asyncio.create_task(store.wait("room", since=0, timeout=5))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert store._events == {} and store._waiters == {}
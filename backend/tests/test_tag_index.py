@@ -0,0 +1,80 @@
+# tests/test_tag_index.py
+from types import SimpleNamespace
+
+import pytest
+
+from src import tag_index as tag_index_module
+from src.tag_index import TagIndex
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def query(self, *columns):
+        self.queries += 1
+        return self
+
+    def order_by(self, *columns):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+ROWS = [
+    SimpleNamespace(id=1, tech_tags=["python", "fastapi"]),
+    SimpleNamespace(id=2, tech_tags=["python", "react"]),
+    SimpleNamespace(id=5, tech_tags=["react", "typescript", "react"]),
+    SimpleNamespace(id=9, tech_tags=None),
+]
+
+
+@pytest.fixture
+def session():
+    return FakeSession(ROWS)
+
+
+def test_no_filter_counts_every_tag(session):
+    total, facets = TagIndex().facets(session, [], match_all=True)
+    assert total == 4
+    # most used first, then by name; duplicate tags count once
+    assert facets == {"python": 2, "react": 2, "fastapi": 1, "typescript": 1}
+
+
+def test_match_all_intersects(session):
+    index = TagIndex()
+    assert index.facets(session, ["python", "react"], match_all=True) == (1, {"python": 1, "react": 1})
+    assert index.facets(session, ["react"], match_all=True) == (2, {"react": 2, "python": 1, "typescript": 1})
+
+
+def test_match_any_unites(session):
+    total, facets = TagIndex().facets(session, ["fastapi", "typescript"], match_all=False)
+    assert total == 2
+    assert facets == {"fastapi": 1, "python": 1, "react": 1, "typescript": 1}
+
+
+def test_unknown_tags(session):
+    index = TagIndex()
+    assert index.facets(session, ["python", "cobol"], match_all=True) == (0, {})
+    assert index.facets(session, ["python", "cobol"], match_all=False)[0] == 2
+
+
+def test_index_is_reused_until_invalidated_or_stale(session, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tag_index_module.time, "monotonic", lambda: now[0])
+    index = TagIndex(ttl=60)
+
+    index.facets(session, ["python"], match_all=True)
+    index.facets(session, ["react"], match_all=False)
+    assert session.queries == 1
+
+    index.invalidate()
+    index.facets(session, [], match_all=True)
+    assert session.queries == 2
+
+    now[0] += 61
+    session.rows = ROWS[:1]
+    assert index.facets(session, [], match_all=True)[0] == 1
+    assert session.queries == 3
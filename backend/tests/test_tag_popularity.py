@@ -0,0 +1,43 @@
+# tests/test_tag_popularity.py
+from datetime import datetime, timezone
+
+from src import tag_popularity
+from src.tag_popularity import TagPopularityCache
+
+UTC = timezone.utc
+ALL_TIME = (None, None, False)
+JANUARY = (datetime(2024, 1, 1, tzinfo=UTC), datetime(2024, 1, 31, tzinfo=UTC), False)
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tag_popularity.time, "monotonic", lambda: now[0])
+    cache = TagPopularityCache(ttl=30)
+    cache.put(ALL_TIME, {"python": 2})
+
+    now[0] += 29
+    assert cache.get(ALL_TIME) == {"python": 2}
+    now[0] += 2
+    assert cache.get(ALL_TIME) is None
+
+
+def test_new_views_drop_the_ranges_covering_them():
+    cache = TagPopularityCache()
+    cache.put(ALL_TIME, {"python": 2})
+    cache.put(JANUARY, {"python": 1})
+
+    cache.note_views([datetime(2024, 3, 1, tzinfo=UTC)])
+    assert cache.get(ALL_TIME) is None
+    assert cache.get(JANUARY) == {"python": 1}
+
+    cache.note_views([datetime(2024, 1, 15, tzinfo=UTC)])
+    assert cache.get(JANUARY) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TagPopularityCache(max_entries=2)
+    cache.put(ALL_TIME, {})
+    cache.put(JANUARY, {})
+    cache.get(ALL_TIME)
+    cache.put((None, None, True), {})
+    assert cache.get(JANUARY) is None and cache.get(ALL_TIME) == {}
@@ -0,0 +1,65 @@
+# tests/test_view_rollup.py
+from datetime import date, datetime, timedelta, timezone
+
+from src.view_rollup import as_utc, daily_view_counts, record_daily_views, utc_day
+
+UTC = timezone.utc
+
+
+def test_utc_day_boundaries():
+    assert utc_day(datetime(2024, 3, 1, 23, 59, 59, 999999, tzinfo=UTC)) == date(2024, 3, 1)
+    assert utc_day(datetime(2024, 3, 2, 0, 0, tzinfo=UTC)) == date(2024, 3, 2)
+    # 20:00 in New York is already the next UTC day
+    assert utc_day(datetime(2024, 3, 1, 20, 0, tzinfo=timezone(timedelta(hours=-5)))) == date(2024, 3, 2)
+    # naive timestamps are UTC
+    assert utc_day(datetime(2024, 3, 1, 23, 30)) == date(2024, 3, 1)
+    assert as_utc(datetime(2024, 3, 1, 23, 30)).tzinfo is UTC
+
+
+def test_rollup_matches_raw_rows_at_day_boundaries(db_session, sample_projects):
+    from src.db import models
+
+    pid = sample_projects[0]
+    today = datetime.now(UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+    # views either side of two UTC midnights, plus one recorded with an offset
+    stamps = [
+        today - timedelta(days=3, microseconds=1),
+        today - timedelta(days=2),
+        today - timedelta(days=2) + timedelta(hours=23, minutes=59),
+        (today - timedelta(days=1, hours=1)).astimezone(timezone(timedelta(hours=9))),
+        today - timedelta(days=1),
+        today + timedelta(minutes=1),
+    ]
+    rows = [{"project_id": pid, "path": "/", "timestamp": ts} for ts in stamps]
+    db_session.add_all(models.PageView(**r) for r in rows)
+    record_daily_views(db_session, rows)
+    db_session.commit()
+
+    def day(n):
+        return str((today - timedelta(days=n)).date())
+
+    # today's second view is the fixture's own
+    expected = [
+        {"date": day(4), "count": 1},
+        {"date": day(2), "count": 3},
+        {"date": day(1), "count": 1},
+        {"date": day(0), "count": 2},
+    ]
+    assert daily_view_counts(db_session, pid) == expected
+
+    # a range starting or ending mid-day counts that day from raw rows only
+    from_date = today - timedelta(days=2, hours=-12)
+    assert daily_view_counts(db_session, pid, from_date=from_date) == [
+        {"date": day(2), "count": 2},
+        {"date": day(1), "count": 1},
+        {"date": day(0), "count": 2},
+    ]
+    to_date = today - timedelta(days=2) + timedelta(hours=12)
+    assert daily_view_counts(db_session, pid, to_date=to_date) == [
+        {"date": day(4), "count": 1},
+        {"date": day(2), "count": 1},
+    ]
+    # inclusive bounds on whole days come straight from the rollup
+    assert daily_view_counts(
+        db_session, pid, from_date=today - timedelta(days=2), to_date=today - timedelta(microseconds=1),
+    ) == [{"date": day(2), "count": 3}, {"date": day(1), "count": 1}]